@@ -11,48 +11,464 @@ Optional:
 - dlib (better accuracy)
 - pygame (better audio)
 
+dlib and pygame are imported on first use; with --fast-start they load in
+the background while monitoring starts on Haar cascades.
+
 pip install opencv-python numpy
 pip install dlib pygame  # Optional
 """
 
 import cv2
+import math
 import numpy as np
 import time
 import datetime
 import threading
+import queue
+import argparse
+import contextlib
 from collections import deque
 import json
 import os
 import platform
+import shutil
+import signal
+import subprocess
 import sys
 
-# Optional imports with fallbacks
-try:
-    import dlib
-    DLIB_AVAILABLE = True
-except Exception:
-    DLIB_AVAILABLE = False
-    print("Warning: dlib not available, falling back to Haar cascades")
+from alert_rules import AlertEngine, load_rules
+from calibration import EARCalibrator
+from session_recorder import SessionRecorder, EVENT_BLINK, EVENT_NAMES
+from session_store import SessionStore
+
+EVENT_FLAGS = {name: flag for flag, name in EVENT_NAMES.items()}
+
+# Optional imports with fallbacks. Both are slow to import, so they are
+# loaded on first use; the *_AVAILABLE flags stay None until then.
+dlib = None
+pygame = None
+DLIB_AVAILABLE = None
+PYGAME_AVAILABLE = None
+
+
+def _load_dlib():
+    """Import dlib on first call; returns whether it is available."""
+    global dlib, DLIB_AVAILABLE
+    if DLIB_AVAILABLE is None:
+        try:
+            import dlib as _dlib
+            dlib = _dlib
+            DLIB_AVAILABLE = True
+        except Exception:
+            DLIB_AVAILABLE = False
+            print("Warning: dlib not available, falling back to Haar cascades")
+    return DLIB_AVAILABLE
+
+
+# The 68-point predictor is ~100 MB and read-only once loaded, so every
+# monitor in the process shares one instance per model path.
+_PREDICTORS = {}
+_PREDICTOR_LOCK = threading.Lock()
+
+
+def _load_pygame():
+    """Import pygame on first call; returns whether it is available."""
+    global pygame, PYGAME_AVAILABLE
+    if PYGAME_AVAILABLE is None:
+        try:
+            import pygame as _pygame
+            pygame = _pygame
+            PYGAME_AVAILABLE = True
+        except Exception:
+            PYGAME_AVAILABLE = False
+            print("Warning: pygame not available, using system beep for alerts")
+    return PYGAME_AVAILABLE
+
+
+def _put_latest(q, item):
+    """Put item on a bounded queue, evicting the oldest entry if it is full.
+
+    Returns True when a stale item had to be dropped.
+    """
+    dropped = False
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped = True
+            except queue.Empty:
+                pass
+
+
+# 68-point landmark model: eye contours (p1..p6 order used by the EAR formula)
+LEFT_EYE_SLICE = slice(42, 48)
+RIGHT_EYE_SLICE = slice(36, 42)
+# EAR = (|p2-p6| + |p3-p5|) / (2 |p1-p4|), as index pairs into a 6-point eye
+_EAR_FROM = [1, 2, 0]
+_EAR_TO = [5, 4, 3]
+
+
+def landmarks_to_array(shape):
+    """Convert a dlib full_object_detection to a (num_parts, 2) float32 array.
+
+    Uses a single shape.parts() call instead of one part(i) call per point.
+    """
+    return np.array([(p.x, p.y) for p in shape.parts()], dtype=np.float32)
+
+
+def batch_ear(landmarks, default=0.3):
+    """Vectorized EAR for many faces at once.
+
+    landmarks: (N, 68, 2) array (a single (68, 2) face is also accepted).
+    Returns (left_ear, right_ear, mean_ear), each of shape (N,). Degenerate
+    eyes (zero horizontal width) get `default`, like calculate_ear.
+    """
+    pts = np.asarray(landmarks, dtype=np.float32)
+    if pts.ndim == 2:
+        pts = pts[np.newaxis]
+    if len(pts) == 0:
+        empty = np.empty(0, dtype=np.float32)
+        return empty, empty, empty
+    eyes = np.stack([pts[:, LEFT_EYE_SLICE], pts[:, RIGHT_EYE_SLICE]], axis=1)  # (N, 2, 6, 2)
+    diff = eyes[:, :, _EAR_FROM] - eyes[:, :, _EAR_TO]                         # (N, 2, 3, 2)
+    dist = np.sqrt(np.einsum('...i,...i->...', diff, diff))                     # (N, 2, 3)
+    width = dist[..., 2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ear = np.where(width > 1e-6, (dist[..., 0] + dist[..., 1]) / (2.0 * width), default)
+    ear = ear.astype(np.float32)
+    return ear[:, 0], ear[:, 1], ear.mean(axis=1)
+
+
+class RollingStats:
+    """Time-windowed EAR and blink statistics with O(1) updates and queries.
+
+    Samples are folded into fixed-size time buckets (`resolution` seconds).
+    Every window keeps its own deque of buckets plus running count/sum/
+    sum-of-squares/blink totals, so adding a sample touches only the newest
+    bucket and expired buckets are subtracted as they fall out of the window.
+    Lifetime totals give session-wide averages.
+    """
+
+    def __init__(self, windows=(60, 300, 3600), resolution=1.0, start_time=None):
+        self.windows = tuple(sorted(windows))
+        self.resolution = resolution
+        self.start_time = start_time
+        # per window: (deque of [bucket, n, sum, sumsq, blinks], totals [n, sum, sumsq, blinks])
+        self._windows = {w: (deque(), [0, 0.0, 0.0, 0]) for w in self.windows}
+        self.total_frames = 0
+        self.total_ear = 0.0
+        self.total_blinks = 0
 
-try:
-    import pygame
-    PYGAME_AVAILABLE = True
-except Exception:
-    PYGAME_AVAILABLE = False
-    print("Warning: pygame not available, using system beep for alerts")
+    def _add(self, now, n, ear, ear_sq, blinks):
+        if self.start_time is None:
+            self.start_time = now
+        bucket = int(now // self.resolution)
+        for window, (buckets, totals) in self._windows.items():
+            if buckets and buckets[-1][0] == bucket:
+                b = buckets[-1]
+                b[1] += n; b[2] += ear; b[3] += ear_sq; b[4] += blinks
+            else:
+                buckets.append([bucket, n, ear, ear_sq, blinks])
+            totals[0] += n; totals[1] += ear; totals[2] += ear_sq; totals[3] += blinks
+            self._evict(window, now)
+
+    def _evict(self, window, now):
+        buckets, totals = self._windows[window]
+        oldest = int((now - window) // self.resolution)
+        while buckets and buckets[0][0] <= oldest:
+            _, n, ear, ear_sq, blinks = buckets.popleft()
+            totals[0] -= n; totals[1] -= ear; totals[2] -= ear_sq; totals[3] -= blinks
+
+    def add_ear(self, now, ear):
+        self._add(now, 1, ear, ear * ear, 0)
+        self.total_frames += 1
+        self.total_ear += ear
+
+    def add_blink(self, now):
+        self._add(now, 0, 0.0, 0.0, 1)
+        self.total_blinks += 1
+
+    def ear_mean(self, window, now=None):
+        if now is not None:
+            self._evict(window, now)
+        n, total, _, _ = self._windows[window][1]
+        return total / n if n else 0.0
+
+    def ear_variance(self, window, now=None):
+        if now is not None:
+            self._evict(window, now)
+        n, total, total_sq, _ = self._windows[window][1]
+        if n < 2:
+            return 0.0
+        mean = total / n
+        return max(total_sq / n - mean * mean, 0.0)
+
+    def blink_rate(self, window, now=None):
+        """Blinks per minute over the window (or over the session so far if shorter)."""
+        if now is not None:
+            self._evict(window, now)
+        blinks = self._windows[window][1][3]
+        elapsed = window
+        if now is not None and self.start_time is not None:
+            elapsed = min(window, now - self.start_time)
+        return blinks * 60.0 / max(elapsed, 1.0)
+
+    def session_ear_mean(self):
+        return self.total_ear / self.total_frames if self.total_frames else 0.0
+
+
+class FrameProfiler:
+    """Per-stage frame timing histograms.
+
+    Each stage keeps a fixed log-spaced histogram (10 us .. 10 s, 20 bins per
+    decade), so memory stays constant over a whole workday and p50/p95/p99
+    come straight from the cumulative bin counts. Frames whose total time
+    exceeds frame_budget are counted as over budget; frames dropped by the
+    pipelined mode are counted separately.
+    """
+
+    STAGES = ("capture", "preprocess", "detect", "landmarks", "ear",
+              "draw_landmarks", "alerts", "draw", "display", "frame")
+    _MIN_EXP = -5        # 10 us
+    _MAX_EXP = 1         # 10 s
+    _BINS_PER_DECADE = 20
+
+    def __init__(self, frame_budget=1.0 / 30):
+        self.frame_budget = frame_budget
+        self._nbins = (self._MAX_EXP - self._MIN_EXP) * self._BINS_PER_DECADE + 1
+        self._hist = {}
+        self._totals = {}  # stage -> [count, sum, max]
+        self._lock = threading.Lock()
+        self.dropped_frames = 0
+        self.over_budget_frames = 0
+
+    def _bin(self, seconds):
+        if seconds <= 0:
+            return 0
+        idx = int((math.log10(seconds) - self._MIN_EXP) * self._BINS_PER_DECADE)
+        return min(max(idx, 0), self._nbins - 1)
+
+    def record(self, stage, seconds):
+        idx = self._bin(seconds)
+        with self._lock:
+            hist = self._hist.get(stage)
+            if hist is None:
+                hist = self._hist[stage] = [0] * self._nbins
+                self._totals[stage] = [0, 0.0, 0.0]
+            hist[idx] += 1
+            totals = self._totals[stage]
+            totals[0] += 1
+            totals[1] += seconds
+            if seconds > totals[2]:
+                totals[2] = seconds
+            if stage == "frame" and seconds > self.frame_budget:
+                self.over_budget_frames += 1
+
+    def record_drop(self):
+        with self._lock:
+            self.dropped_frames += 1
+
+    def _percentile(self, hist, count, q):
+        target = q * count
+        running = 0
+        for idx, n in enumerate(hist):
+            running += n
+            if running >= target:
+                # upper edge of the bin
+                return 10 ** (self._MIN_EXP + (idx + 1) / self._BINS_PER_DECADE)
+        return 10 ** self._MAX_EXP
+
+    def summary(self):
+        """{stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}} plus frame counters."""
+        with self._lock:
+            stages = {}
+            for stage, hist in self._hist.items():
+                count, total, peak = self._totals[stage]
+                stages[stage] = {
+                    "count": count,
+                    "mean_ms": 1000.0 * total / count,
+                    "p50_ms": 1000.0 * min(self._percentile(hist, count, 0.50), peak),
+                    "p95_ms": 1000.0 * min(self._percentile(hist, count, 0.95), peak),
+                    "p99_ms": 1000.0 * min(self._percentile(hist, count, 0.99), peak),
+                    "max_ms": 1000.0 * peak,
+                }
+            return {"stages": stages,
+                    "frame_budget_ms": 1000.0 * self.frame_budget,
+                    "over_budget_frames": self.over_budget_frames,
+                    "dropped_frames": self.dropped_frames}
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def format_lines(self):
+        """Short human-readable lines, ordered like STAGES."""
+        summary = self.summary()
+        stages = summary["stages"]
+        order = [s for s in self.STAGES if s in stages] + \
+                [s for s in stages if s not in self.STAGES]
+        lines = [f"{s:<10} p50 {stages[s]['p50_ms']:6.1f}  p95 {stages[s]['p95_ms']:6.1f}  "
+                 f"p99 {stages[s]['p99_ms']:6.1f} ms" for s in order]
+        lines.append(f"over budget: {summary['over_budget_frames']}  "
+                     f"dropped: {summary['dropped_frames']}")
+        return lines
+
+    def draw(self, frame):
+        """Overlay the timing table in the bottom-left corner of the frame."""
+        lines = self.format_lines()
+        y = frame.shape[0] - 10 - 18 * (len(lines) - 1)
+        for line in lines:
+            cv2.putText(frame, line, (10, y), cv2.FONT_HERSHEY_PLAIN, 1.0, (0, 255, 255), 1)
+            y += 18
+
+
+def read_alert_log(path):
+    """Read alerts from an append-only alerts_<session>.jsonl file.
+
+    A torn last line (crash mid-write) is skipped.
+    """
+    alerts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                alerts.append(json.loads(line))
+            except ValueError:
+                pass
+    return alerts
+
+
+def compact_alert_log(path, out_path=None):
+    """Convert a .jsonl alert log into the JSON-array alerts_<session>.json format."""
+    if out_path is None:
+        out_path = os.path.splitext(path)[0] + ".json"
+    alerts = read_alert_log(path)
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(alerts, f, indent=2)
+    os.replace(tmp_path, out_path)
+    return out_path
 
 
 class AlertLogger:
-    """Simple alert logger that saves to session file."""
-    
-    def __init__(self, session_id):
-        os.makedirs('alert_logs', exist_ok=True)
+    """Simple alert logger that saves to session file.
+
+    Alerts are appended as JSON lines to alert_logs/alerts_<session>.jsonl by
+    a background writer thread, so log_alert() never touches the disk. The
+    writer batches everything logged within flush_interval seconds (up to
+    batch_size records) into one write. fsync_policy is "none" (leave it to
+    the OS), "batch" (fsync after every batch) or "close" (fsync once on
+    close). close() drains the writer and, with compact=True, also writes the
+    JSON-array alerts_<session>.json the logs used to be.
+
+    clock supplies the alert timestamps (time.time by default; replay passes
+    a frame-time clock). With persist=False alerts are only kept in memory.
+    stats is an optional RollingStats used when no blink rate is passed to
+    calculate_blink_severity(). store is an optional SessionStore the writer
+    also inserts each batch into.
+    """
+
+    FSYNC_POLICIES = ("none", "batch", "close")
+
+    BLINK_SEVERITY_WINDOW = 300  # seconds of history behind a blink severity
+
+    def __init__(self, session_id, persist=True, clock=None, flush_interval=1.0,
+                 batch_size=64, fsync_policy="none", stats=None, store=None):
+        if fsync_policy not in self.FSYNC_POLICIES:
+            raise ValueError(f"fsync_policy must be one of {self.FSYNC_POLICIES}")
+        self.persist = persist
+        if persist:
+            os.makedirs('alert_logs', exist_ok=True)
         self.session_id = session_id
-        self.alert_file = f"alert_logs/alerts_{session_id}.json"
+        self.alert_file = f"alert_logs/alerts_{session_id}.jsonl"
         self.alerts = []
+        self.clock = clock or time.time
+        self.stats = stats
+        self.store = store
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.fsync_policy = fsync_policy
+        self._queue = queue.Queue()
+        self._writer = None
+        self._closed = False
+
+    def _start_writer(self):
+        self._writer = threading.Thread(target=self._writer_loop,
+                                        name=f"alert-writer-{self.session_id}", daemon=True)
+        self._writer.start()
+
+    def _writer_loop(self):
+        try:
+            f = open(self.alert_file, "a", encoding="utf-8")
+        except Exception as e:
+            print(f"Warning: Could not open alert log: {e}")
+            f = None
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            records = [r for r in batch if r is not None]
+            if f is not None:
+                try:
+                    if records:
+                        f.write("".join(json.dumps(r) + "\n" for r in records))
+                        f.flush()
+                    if (records and self.fsync_policy == "batch") or \
+                            (item is None and self.fsync_policy == "close"):
+                        os.fsync(f.fileno())
+                except Exception as e:
+                    print(f"Warning: Could not save alert: {e}")
+            if records and self.store is not None:
+                try:
+                    self.store.add_alerts(self.session_id, records)
+                except Exception as e:
+                    print(f"Warning: Could not store alerts: {e}")
+            for _ in batch:
+                self._queue.task_done()
+            if item is None:
+                break
+        if f is not None:
+            f.close()
+
+    def flush(self):
+        """Block until every alert logged so far has been written."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self, compact=True):
+        """Stop the writer after draining it; optionally write the JSON array file."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is None:
+            return
+        self._queue.put(None)
+        self._writer.join()
+        if compact:
+            try:
+                compact_alert_log(self.alert_file)
+            except Exception as e:
+                print(f"Warning: Could not compact alert log: {e}")
     
-    def calculate_blink_severity(self, blink_rate):
+    def calculate_blink_severity(self, blink_rate=None):
         """Calculate severity based on blink frequency."""
+        if blink_rate is None:
+            blink_rate = self.stats.blink_rate(self.BLINK_SEVERITY_WINDOW, self.clock())
         if blink_rate >= 15:
             return "Low"
         elif blink_rate >= 10:
@@ -75,7 +491,7 @@ class AlertLogger:
     
     def is_late_night_work(self):
         """Check if current time is between 10 PM and 6 AM."""
-        current_hour = datetime.datetime.now().hour
+        current_hour = datetime.datetime.fromtimestamp(self.clock()).hour
         return current_hour >= 22 or current_hour < 6
     
     def adjust_severity_for_time(self, base_severity):
@@ -92,25 +508,243 @@ class AlertLogger:
         final_severity = self.adjust_severity_for_time(severity)
         
         alert_record = {
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "timestamp": datetime.datetime.fromtimestamp(self.clock()).strftime("%Y-%m-%d %H:%M:%S"),
             "type": alert_type,
             "severity": final_severity,
             "details": details
         }
         
         self.alerts.append(alert_record)
-        
-        # Save to file immediately
-        try:
-            with open(self.alert_file, 'w') as f:
-                json.dump(self.alerts, f, indent=2)
-        except Exception as e:
-            print(f"Warning: Could not save alert: {e}")
+        if not self.persist or self._closed:
+            return
+
+        # Hand off to the background writer
+        if self._writer is None:
+            self._start_writer()
+        self._queue.put(alert_record)
+
+
+class DetectionScaleController:
+    """Keeps full-frame face detection inside a time budget by picking the
+    downscale factor it runs at.
+
+    Haar and dlib HOG cost both grow roughly with pixel count, i.e. with
+    scale squared, so after each full-frame detection the scale is nudged
+    by sqrt(budget / smoothed_time). Scales are snapped to `step` so the
+    detector does not see a different image size every frame, and clamped
+    to [min_scale, max_scale]; min_scale bounds the smallest detectable face.
+    """
+
+    def __init__(self, budget_ms=15.0, min_scale=0.25, max_scale=1.0, step=0.05,
+                 smoothing=0.2, initial_scale=1.0):
+        self.budget = budget_ms / 1000.0
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.step = step
+        self.smoothing = smoothing
+        self.scale = min(max(initial_scale, min_scale), max_scale)
+        self._avg = None
+
+    def update(self, seconds, scale):
+        """Feed one detection time measured at `scale`; returns the next scale."""
+        # normalise to the current scale so a pending change does not skew the average
+        if scale != self.scale and scale > 0:
+            seconds *= (self.scale / scale) ** 2
+        self._avg = seconds if self._avg is None else \
+            (1 - self.smoothing) * self._avg + self.smoothing * seconds
+        if self._avg <= 0:
+            return self.scale
+        target = self.scale * math.sqrt(self.budget / self._avg)
+        target = min(max(target, self.min_scale), self.max_scale)
+        snapped = round(target / self.step) * self.step
+        if abs(snapped - self.scale) >= self.step - 1e-9:
+            # expected time at the new scale, so the average stays comparable
+            self._avg *= (snapped / self.scale) ** 2
+            self.scale = min(max(snapped, self.min_scale), self.max_scale)
+        return self.scale
+
+
+class AlertSoundPlayer:
+    """Plays alert sounds on one long-lived worker thread.
+
+    Requests go through a priority queue (drowsy before break before blink)
+    and are coalesced: an alert type that is already queued or playing is
+    not queued again. pygame tones are synthesized once at startup and
+    cached; system-sound availability is checked once instead of per alert.
+    """
+
+    PRIORITY = {"drowsy": 0, "break": 1, "blink": 2}
+    TONES = {"blink": (800, 0.25), "drowsy": (600, 0.45), "break": (1000, 0.6)}
+    DEFAULT_TONE = (700, 0.3)
+    SAMPLE_RATE = 44100
+    MACOS_SOUNDS = {"blink": "/System/Library/Sounds/Ping.aiff",
+                    "drowsy": "/System/Library/Sounds/Sosumi.aiff",
+                    "break": "/System/Library/Sounds/Glass.aiff"}
+    BEEP_MS = {"blink": 300, "drowsy": 500, "break": 700}
+
+    def __init__(self, method):
+        self.method = method
+        self._queue = queue.PriorityQueue()
+        self._lock = threading.Lock()
+        self._active = set()   # alert types queued or playing
+        self._playing = threading.Event()
+        self._seq = 0
+        self._sounds = {}
+        self._worker = None
+        if method == "none":
+            return
+        if method == "pygame":
+            self._synthesize_tones()
+        elif method == "beep" and shutil.which("beep") is None:
+            self.method = "print"
+        self._worker = threading.Thread(target=self._worker_loop, name="alert-audio", daemon=True)
+        self._worker.start()
+
+    @property
+    def playing(self):
+        return self._playing.is_set()
+
+    def _synthesize_tones(self):
+        for alert_type, (freq, dur) in list(self.TONES.items()) + [(None, self.DEFAULT_TONE)]:
+            t = np.linspace(0, dur, int(self.SAMPLE_RATE * dur), False)
+            tone = np.sin(freq * 2 * np.pi * t)
+            audio = (tone * (2**15 - 1)).astype(np.int16)
+            stereo = np.ascontiguousarray(np.column_stack([audio, audio]))
+            self._sounds[alert_type] = (pygame.sndarray.make_sound(stereo), dur)
+
+    def play(self, alert_type):
+        """Queue an alert; returns False if it was coalesced with a pending one."""
+        if self._worker is None:
+            return False
+        with self._lock:
+            if alert_type in self._active:
+                return False
+            self._active.add(alert_type)
+            self._seq += 1
+            self._queue.put((self.PRIORITY.get(alert_type, len(self.PRIORITY)), self._seq, alert_type))
+        return True
+
+    def close(self):
+        if self._worker is None:
+            return
+        with self._lock:
+            self._seq += 1
+            self._queue.put((-1, self._seq, None))
+        self._worker.join(timeout=2.0)
+        self._worker = None
+
+    def _worker_loop(self):
+        while True:
+            _, _, alert_type = self._queue.get()
+            if alert_type is None:
+                break
+            self._playing.set()
+            try:
+                self._play(alert_type)
+            except Exception as e:
+                print(f"Audio play failed: {e}")
+            finally:
+                self._playing.clear()
+                with self._lock:
+                    self._active.discard(alert_type)
+
+    def _play(self, alert_type):
+        if self.method == "pygame":
+            sound, dur = self._sounds.get(alert_type, self._sounds[None])
+            sound.play()
+            time.sleep(dur)
+            sound.stop()
+        elif self.method == "afplay":
+            path = self.MACOS_SOUNDS.get(alert_type)
+            if path and os.path.exists(path):
+                subprocess.run(["afplay", path], capture_output=True)
+            else:
+                print(f"macOS sound file not found for alert {alert_type}.")
+        elif self.method == "winsound":
+            import winsound
+            freq = self.TONES.get(alert_type, self.DEFAULT_TONE)[0]
+            winsound.Beep(freq, self.BEEP_MS.get(alert_type, 300))
+        elif self.method == "beep":
+            freq = self.TONES.get(alert_type, (800, 0))[0]
+            try:
+                subprocess.run(["beep", "-f", str(freq), "-l", str(self.BEEP_MS.get(alert_type, 300))],
+                               check=True, capture_output=True)
+            except Exception:
+                print(f"Linux sound fallback: {alert_type} (no system sound available).")
+        else:
+            print(f"🔊 ALERT ({alert_type}): please respond.")
 
 
 class EyeStrainMonitor:
-    def __init__(self):
-        """Initialize the Eye Strain Monitor with default parameters."""
+    def __init__(self, track_faces=False, headless=False, stats_stream=None,
+                 stats_interval=1.0, clock=None, audio=True, log_alerts=True,
+                 profile_overlay=False, profile_path=None, fast_start=False,
+                 detect_scale=1.0, detect_budget_ms=None, name=None, record=False,
+                 alert_rules=None, user=None, recalibrate=False, store=None,
+                 alert_fsync="none", alert_flush_interval=1.0):
+        """Initialize the Eye Strain Monitor with default parameters.
+
+        track_faces: detect-then-track mode. A full-frame face detection only
+        runs every REDETECT_INTERVAL frames (or when the tracked face is lost);
+        frames in between search a padded ROI around the last face box.
+
+        headless: run as a background service. No overlay drawing, window or
+        waitKey calls are made; stats are written as JSON lines to
+        stats_stream (stdout by default) every stats_interval seconds, and
+        SIGINT/SIGTERM stop the loop cleanly.
+
+        clock: timestamp source for all blink/alert timing (time.time by
+        default). Offline replay drives it from frame timestamps instead.
+        audio / log_alerts: set False to stay silent and keep alerts in memory.
+
+        Per-stage frame timings are always collected in self.profiler;
+        profile_overlay draws them on the frame and profile_path dumps the
+        final histogram summary as JSON when run() exits.
+
+        fast_start: start on Haar cascades with no audio right away and load
+        dlib, the landmark predictor and audio on a background thread; the
+        detector switches to dlib as soon as it is ready (models_ready is set
+        once loading has finished either way).
+
+        detect_scale: run face detection on a frame downscaled by this factor;
+        boxes are mapped back and landmarks/eyes are still found on the
+        full-resolution gray frame inside each box. detect_budget_ms instead
+        lets a DetectionScaleController pick the factor to keep full-frame
+        detection within that many milliseconds.
+
+        name: identifies this monitor when several share a process; it is
+        added to emitted records and to the alert/session log file names.
+
+        record: stream per-frame timestamp/EAR/face/event records to
+        session_recordings/<session>/ (see session_recorder.py).
+
+        alert_rules: overrides/additions to the default alert rules, as a
+        list of rule dicts or a JSON file path (see alert_rules.py).
+
+        user: learn this user's EAR_THRESHOLD / DROWSY_THRESHOLD from the
+        live EAR stream and cache them in calibration/ (see calibration.py);
+        recalibrate ignores a cached calibration.
+
+        store: also write alerts and session snapshots to a SQLite
+        SessionStore (or a path to open one at) for indexed queries (see
+        session_store.py).
+
+        alert_fsync / alert_flush_interval: the AlertLogger fsync_policy
+        ("none", "batch" or "close") and how many seconds of alerts its
+        writer batches into one write.
+        """
+        self.name = name
+        self.record = record
+        self.alert_rules = load_rules(alert_rules)
+        self.user = user
+        self.recalibrate = recalibrate
+        self.calibrator = None
+        self.clock = clock or time.time
+        self.log_alerts = log_alerts
+        self.alert_fsync = alert_fsync
+        self.alert_flush_interval = alert_flush_interval
+        self.store = SessionStore(store) if isinstance(store, str) else store
+
         # EAR thresholds
         
         self.EAR_CONSEC_FRAMES = 3  # reduced from 20 → better blink detection
@@ -121,6 +755,8 @@ class EyeStrainMonitor:
         closed_ear = 0.305
         self.EAR_THRESHOLD = (open_ear + closed_ear) / 2   # ≈ 0.327
         self.DROWSY_THRESHOLD = closed_ear - 0.01          # ≈ 0.295
+        # used until a calibrator for the current detection method is calibrated
+        self.default_thresholds = (self.EAR_THRESHOLD, self.DROWSY_THRESHOLD)
 
         
 
@@ -129,20 +765,90 @@ class EyeStrainMonitor:
         self.BREAK_REMINDER_TIME = 1200  # 20 minutes
         self.LONG_SESSION_TIME = 3600    # 1 hour
 
+        # rolling statistics windows (seconds): display, blink rate, long-term
+        self.STATS_WINDOWS = (60, 300, 3600)
+        self.BLINK_RATE_WINDOW = 300
+
+        # detect-then-track (ROI) settings
+        self.track_faces = track_faces
+        self.REDETECT_INTERVAL = 15     # frames between full-frame detections
+        self.ROI_PADDING = 0.5          # ROI grows by this fraction of the face size per side
+        self.TRACK_MIN_SCORE = 0.2      # dlib detection score below which the track is dropped
+        self.scale_controller = None    # DetectionScaleController when detect_budget_ms is set
+        if detect_budget_ms:
+            self.scale_controller = DetectionScaleController(detect_budget_ms,
+                                                             initial_scale=detect_scale)
+            detect_scale = self.scale_controller.scale
+        self.DETECTION_DOWNSCALE = detect_scale  # < 1.0 runs face detection on a smaller image
+
+        # Haar cascade parameters (face, eye); see benchmark.py before changing
+        self.HAAR_SCALE_FACTOR = 1.3
+        self.HAAR_MIN_NEIGHBORS = 5
+        self.HAAR_EYE_SCALE_FACTOR = 1.1
+        self.HAAR_EYE_MIN_NEIGHBORS = 3
+
+        # counters, data stores and alert logger
+        self.reset_session()
+
+        # detection and audio init
+        self.models_ready = threading.Event()
+        # (kind, value) results of _background_init, applied by the frame loop;
+        # detection switches go to the detection thread, which may be a different one
+        self._background_results = queue.Queue()
+        self._detection_switch = queue.Queue()
+        self._handoff_lock = threading.Lock()
+        self._audio_closed = False
+        if fast_start:
+            self.detection_method = self._initialize_haar_cascades()
+            self.audio_method = "none"
+            self.sound_player = AlertSoundPlayer(self.audio_method)
+            threading.Thread(target=self._background_init, args=(audio,),
+                             name="est-model-loader", daemon=True).start()
+        else:
+            self.detection_method = self._initialize_detection()
+            self.audio_method = self._initialize_audio() if audio else "none"
+            self.sound_player = AlertSoundPlayer(self.audio_method)
+            self.models_ready.set()
+        self._setup_calibration()
+
+        # logs directory
+        if log_alerts:
+            os.makedirs('eye_strain_logs', exist_ok=True)
+
+
+        # headless / service mode
+        self.headless = headless
+        self.draw_overlay = not headless
+        self.stats_stream = stats_stream if stats_stream is not None else sys.stdout
+        self.stats_interval = stats_interval
+        self.last_stats_emit = 0.0
+        self.stop_event = threading.Event()
+
+        # per-stage frame timing
+        self.profiler = FrameProfiler()
+        self.profile_overlay = profile_overlay and not headless
+        self.profile_path = profile_path
+
+    def reset_session(self):
+        """Start a fresh session: zero all counters and open a new alert log."""
+        now = self.clock()
+
         # counters / trackers
         self.blink_counter = 0
         self.frame_counter = 0
         self.eye_closed_counter = 0
         self.drowsy_counter = 0
-        self.last_blink_time = time.time()
-        self.session_start_time = time.time()
-        self.last_break_reminder = time.time()
+        self.last_blink_time = now
+        self.session_start_time = now
+        self.last_break_reminder = now
+        self.tracked_box = None
+        self.frames_since_detect = 0
+        self.current_ear = 0.0          # EAR of the latest frame with a face
 
         # data stores
-        self.blink_history = deque(maxlen=300)  # timestamps
-        self.ear_history = deque(maxlen=100)
+        self.rolling = RollingStats(self.STATS_WINDOWS, start_time=now)
         self.session_data = {
-            'start_time': datetime.datetime.now().isoformat(),
+            'start_time': datetime.datetime.fromtimestamp(now).isoformat(),
             'total_blinks': 0,
             'drowsy_episodes': 0,
             'break_reminders': 0,
@@ -150,42 +856,147 @@ class EyeStrainMonitor:
             'session_duration': 0.0
         }
 
-        # detection and audio init
-        self.detection_method = self._initialize_detection()
-        self._initialize_audio()
-
-        # logs directory
-        os.makedirs('eye_strain_logs', exist_ok=True)
-
         # current alert display object
         self.current_alert = None
-        self.alert_playing = False
-        
+
         # NEW: Add alert logger
-        session_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.alert_logger = AlertLogger(session_timestamp)
+        if getattr(self, 'alert_logger', None) is not None:
+            self.close_session()
+        session_timestamp = datetime.datetime.fromtimestamp(now).strftime("%Y%m%d_%H%M%S")
+        if self.name:
+            session_timestamp += f"_{self.name}"
+        self.session_id = session_timestamp
+        if self.store is not None:
+            self.store.begin_session(session_timestamp, now, self.user, self.name)
+        self.alert_logger = AlertLogger(session_timestamp, persist=self.log_alerts,
+                                        flush_interval=self.alert_flush_interval,
+                                        fsync_policy=self.alert_fsync,
+                                        clock=self.clock, stats=self.rolling, store=self.store)
+        self.recorder = SessionRecorder(session_timestamp) if self.record else None
+        self.alert_engine = self._build_alert_engine(now)
+
+    def _build_alert_engine(self, now):
+        """AlertEngine over self.alert_rules; string intervals name monitor attributes."""
+        rules = []
+        for spec in self.alert_rules:
+            interval = spec.get("interval")
+            if isinstance(interval, str):
+                spec = dict(spec, interval=getattr(self, interval))
+            rules.append(spec)
+        return AlertEngine(rules, now)
+
+    def close_session(self):
+        """Flush and close the session's alert log and frame recording."""
+        self.alert_logger.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.calibrator is not None:
+            self.calibrator.flush()
 
     def _initialize_detection(self):
         """Pick dlib (if available) or Haar cascades as fallback."""
-        if DLIB_AVAILABLE:
+        if self._load_dlib_models():
+            print("Using dlib facial landmarks for eye detection.")
+            return "dlib"
+        return self._initialize_haar_cascades()
+
+    def _load_dlib_models(self):
+        """Load the dlib detector and 68-point predictor; returns True on success."""
+        if not _load_dlib():
+            return False
+        try:
+            # the HOG detector is small but not safe to share between threads
+            detector = dlib.get_frontal_face_detector()
+            predictor_path = 'shape_predictor_68_face_landmarks.dat'
+            with _PREDICTOR_LOCK:
+                predictor = _PREDICTORS.get(predictor_path)
+                if predictor is None:
+                    if not os.path.exists(predictor_path):
+                        print(f"Warning: {predictor_path} not found. Attempting download...")
+                        if not self._download_predictor():
+                            print("Download failed — falling back to Haar cascades.")
+                            return False
+                    predictor = _PREDICTORS[predictor_path] = dlib.shape_predictor(predictor_path)
+            self.predictor = predictor
+            self.detector = detector
+            self.LEFT_EYE_POINTS = list(range(42, 48))
+            self.RIGHT_EYE_POINTS = list(range(36, 42))
+            return True
+        except Exception as e:
+            print(f"Dlib init failed: {e}\nFalling back to Haar cascades.")
+            return False
+
+    def _background_init(self, audio):
+        """fast_start: load dlib and audio off the frame loop, then switch over."""
+        try:
+            if self._load_dlib_models():
+                # Models are fully in place before the switch is posted, so the
+                # detection thread never sees a half-initialized dlib path.
+                self._detection_switch.put("dlib")
+                # the calibrator is fed from the frame loop; swap it there
+                self._background_results.put(("calibration", "dlib"))
+            if audio:
+                player = AlertSoundPlayer(self._initialize_audio())
+                with self._handoff_lock:
+                    if not self._audio_closed:
+                        self._background_results.put(("sound_player", player))
+                        player = None
+                if player is not None:   # monitor shut down while audio was loading
+                    player.close()
+        finally:
+            self.models_ready.set()
+
+    def _apply_detection_switch(self):
+        """Switch detectors; runs on the thread calling detect_eyes_and_calculate_ear()."""
+        while not self._detection_switch.empty():
+            self.detection_method = self._detection_switch.get_nowait()
+            self.tracked_box = None
+            print(f"Switched to {self.detection_method} facial landmarks for eye detection.")
+
+    def _apply_background_results(self):
+        """Take over what _background_init prepared; runs on the thread calling update_state()."""
+        while True:
             try:
-                self.detector = dlib.get_frontal_face_detector()
-                predictor_path = 'shape_predictor_68_face_landmarks.dat'
-                if not os.path.exists(predictor_path):
-                    print(f"Warning: {predictor_path} not found. Attempting download...")
-                    if not self._download_predictor():
-                        print("Download failed — falling back to Haar cascades.")
-                        return self._initialize_haar_cascades()
-                self.predictor = dlib.shape_predictor(predictor_path)
-                self.LEFT_EYE_POINTS = list(range(42, 48))
-                self.RIGHT_EYE_POINTS = list(range(36, 42))
-                print("Using dlib facial landmarks for eye detection.")
-                return "dlib"
-            except Exception as e:
-                print(f"Dlib init failed: {e}\nFalling back to Haar cascades.")
-                return self._initialize_haar_cascades()
+                kind, value = self._background_results.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "calibration":
+                self._setup_calibration(value)
+            elif kind == "sound_player":
+                old, self.sound_player = self.sound_player, value
+                self.audio_method = value.method
+                old.close()
+
+    def close_audio(self):
+        """Stop the alert sound worker, and any player _background_init left pending."""
+        with self._handoff_lock:
+            self._audio_closed = True
+            pending = []
+            while not self._background_results.empty():
+                kind, value = self._background_results.get_nowait()
+                if kind == "sound_player":
+                    pending.append(value)
+        for player in pending:
+            player.close()
+        self.sound_player.close()
+
+    def _setup_calibration(self, method=None):
+        """Per-user calibration for a detection method (the EAR scales differ)."""
+        if not self.user:
+            return
+        if self.calibrator is not None:
+            self.calibrator.flush()
+        self.calibrator = EARCalibrator(self.user, method or self.detection_method,
+                                        load=not self.recalibrate)
+        if self.calibrator.calibrated:
+            self.EAR_THRESHOLD, self.DROWSY_THRESHOLD = self.calibrator.thresholds
+            print(f"Loaded EAR calibration for {self.user}: "
+                  f"blink < {self.EAR_THRESHOLD:.3f}, drowsy < {self.DROWSY_THRESHOLD:.3f}")
         else:
-            return self._initialize_haar_cascades()
+            # another method's calibrated thresholds are on the wrong EAR scale
+            self.EAR_THRESHOLD, self.DROWSY_THRESHOLD = self.default_thresholds
+            print(f"Calibrating EAR thresholds for {self.user} "
+                  f"(~{self.calibrator.WARMUP_SECONDS:.0f}s of normal blinking)...")
 
     def _initialize_haar_cascades(self):
         """Initialize Haar cascade classifiers."""
@@ -222,39 +1033,35 @@ class EyeStrainMonitor:
             return False
 
     def _initialize_audio(self):
-        """Set up audio method."""
-        self.audio_method = "none"
-        if PYGAME_AVAILABLE:
+        """Set up audio; returns the audio method."""
+        if _load_pygame():
             try:
                 pygame.mixer.pre_init(44100, -16, 2, 512)
                 pygame.mixer.init()
-                self.audio_method = "pygame"
                 print("Using pygame for audio alerts.")
+                return "pygame"
             except Exception as e:
                 print(f"Pygame init failed: {e}")
-                self._fallback_audio_init()
-        else:
-            self._fallback_audio_init()
+        return self._fallback_audio_init()
 
     def _fallback_audio_init(self):
         system = platform.system().lower()
         if system == "darwin":
-            self.audio_method = "afplay"
             print("Using macOS 'afplay' for audio alerts (if available).")
-        elif system == "linux":
-            self.audio_method = "beep"
+            return "afplay"
+        if system == "linux":
             print("Using system 'beep' for alerts (if available).")
-        elif system == "windows":
+            return "beep"
+        if system == "windows":
             try:
                 import winsound  # noqa: F401
-                self.audio_method = "winsound"
                 print("Using winsound for alerts on Windows.")
+                return "winsound"
             except Exception:
-                self.audio_method = "print"
                 print("winsound unavailable; using text alerts.")
-        else:
-            self.audio_method = "print"
-            print("Unknown system: using text alerts.")
+                return "print"
+        print("Unknown system: using text alerts.")
+        return "print"
 
     def calculate_ear(self, eye_landmarks):
         """Compute Eye Aspect Ratio (EAR)."""
@@ -284,114 +1091,143 @@ class EyeStrainMonitor:
         return np.array(coords, dtype=np.int32)
 
     def play_alert_sound(self, alert_type="blink"):
-        """Play an alert sound without blocking main loop."""
-        if self.alert_playing:
-            return
-        def _play():
-            self.alert_playing = True
-            try:
-                if self.audio_method == "pygame":
-                    self._play_pygame_sound(alert_type)
-                elif self.audio_method == "afplay":
-                    self._play_system_beep_macos(alert_type)
-                elif self.audio_method == "winsound":
-                    self._play_system_beep_windows(alert_type)
-                elif self.audio_method == "beep":
-                    self._play_system_beep_linux(alert_type)
-                else:
-                    print(f"🔊 ALERT ({alert_type}): please respond.")
-            except Exception as e:
-                print(f"Audio play failed: {e}")
-            finally:
-                self.alert_playing = False
-        threading.Thread(target=_play, daemon=True).start()
-
-    def _play_pygame_sound(self, alert_type):
-        """Generate a short tone with pygame."""
-        mapping = {"blink": (800, 0.25), "drowsy": (600, 0.45), "break": (1000, 0.6)}
-        freq, dur = mapping.get(alert_type, (700, 0.3))
-        sample_rate = 44100
-        t = np.linspace(0, dur, int(sample_rate * dur), False)
-        tone = np.sin(freq * 2 * np.pi * t)
-        audio = (tone * (2**15 - 1)).astype(np.int16)
-        stereo = np.column_stack([audio, audio])
-        sound = pygame.sndarray.make_sound(stereo)
-        sound.play()
-        time.sleep(dur)
-        sound.stop()
-
-    def _play_system_beep_macos(self, alert_type):
-        import subprocess
-        sound_map = {"blink": "/System/Library/Sounds/Ping.aiff",
-                     "drowsy": "/System/Library/Sounds/Sosumi.aiff",
-                     "break": "/System/Library/Sounds/Glass.aiff"}
-        path = sound_map.get(alert_type)
-        if path and os.path.exists(path):
-            subprocess.run(["afplay", path], capture_output=True)
-        else:
-            print(f"macOS sound file not found for alert {alert_type}.")
-
-    def _play_system_beep_windows(self, alert_type):
-        import winsound
-        freq_map = {"blink": 800, "drowsy": 600, "break": 1000}
-        dur_map = {"blink": 300, "drowsy": 500, "break": 700}
-        winsound.Beep(freq_map.get(alert_type, 750), dur_map.get(alert_type, 300))
-
-    def _play_system_beep_linux(self, alert_type):
-        import subprocess
-        freq_map = {"blink": "800", "drowsy": "600", "break": "1000"}
-        dur_map = {"blink": "300", "drowsy": "500", "break": "700"}
-        try:
-            subprocess.run(["beep", "-f", freq_map.get(alert_type, "800"),
-                            "-l", dur_map.get(alert_type, "300")],
-                           check=True, capture_output=True)
-        except Exception:
-            print(f"Linux sound fallback: {alert_type} (no system sound available).")
+        """Queue an alert sound on the audio worker; never blocks the main loop."""
+        self.sound_player.play(alert_type)
+
+    @property
+    def alert_playing(self):
+        return self.sound_player.playing
 
     def show_alert_popup(self, message, alert_type="info"):
         colors = {"blink": (0, 255, 255), "drowsy": (0, 0, 255),
                   "break": (255, 0, 0), "info": (255, 255, 255)}
         self.current_alert = {'message': message,
                               'color': colors.get(alert_type, colors['info']),
-                              'timestamp': time.time()}
+                              'timestamp': self.clock()}
+        if self.headless:
+            self._emit_record({"event": "alert", "type": alert_type,
+                               "message": message, "time": self.clock()})
 
     def detect_eyes_and_calculate_ear(self, frame, gray):
+        if not self._detection_switch.empty():
+            self._apply_detection_switch()
         if self.detection_method == "dlib":
             return self._detect_with_dlib(frame, gray)
         return self._detect_with_haar(frame, gray)
 
+    def _detect_faces(self, gray, scale=1.0):
+        """Run the face detector on a gray image, optionally downscaled.
+
+        Returns (boxes, scores) with boxes as (x, y, w, h) in the coordinates
+        of the image that was passed in.
+        """
+        img = gray
+        if scale != 1.0:
+            img = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        if self.detection_method == "dlib":
+            # dlib needs C-contiguous pixels; a tracking ROI slice is a strided view
+            rects, scores, _ = self.detector.run(np.ascontiguousarray(img), 0, 0)
+            boxes = [(r.left(), r.top(), r.width(), r.height()) for r in rects]
+        else:
+            faces = self.face_cascade.detectMultiScale(img, scaleFactor=self.HAAR_SCALE_FACTOR,
+                                                       minNeighbors=self.HAAR_MIN_NEIGHBORS)
+            boxes = [tuple(int(v) for v in f) for f in faces]
+            scores = [1.0] * len(boxes)  # Haar gives no usable score
+        if scale != 1.0:
+            boxes = [tuple(int(round(v / scale)) for v in b) for b in boxes]
+        return boxes, list(scores)
+
+    def _tracking_roi(self, gray):
+        """Padded search window (x0, y0, x1, y1) around the tracked face."""
+        x, y, w, h = self.tracked_box
+        pad_w, pad_h = int(w * self.ROI_PADDING), int(h * self.ROI_PADDING)
+        rows, cols = gray.shape[:2]
+        return (max(0, x - pad_w), max(0, y - pad_h),
+                min(cols, x + w + pad_w), min(rows, y + h + pad_h))
+
+    def _full_frame_detect(self, gray):
+        """Detect on the whole frame at DETECTION_DOWNSCALE, feeding the scale controller."""
+        scale = self.DETECTION_DOWNSCALE
+        t0 = time.perf_counter()
+        boxes, _ = self._detect_faces(gray, scale)
+        if self.scale_controller is not None:
+            self.DETECTION_DOWNSCALE = self.scale_controller.update(time.perf_counter() - t0, scale)
+        return boxes
+
+    def find_faces(self, gray):
+        """Face boxes (x, y, w, h) for this frame.
+
+        Without tracking this is a plain full-frame detection. With tracking,
+        only the largest face is followed: between periodic full detections
+        the detector runs on a padded ROI around the last box, and falls back
+        to a full detection when the face leaves the ROI or its score drops.
+        Both run at DETECTION_DOWNSCALE.
+        """
+        if not self.track_faces:
+            return self._full_frame_detect(gray)
+
+        if self.tracked_box is not None and self.frames_since_detect < self.REDETECT_INTERVAL:
+            x0, y0, x1, y1 = self._tracking_roi(gray)
+            boxes, scores = self._detect_faces(gray[y0:y1, x0:x1], self.DETECTION_DOWNSCALE)
+            if boxes:
+                best = max(range(len(boxes)), key=lambda i: scores[i])
+                if scores[best] >= self.TRACK_MIN_SCORE:
+                    bx, by, bw, bh = boxes[best]
+                    self.tracked_box = (bx + x0, by + y0, bw, bh)
+                    self.frames_since_detect += 1
+                    return [self.tracked_box]
+
+        boxes = self._full_frame_detect(gray)
+        self.frames_since_detect = 0
+        self.tracked_box = max(boxes, key=lambda b: b[2] * b[3]) if boxes else None
+        return [self.tracked_box] if self.tracked_box else []
+
     def _detect_with_dlib(self, frame, gray):
-        faces = self.detector(gray, 0)
-        total_ear, face_count = 0.0, 0
-        for face in faces:
-            landmarks = self.predictor(gray, face)
-            left_eye = self.extract_eye_landmarks(landmarks, self.LEFT_EYE_POINTS)
-            right_eye = self.extract_eye_landmarks(landmarks, self.RIGHT_EYE_POINTS)
-            left_ear = self.calculate_ear(left_eye)
-            right_ear = self.calculate_ear(right_eye)
-            avg_ear = (left_ear + right_ear) / 2.0
-            total_ear += avg_ear
-            face_count += 1
-            self.draw_eye_landmarks(frame, left_eye)
-            self.draw_eye_landmarks(frame, right_eye)
-            cv2.rectangle(frame, (face.left(), face.top()),
-                          (face.right(), face.bottom()), (255, 0, 0), 2)
-        return (total_ear / face_count if face_count > 0 else 0.3, face_count > 0)
+        record = self.profiler.record
+        t0 = time.perf_counter()
+        faces = self.find_faces(gray)
+        t1 = time.perf_counter()
+        record("detect", t1 - t0)
+        if not faces:
+            return 0.3, False
+        landmarks = np.stack([
+            landmarks_to_array(self.predictor(gray, dlib.rectangle(x, y, x + w, y + h)))
+            for (x, y, w, h) in faces])
+        t2 = time.perf_counter()
+        _, _, face_ears = batch_ear(landmarks)
+        t3 = time.perf_counter()
+        record("landmarks", t2 - t1)
+        record("ear", t3 - t2)
+        if self.draw_overlay:
+            for (x, y, w, h), pts in zip(faces, landmarks):
+                self.draw_eye_landmarks(frame, pts[LEFT_EYE_SLICE])
+                self.draw_eye_landmarks(frame, pts[RIGHT_EYE_SLICE])
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
+            record("draw_landmarks", time.perf_counter() - t3)
+        return float(face_ears.mean()), True
 
     def _detect_with_haar(self, frame, gray):
-        faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5)
+        t0 = time.perf_counter()
+        faces = self.find_faces(gray)
+        t1 = time.perf_counter()
+        self.profiler.record("detect", t1 - t0)
         total_ear, eye_count = 0.0, 0
         for (x, y, w, h) in faces:
-            cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
+            if self.draw_overlay:
+                cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
             roi_gray = gray[y:y + h//2, x:x + w]
             roi_color = frame[y:y + h//2, x:x + w]
-            eyes = self.eye_cascade.detectMultiScale(roi_gray, scaleFactor=1.1, minNeighbors=3)
+            eyes = self.eye_cascade.detectMultiScale(roi_gray, scaleFactor=self.HAAR_EYE_SCALE_FACTOR,
+                                                     minNeighbors=self.HAAR_EYE_MIN_NEIGHBORS)
             for (ex, ey, ew, eh) in eyes:
-                cv2.rectangle(roi_color, (ex, ey), (ex+ew, ey+eh), (0, 255, 0), 2)
+                if self.draw_overlay:
+                    cv2.rectangle(roi_color, (ex, ey), (ex+ew, ey+eh), (0, 255, 0), 2)
                 ear = self.calculate_ear_from_bbox((ex, ey, ew, eh))
                 total_ear += ear
                 eye_count += 1
         avg_ear = total_ear / eye_count if eye_count > 0 else 0.3
+        # the eye cascade stands in for the landmark stage on this path
+        self.profiler.record("landmarks", time.perf_counter() - t1)
         return (avg_ear, len(faces) > 0)
 
     def draw_eye_landmarks(self, frame, eye_coords):
@@ -405,26 +1241,45 @@ class EyeStrainMonitor:
         for (x, y) in pts:
             cv2.circle(frame, (int(x), int(y)), 2, (0, 255, 0), -1)
 
+    def current_stats(self):
+        """Snapshot of the live session statistics.
+
+        "ear" is the latest face frame's EAR; ear_mean_<N>s and ear_variance
+        cover the last STATS_WINDOWS[0] seconds.
+        """
+        now = self.clock()
+        session_duration = now - self.session_start_time
+        window = self.STATS_WINDOWS[0]
+        return {
+            "session_minutes": session_duration / 60,
+            "blinks": self.blink_counter,
+            "blink_rate": self.rolling.blink_rate(self.BLINK_RATE_WINDOW, now),
+            "blink_rates": {f"{w // 60}m": self.rolling.blink_rate(w, now)
+                            for w in self.STATS_WINDOWS},
+            "seconds_since_blink": now - self.last_blink_time,
+            "ear": self.current_ear,
+            f"ear_mean_{window}s": self.rolling.ear_mean(window, now),
+            "ear_variance": self.rolling.ear_variance(window, now),
+            "drowsy_episodes": self.session_data.get('drowsy_episodes', 0),
+        }
+
     def draw_statistics(self, frame):
-        session_duration = time.time() - self.session_start_time
-        time_since_blink = time.time() - self.last_blink_time
-        avg_ear = float(np.mean(self.ear_history)) if self.ear_history else 0.0
-        denom = max(min(session_duration, 300.0), 1.0)
-        blink_rate = len(self.blink_history) * 60.0 / denom
+        st = self.current_stats()
+        window = self.STATS_WINDOWS[0]
         stats = [
-            f"Session: {session_duration/60:.1f} min",
-            f"Blinks: {self.blink_counter}",
-            f"Blink Rate: {blink_rate:.1f}/min",
-            f"Last Blink: {time_since_blink:.1f}s ago",
-            f"EAR: {avg_ear:.3f}",  # live EAR debug
-            f"Drowsy Episodes: {self.session_data.get('drowsy_episodes', 0)}"
+            f"Session: {st['session_minutes']:.1f} min",
+            f"Blinks: {st['blinks']}",
+            f"Blink Rate: {st['blink_rate']:.1f}/min",
+            f"Last Blink: {st['seconds_since_blink']:.1f}s ago",
+            f"EAR: {st['ear']:.3f} ({window}s mean {st[f'ear_mean_{window}s']:.3f})",
+            f"Drowsy Episodes: {st['drowsy_episodes']}"
         ]
         y_offset = 30
         for i, stat in enumerate(stats):
             cv2.putText(frame, stat, (10, y_offset + i*25),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
         if self.current_alert:
-            alert_age = time.time() - self.current_alert['timestamp']
+            alert_age = self.clock() - self.current_alert['timestamp']
             if alert_age < 3.0:
                 cv2.rectangle(frame, (50, 200), (550, 260), (0, 0, 0), -1)
                 cv2.rectangle(frame, (50, 200), (550, 260),
@@ -433,132 +1288,362 @@ class EyeStrainMonitor:
                             cv2.FONT_HERSHEY_SIMPLEX, 0.8,
                             self.current_alert['color'], 2)
 
-    def run(self):
-        print("Starting Eye Strain Monitor...")
-        print("Press 'q' to quit, 's' to save statistics.")
+    def update_state(self, avg_ear, faces_detected, now=None):
+        """Advance blink/drowsiness counters and fire alerts for one frame.
+
+        `now` is the frame's clock() time; it defaults to the current time.
+        Returns the EVENT_* flags (session_recorder.py) raised this frame.
+        """
+        if not self._background_results.empty():
+            self._apply_background_results()
+        if now is None:
+            now = self.clock()
+        events = self._advance_state(now, avg_ear, faces_detected)
+        if self.recorder is not None:
+            self.recorder.append(now, avg_ear, faces_detected, events)
+        return events
+
+    def _advance_state(self, now, avg_ear, faces_detected):
+        """update_state() body; returns the EVENT_* flags raised this frame."""
+        events = 0
+        if not faces_detected:
+            return events
+
+        self.current_ear = avg_ear
+        self.rolling.add_ear(now, avg_ear)
+        if self.calibrator is not None and self.calibrator.add(now, avg_ear):
+            self.EAR_THRESHOLD, self.DROWSY_THRESHOLD = self.calibrator.thresholds
+        if avg_ear < self.EAR_THRESHOLD:
+            self.eye_closed_counter += 1
+        else:
+            if self.eye_closed_counter >= self.EAR_CONSEC_FRAMES:
+                if now - self.last_blink_time > 0.25:  # 250ms cooldown
+                    self.blink_counter += 1
+                    self.last_blink_time = now
+                    self.rolling.add_blink(now)
+                    events |= EVENT_BLINK
+                    for rule in self.alert_engine.notify("blink", now):
+                        events |= self._fire_alert(rule, now, avg_ear)
+            self.eye_closed_counter = 0
+        if avg_ear < self.DROWSY_THRESHOLD:
+            self.drowsy_counter += 1
+            if self.drowsy_counter >= self.DROWSY_CONSEC_FRAMES:
+                for rule in self.alert_engine.notify("drowsy", now):
+                    events |= self._fire_alert(rule, now, avg_ear)
+                self.drowsy_counter = 0
+        else:
+            self.drowsy_counter = 0
+
+        # blink reminder, break reminder, long session (see alert_rules.py)
+        for rule in self.alert_engine.advance(now):
+            events |= self._fire_alert(rule, now, avg_ear)
+
+        return events
+
+    def _alert_context(self, now, avg_ear):
+        """Values available to alert rule severity/details format strings."""
+        blink_rate = self.rolling.blink_rate(self.BLINK_RATE_WINDOW, now)
+        session_minutes = (now - self.session_start_time) / 60
+        return {
+            "ear": avg_ear,
+            "blink_rate": blink_rate,
+            "blink_severity": self.alert_logger.calculate_blink_severity(blink_rate),
+            "session_minutes": session_minutes,
+            "session_hours": session_minutes / 60,
+            "exposure_severity": self.alert_logger.calculate_exposure_severity(session_minutes),
+        }
+
+    def _fire_alert(self, rule, now, avg_ear):
+        """Show, play and log one fired rule, apply its state changes; returns its event flag."""
+        if rule.message:
+            self.show_alert_popup(rule.message, rule.alert_type)
+        if rule.sound:
+            self.play_alert_sound(rule.alert_type)
+        if rule.log_type:
+            context = self._alert_context(now, avg_ear)
+            self.alert_logger.log_alert(
+                alert_type=rule.log_type,
+                severity=rule.severity.format(**context),
+                details=rule.details.format(**context)
+            )
+        for attr in rule.resets:
+            setattr(self, attr, now)
+        if rule.counts:
+            self.session_data[rule.counts] = self.session_data.get(rule.counts, 0) + 1
+        return EVENT_FLAGS.get(rule.event, 0)
+
+    def _report_profile(self):
+        """Print (or emit, when headless) the frame timing summary; dump it if asked."""
+        if self.profile_path:
+            try:
+                self.profiler.dump(self.profile_path)
+            except Exception as e:
+                print(f"Warning: Could not write profile: {e}")
+        summary = self.profiler.summary()
+        if not summary["stages"]:
+            return
+        if self.headless:
+            record = {"event": "profile", "time": self.clock()}
+            record.update(summary)
+            self._emit_record(record)
+            return
+        print("Frame timing:")
+        for line in self.profiler.format_lines():
+            print(f"  {line}")
+
+    def _open_camera(self):
         cap = cv2.VideoCapture(0)
         if not cap.isOpened():
             print("Error: Could not access webcam. Check permissions or device.")
-            return
+            return None
         cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
         try:
             cap.set(cv2.CAP_PROP_FPS, 30)
         except Exception:
             pass
+        return cap
+
+    def _show_frame(self, frame):
+        """Overlay stats, display the frame and handle keypresses.
+
+        Returns False when the user asked to quit.
+        """
+        t0 = time.perf_counter()
+        self.draw_statistics(frame)
+        if self.profile_overlay:
+            self.profiler.draw(frame)
+        t1 = time.perf_counter()
+        cv2.imshow("Eye Strain Monitor", frame)
+
+        # Handle keypress
+        key = cv2.waitKey(1) & 0xFF
+        self.profiler.record("draw", t1 - t0)
+        self.profiler.record("display", time.perf_counter() - t1)
+        if key == ord("q"):
+            return False
+        elif key == ord("s"):
+            self.save_session_data()
+        return True
+
+    def process_frame(self, frame):
+        """Detect and update state for one captured frame (no display).
+
+        Used by callers that drive the monitor themselves, e.g. supervisor.py.
+        Returns (avg_ear, faces_detected).
+        """
+        t0 = time.perf_counter()
+        if self.draw_overlay:
+            frame = cv2.flip(frame, 1)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        t1 = time.perf_counter()
+        avg_ear, faces_detected = self.detect_eyes_and_calculate_ear(frame, gray)
+        t2 = time.perf_counter()
+        self.update_state(avg_ear, faces_detected)
+        t3 = time.perf_counter()
+        self.profiler.record("preprocess", t1 - t0)
+        self.profiler.record("alerts", t3 - t2)
+        self.profiler.record("frame", t3 - t0)
+        return avg_ear, faces_detected
+
+    def _emit_record(self, record):
+        """Write one JSON line to the stats stream (headless mode)."""
+        if self.name:
+            record = dict(record, monitor=self.name)
+        try:
+            self.stats_stream.write(json.dumps(record) + "\n")
+            self.stats_stream.flush()
+        except Exception as e:
+            print(f"Warning: Could not write stats: {e}", file=sys.stderr)
+
+    def _present(self, frame):
+        """Hand a processed frame to the user: window in GUI mode, periodic
+        JSON stats in headless mode. Returns False when the loop should stop.
+        """
+        if not self.headless:
+            return self._show_frame(frame)
+        now = self.clock()
+        if now - self.last_stats_emit >= self.stats_interval:
+            record = {"event": "stats", "time": now}
+            record.update(self.current_stats())
+            self._emit_record(record)
+            self.last_stats_emit = now
+        return not self.stop_event.is_set()
+
+    def stop(self):
+        """Ask a running monitor to shut down after the current frame."""
+        self.stop_event.set()
+
+    def _install_signal_handlers(self):
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for name in ("SIGINT", "SIGTERM", "SIGHUP"):
+            sig = getattr(signal, name, None)
+            if sig is not None:
+                signal.signal(sig, lambda signum, _frame: self.stop())
+
+    def run(self, pipelined=False):
+        print("Starting Eye Strain Monitor...")
+        if self.headless:
+            self._install_signal_handlers()
+        else:
+            print("Press 'q' to quit, 's' to save statistics.")
+        cap = self._open_camera()
+        if cap is None:
+            return
+        if pipelined:
+            self._run_pipelined(cap)
+            return
+        record = self.profiler.record
         try:
-            while True:
+            while not self.stop_event.is_set():
+                t0 = time.perf_counter()
                 ret, frame = cap.read()
                 if not ret or frame is None:
                     print("Warning: failed to read frame from webcam.")
                     break
-                frame = cv2.flip(frame, 1)
+                t1 = time.perf_counter()
+                if self.draw_overlay:
+                    frame = cv2.flip(frame, 1)
                 gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                t2 = time.perf_counter()
                 avg_ear, faces_detected = self.detect_eyes_and_calculate_ear(frame, gray)
-                
-                # Calculate current blink rate for logging
-                session_duration = time.time() - self.session_start_time
-                denom = max(min(session_duration, 300.0), 1.0)
-                current_blink_rate = len(self.blink_history) * 60.0 / denom
-                
-                if faces_detected:
-                    self.ear_history.append(avg_ear)
-                    if avg_ear < self.EAR_THRESHOLD:
-                        self.eye_closed_counter += 1
-                    else:
-                        if self.eye_closed_counter >= self.EAR_CONSEC_FRAMES:
-                            if time.time() - self.last_blink_time > 0.25:  # 250ms cooldown
-                                self.blink_counter += 1
-                                self.last_blink_time = time.time()
-                                self.blink_history.append(time.time())
-                        self.eye_closed_counter = 0
-                    if avg_ear < self.DROWSY_THRESHOLD:
-                        self.drowsy_counter += 1
-                        if self.drowsy_counter >= self.DROWSY_CONSEC_FRAMES:
-                            self.show_alert_popup("DROWSINESS DETECTED: Take a break!", "drowsy")
-                            self.play_alert_sound("drowsy")
-                            self.session_data['drowsy_episodes'] += 1
-                            
-                            # NEW: Log fatigue alert
-                            self.alert_logger.log_alert(
-                                alert_type="Fatigue Detected",
-                                severity="High",
-                                details=f"Eye openness = {avg_ear:.3f} (very tired)"
-                            )
-                            
-                            self.drowsy_counter = 0
-                    else:
-                        self.drowsy_counter = 0
-
-                    # Blink alert if too long without blinking
-                    if time.time() - self.last_blink_time > self.BLINK_ALERT_TIME:
-                        self.show_alert_popup("Blink Reminder: Please blink!", "blink")
-                        self.play_alert_sound("blink")
-                        
-                        # NEW: Log blink frequency alert
-                        blink_severity = self.alert_logger.calculate_blink_severity(current_blink_rate)
-                        self.alert_logger.log_alert(
-                            alert_type="Blink Frequency",
-                            severity=blink_severity,
-                            details=f"Blink rate = {current_blink_rate:.1f} blinks/min"
-                        )
-                        
-                        self.last_blink_time = time.time()
-
-                    # Break reminder
-                    if time.time() - self.last_break_reminder > self.BREAK_REMINDER_TIME:
-                        self.show_alert_popup("20 min passed: Look away for 20 sec", "break")
-                        self.play_alert_sound("break")
-                        
-                        # NEW: Log screen exposure alert
-                        exposure_severity = self.alert_logger.calculate_exposure_severity(session_duration / 60)
-                        self.alert_logger.log_alert(
-                            alert_type="Screen Exposure",
-                            severity=exposure_severity,
-                            details=f"Continuous screen time = {session_duration/60:.1f} minutes"
-                        )
-                        
-                        self.last_break_reminder = time.time()
-                        self.session_data['break_reminders'] += 1
-
-                    # Long session warning
-                    if time.time() - self.session_start_time > self.LONG_SESSION_TIME:
-                        self.show_alert_popup("1 hour session: Take a proper break!", "break")
-                        self.play_alert_sound("break")
-                        
-                        # NEW: Log extended session alert
-                        self.alert_logger.log_alert(
-                            alert_type="Screen Exposure",
-                            severity="Critical",
-                            details=f"Extended session = {session_duration/3600:.1f} hours continuous"
-                        )
-                        
-                        self.session_start_time = time.time()
+                t3 = time.perf_counter()
+                self.update_state(avg_ear, faces_detected)
+                t4 = time.perf_counter()
 
                 # Overlay stats + alerts
-                self.draw_statistics(frame)
-                cv2.imshow("Eye Strain Monitor", frame)
+                keep_running = self._present(frame)
+                record("capture", t1 - t0)
+                record("preprocess", t2 - t1)
+                record("alerts", t4 - t3)
+                record("frame", time.perf_counter() - t0)
+                if not keep_running:
+                    break
 
-                # Handle keypress
-                key = cv2.waitKey(1) & 0xFF
-                if key == ord("q"):
+        finally:
+            cap.release()
+            if not self.headless:
+                cv2.destroyAllWindows()
+            self._shutdown()
+
+    def _run_pipelined(self, cap):
+        """Run capture, detection and render/alerts as overlapping stages.
+
+        Capture and detection each run on their own thread and hand work on
+        through single-slot queues; when a downstream stage falls behind the
+        stale item is dropped so the render stage always sees the newest frame.
+        Detection results are never dropped: every (EAR, face) sample goes
+        through an unbounded queue and reaches update_state(), as blink and
+        drowsiness counting need consecutive frames. Rendering stays on the
+        main thread because HighGUI requires it.
+        """
+        stop = self.stop_event
+        record = self.profiler.record
+        frames = queue.Queue(maxsize=1)
+        display = queue.Queue(maxsize=1)
+        samples = queue.Queue()
+
+        def capture_loop():
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret or frame is None:
+                    print("Warning: failed to read frame from webcam.")
+                    stop.set()
                     break
-                elif key == ord("s"):
-                    self.save_session_data()
+                record("capture", time.perf_counter() - t0)
+                if _put_latest(frames, (frame, t0)):
+                    self.profiler.record_drop()
+
+        def detect_loop():
+            while not stop.is_set():
+                try:
+                    frame, t_captured = frames.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                t0 = time.perf_counter()
+                if self.draw_overlay:
+                    frame = cv2.flip(frame, 1)
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                record("preprocess", time.perf_counter() - t0)
+                avg_ear, faces_detected = self.detect_eyes_and_calculate_ear(frame, gray)
+                # the frame first, so it is in place when its sample is taken
+                if _put_latest(display, (frame, t_captured)):
+                    self.profiler.record_drop()
+                samples.put((avg_ear, faces_detected, self.clock()))
 
+        workers = [threading.Thread(target=capture_loop, name="est-capture", daemon=True),
+                   threading.Thread(target=detect_loop, name="est-detect", daemon=True)]
+        for w in workers:
+            w.start()
+
+        try:
+            while not stop.is_set():
+                try:
+                    sample = samples.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                while sample is not None:
+                    t0 = time.perf_counter()
+                    self.update_state(*sample)
+                    record("alerts", time.perf_counter() - t0)
+                    try:
+                        sample = samples.get_nowait()
+                    except queue.Empty:
+                        sample = None
+                try:
+                    frame, t_captured = display.get_nowait()
+                except queue.Empty:
+                    continue  # the newest frame is already on screen
+                keep_running = self._present(frame)
+                # capture-to-display latency of this frame
+                record("frame", time.perf_counter() - t_captured)
+                if not keep_running:
+                    break
         finally:
+            stop.set()
+            for w in workers:
+                w.join(timeout=1.0)
+            # samples detected while the loop was stopping still count
+            while not samples.empty():
+                self.update_state(*samples.get_nowait())
             cap.release()
-            cv2.destroyAllWindows()
+            if not self.headless:
+                cv2.destroyAllWindows()
+            self._shutdown()
+
+    def _shutdown(self):
+        """Final report and save; the session log and audio close even if saving fails."""
+        try:
+            self._report_profile()
             self.save_session_data(final=True)
+        finally:
+            self.close_session()
+            self.close_audio()
 
     def save_session_data(self, final=False):
-        """Save session stats to a JSON log file."""
-        self.session_data['end_time'] = datetime.datetime.now().isoformat()
+        """Save session stats to a JSON log file (and the session store, if any).
+
+        With log_alerts=False there is no eye_strain_logs/ and no JSON is written.
+        """
+        # same clock as start_time, so end_time - start_time is the session length
+        # (session_duration restarts when the long_session alert fires)
+        self.session_data['end_time'] = datetime.datetime.fromtimestamp(self.clock()).isoformat()
         self.session_data['total_blinks'] = self.blink_counter
-        self.session_data['session_duration'] = time.time() - self.session_start_time
-        self.session_data['avg_ear'] = float(np.mean(self.ear_history)) if self.ear_history else 0.0
+        self.session_data['session_duration'] = self.clock() - self.session_start_time
+        self.session_data['avg_ear'] = self.rolling.session_ear_mean()
 
-        fname = datetime.datetime.now().strftime("eye_strain_logs/session_%Y%m%d_%H%M%S.json")
+        if self.store is not None:
+            try:
+                self.store.save_session(self.session_id, self.session_data)
+            except Exception as e:
+                print(f"Warning: Could not store session: {e}")
+        if not self.log_alerts:
+            return
+
+        fname = datetime.datetime.now().strftime("eye_strain_logs/session_%Y%m%d_%H%M%S")
+        fname += f"_{self.name}.json" if self.name else ".json"
         with open(fname, "w") as f:
             json.dump(self.session_data, f, indent=2)
 
@@ -569,5 +1654,67 @@ class EyeStrainMonitor:
 
 
 if __name__ == "__main__":
-    monitor = EyeStrainMonitor()
-    monitor.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pipelined", action="store_true",
+                        help="Overlap capture, detection and rendering on separate threads")
+    parser.add_argument("--track", action="store_true",
+                        help="Track the face in a ROI between periodic full-frame detections")
+    parser.add_argument("--redetect-every", type=int, default=15,
+                        help="Frames between full-frame detections in --track mode")
+    parser.add_argument("--detect-scale", type=float, default=1.0,
+                        help="Downscale factor for face detection (landmarks stay full resolution)")
+    parser.add_argument("--detect-budget-ms", type=float,
+                        help="Pick the detection downscale automatically to stay within this budget")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run without a window; stream JSON-lines stats instead")
+    parser.add_argument("--stats-file", default="-",
+                        help="Where headless stats go ('-' for stdout)")
+    parser.add_argument("--stats-interval", type=float, default=1.0,
+                        help="Seconds between headless stats records")
+    parser.add_argument("--profile-overlay", action="store_true",
+                        help="Draw per-stage p50/p95/p99 frame timings on the video")
+    parser.add_argument("--profile-out", metavar="JSON",
+                        help="Write the per-stage timing summary here on exit")
+    parser.add_argument("--fast-start", action="store_true",
+                        help="Start on Haar cascades immediately; load dlib and audio in the background")
+    parser.add_argument("--user", help="Learn and cache per-user EAR thresholds (see calibration.py)")
+    parser.add_argument("--recalibrate", action="store_true",
+                        help="Ignore the cached calibration for --user and start over")
+    parser.add_argument("--alert-rules", help="JSON file overriding or adding alert rules (see alert_rules.py)")
+    parser.add_argument("--record", action="store_true",
+                        help="Record per-frame EAR/events to session_recordings/ (compact .npy chunks)")
+    parser.add_argument("--store", metavar="DB",
+                        help="Also write alerts/sessions to this SQLite store (see session_store.py)")
+    parser.add_argument("--alert-fsync", choices=AlertLogger.FSYNC_POLICIES, default="none",
+                        help="fsync the alert log after every batch, once on close, or never")
+    parser.add_argument("--alert-flush-interval", type=float, default=1.0,
+                        help="Seconds of alerts batched into one alert log write")
+    parser.add_argument("--compact-alerts", nargs="+", metavar="JSONL",
+                        help="Convert alerts_<session>.jsonl logs to JSON arrays and exit")
+    args = parser.parse_args()
+
+    if args.compact_alerts:
+        for path in args.compact_alerts:
+            print(f"{path} → {compact_alert_log(path)}")
+        sys.exit(0)
+
+    stats_stream = sys.stdout
+    if args.headless and args.stats_file != "-":
+        stats_stream = open(args.stats_file, "a")
+    # In headless mode keep stdout clean for the JSON-lines feed; diagnostics go to stderr.
+    output = contextlib.redirect_stdout(sys.stderr) if args.headless else contextlib.nullcontext()
+    with output:
+        monitor = EyeStrainMonitor(track_faces=args.track, headless=args.headless,
+                                   stats_stream=stats_stream,
+                                   stats_interval=args.stats_interval,
+                                   profile_overlay=args.profile_overlay,
+                                   profile_path=args.profile_out,
+                                   fast_start=args.fast_start,
+                                   detect_scale=args.detect_scale,
+                                   detect_budget_ms=args.detect_budget_ms,
+                                   record=args.record, alert_rules=args.alert_rules,
+                                   user=args.user, recalibrate=args.recalibrate,
+                                   store=args.store, alert_fsync=args.alert_fsync,
+                                   alert_flush_interval=args.alert_flush_interval)
+        monitor.REDETECT_INTERVAL = args.redetect_every
+        monitor.run(pipelined=args.pipelined)
\ No newline at end of file
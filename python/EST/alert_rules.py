@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Declarative alert rules for the Eye Strain Monitor.
+
+A rule describes what an alert shows, plays and logs; the AlertEngine
+decides when it fires. There are two kinds of rule:
+
+- "timer" rules fire `interval` seconds after they were last armed (blink
+  reminder, 20-minute break, long session). Deadlines sit in a hashed timer
+  wheel, and a frame where nothing is due costs one comparison. A timer
+  rule re-arms itself when it fires, and is re-armed early by any of the
+  signals in its `restart_on` list (e.g. a detected blink).
+- "trigger" rules fire when the monitor reports the signal named in
+  their `on` field (their name by default). The monitor reports every
+  signal in TRIGGER_SIGNALS through AlertEngine.notify(); rules on any
+  other signal are rejected when they are loaded.
+
+Every rule fires at most once per timestamp and not again within its
+`cooldown` seconds.
+
+Rules are plain dicts, so they can be overridden or extended from a JSON
+file (EyeStrainMonitor(alert_rules=...) / ESTv4.py --alert-rules):
+
+  [{"name": "blink_reminder", "interval": 30, "cooldown": 10},
+   {"name": "posture", "interval": 900, "message": "Check your posture",
+    "log_type": "Posture", "severity": "Low", "details": "{session_minutes:.0f} min in"}]
+
+  [{"name": "blink_log", "kind": "trigger", "on": "blink", "log_type": "Blink",
+    "details": "{blink_rate:.1f} blinks/min", "sound": false}]
+
+A string interval names an EyeStrainMonitor attribute (BLINK_ALERT_TIME, ...).
+`severity` and `details` are format strings over the alert context built by
+the monitor: ear, blink_rate, blink_severity, session_minutes,
+session_hours and exposure_severity.
+"""
+
+import json
+
+# Signals EyeStrainMonitor reports to AlertEngine.notify()
+TRIGGER_SIGNALS = (
+    "blink",    # a blink was counted
+    "drowsy",   # eyes below DROWSY_THRESHOLD for DROWSY_CONSEC_FRAMES frames
+)
+
+# Field defaults for every rule
+RULE_FIELDS = {
+    "name": None,
+    "kind": "timer",          # "timer" or "trigger"
+    "interval": None,         # seconds, or the name of a monitor attribute
+    "on": None,               # trigger rules: signal that fires them (default: the name)
+    "cooldown": 0.0,          # minimum seconds between two firings
+    "message": "",            # popup text (no popup when empty)
+    "alert_type": "info",     # popup colour and sound: blink, drowsy, break, info
+    "sound": True,
+    "log_type": None,         # AlertLogger type (not logged when None)
+    "severity": "Low",
+    "details": "",
+    "event": None,            # session_recorder EVENT_NAMES entry
+    "restart_on": [],         # signals that re-arm a timer rule
+    "resets": [],             # monitor attributes set to the firing time
+    "counts": None,           # session_data counter incremented on firing
+    "enabled": True,
+}
+
+DEFAULT_ALERT_RULES = [
+    {"name": "drowsy", "kind": "trigger",
+     "message": "DROWSINESS DETECTED: Take a break!", "alert_type": "drowsy",
+     "log_type": "Fatigue Detected", "severity": "High",
+     "details": "Eye openness = {ear:.3f} (very tired)",
+     "event": "drowsy", "counts": "drowsy_episodes"},
+    {"name": "blink_reminder", "interval": "BLINK_ALERT_TIME",
+     "message": "Blink Reminder: Please blink!", "alert_type": "blink",
+     "log_type": "Blink Frequency", "severity": "{blink_severity}",
+     "details": "Blink rate = {blink_rate:.1f} blinks/min",
+     "event": "blink_alert", "restart_on": ["blink"], "resets": ["last_blink_time"]},
+    {"name": "break_reminder", "interval": "BREAK_REMINDER_TIME",
+     "message": "20 min passed: Look away for 20 sec", "alert_type": "break",
+     "log_type": "Screen Exposure", "severity": "{exposure_severity}",
+     "details": "Continuous screen time = {session_minutes:.1f} minutes",
+     "event": "break_alert", "resets": ["last_break_reminder"], "counts": "break_reminders"},
+    {"name": "long_session", "interval": "LONG_SESSION_TIME",
+     "message": "1 hour session: Take a proper break!", "alert_type": "break",
+     "log_type": "Screen Exposure", "severity": "Critical",
+     "details": "Extended session = {session_hours:.1f} hours continuous",
+     "event": "long_session", "resets": ["session_start_time"]},
+]
+
+
+def validate_rule(spec):
+    """Check a rule dict; returns it merged with RULE_FIELDS. Raises ValueError."""
+    unknown = set(spec) - set(RULE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown alert rule field(s): {', '.join(sorted(unknown))}")
+    fields = dict(RULE_FIELDS, **spec)
+    name = fields["name"]
+    if not name:
+        raise ValueError("Alert rule needs a name")
+    if fields["kind"] not in ("timer", "trigger"):
+        raise ValueError(f"Alert rule {name}: kind must be 'timer' or 'trigger'")
+    if fields["kind"] == "trigger":
+        fields["on"] = fields["on"] or name
+        if fields["on"] not in TRIGGER_SIGNALS:
+            raise ValueError(f"Alert rule {name}: trigger rules fire on one of "
+                             f"{', '.join(TRIGGER_SIGNALS)} (set 'on'), not {fields['on']!r}")
+    elif fields["interval"] is None:
+        raise ValueError(f"Alert rule {name}: timer rules need an interval")
+    return fields
+
+
+class AlertRule:
+    """One validated rule; attributes mirror RULE_FIELDS."""
+
+    def __init__(self, spec, order=0):
+        fields = validate_rule(spec)
+        if fields["kind"] == "timer" and not isinstance(fields["interval"], (int, float)):
+            raise ValueError(f"Alert rule {fields['name']}: timer rules need a numeric interval")
+        self.__dict__.update(fields)
+        self.order = order
+
+    def __repr__(self):
+        return f"AlertRule({self.name!r}, kind={self.kind!r})"
+
+
+def load_rules(overrides=None, defaults=DEFAULT_ALERT_RULES):
+    """Merge rule overrides (list of dicts or a JSON file path) into the defaults.
+
+    Overrides with the name of a default rule replace its fields; other
+    names add new rules. Returns rule dicts in firing order; raises
+    ValueError for an invalid rule (e.g. a trigger on an unknown signal).
+    """
+    if isinstance(overrides, str):
+        with open(overrides) as f:
+            overrides = json.load(f)
+    rules = {spec["name"]: dict(spec) for spec in defaults}
+    for spec in overrides or []:
+        if "name" not in spec:
+            raise ValueError("Alert rule override needs a name")
+        rules.setdefault(spec["name"], {}).update(spec)
+    for spec in rules.values():
+        validate_rule(spec)
+    return list(rules.values())
+
+
+class TimerWheel:
+    """Hashed timer wheel: schedule(deadline, item), advance(now) -> due items.
+
+    Deadlines are bucketed into `slots` slots of `resolution` seconds each.
+    advance() only visits the slots passed since the previous call (at most
+    one revolution), so per-frame cost does not grow with the number of
+    pending timers. An item is due once now > deadline.
+    """
+
+    def __init__(self, start=0.0, resolution=0.25, slots=512):
+        self.resolution = resolution
+        self._slots = [[] for _ in range(slots)]
+        self._tick = int(start // resolution)
+        self._pending = 0
+
+    def __len__(self):
+        return self._pending
+
+    def schedule(self, deadline, item):
+        tick = max(int(deadline // self.resolution), self._tick)
+        self._slots[tick % len(self._slots)].append((deadline, item))
+        self._pending += 1
+
+    def advance(self, now):
+        target = int(now // self.resolution)
+        due = []
+        if self._pending:
+            n = len(self._slots)
+            for tick in range(self._tick, min(target, self._tick + n - 1) + 1):
+                slot = self._slots[tick % n]
+                if not slot:
+                    continue
+                keep = [entry for entry in slot if entry[0] >= now]
+                if len(keep) != len(slot):
+                    due += [entry for entry in slot if entry[0] < now]
+                    self._slots[tick % n] = keep
+            self._pending -= len(due)
+        self._tick = max(self._tick, target)
+        return due
+
+
+class AlertEngine:
+    """Schedules timer rules, applies cooldowns and reports which rules fire."""
+
+    def __init__(self, rules, now, resolution=0.25):
+        self.rules = {}
+        for i, spec in enumerate(rules):
+            rule = spec if isinstance(spec, AlertRule) else AlertRule(spec, i)
+            if rule.enabled:
+                self.rules[rule.name] = rule
+        self._wheel = TimerWheel(now, resolution)
+        self._deadlines = {}
+        self._next_due = float("inf")   # lower bound on the earliest live deadline
+        self._last_fired = {}
+        self._restart = {}
+        self._triggers = {}
+        for rule in self.rules.values():
+            for signal in rule.restart_on:
+                self._restart.setdefault(signal, []).append(rule.name)
+            if rule.kind == "timer":
+                self.arm(rule.name, now)
+            else:
+                self._triggers.setdefault(rule.on, []).append(rule)
+
+    def arm(self, name, now):
+        """(Re)start a timer rule's countdown from `now`."""
+        deadline = now + self.rules[name].interval
+        self._deadlines[name] = deadline
+        self._next_due = min(self._next_due, deadline)
+        self._wheel.schedule(deadline, name)
+
+    def notify(self, signal, now):
+        """Report a monitor signal (TRIGGER_SIGNALS) at `now`.
+
+        Re-arms every timer rule that restarts on it and returns the
+        trigger rules on it that fire, in rule order.
+        """
+        for name in self._restart.get(signal, ()):
+            self.arm(name, now)
+        return [rule for rule in self._triggers.get(signal, ()) if self._allow(rule, now)]
+
+    def _allow(self, rule, now):
+        last = self._last_fired.get(rule.name)
+        if last is not None and (now <= last or now - last < rule.cooldown):
+            return False
+        self._last_fired[rule.name] = now
+        return True
+
+    def trigger(self, name, now):
+        """Fire one trigger rule by name, ignoring its signal; returns the rule if it fires."""
+        rule = self.rules.get(name)
+        if rule is None or not self._allow(rule, now):
+            return None
+        return rule
+
+    def advance(self, now):
+        """Rules whose timers expired by `now`, in rule order; re-arms them."""
+        if now <= self._next_due:
+            return ()  # the common case: nothing can be due yet
+        fired = []
+        self._next_due = float("inf")
+        for deadline, name in self._wheel.advance(now):
+            if self._deadlines.get(name) != deadline:
+                continue  # re-armed since this entry was scheduled
+            rule = self.rules[name]
+            self.arm(name, now)
+            if self._allow(rule, now):
+                fired.append(rule)
+        if self._deadlines:
+            self._next_due = min(self._deadlines.values())
+        if len(fired) > 1:
+            fired.sort(key=lambda r: r.order)
+        return fired
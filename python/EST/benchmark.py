@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the Eye Strain Monitor detection paths.
+
+Times _detect_with_dlib, _detect_with_haar and the EAR computation on a
+fixed, seeded corpus of frames at several resolutions and face counts, and
+reports fps, per-call latency percentiles and peak memory. No webcam or
+display is needed. Results are written as JSON so runs can be compared
+over time (--compare).
+
+The corpus is synthetic by default (cartoon faces drawn with a fixed seed);
+pass --frames DIR to use recorded frames instead, resized to each
+resolution.
+
+Usage:
+  python benchmark.py --out bench/$(date +%Y%m%d).json
+  python benchmark.py --methods haar --scale-factors 1.1 1.2 1.3 --min-neighbors 3 5
+  python benchmark.py --compare bench/old.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+import ESTv4
+from ESTv4 import EyeStrainMonitor, batch_ear
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def synthetic_frame(width, height, faces, rng):
+    """Draw a noisy background with `faces` cartoon faces (skin ellipse, eyes, mouth)."""
+    frame = rng.integers(40, 90, size=(height, width, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (0, 0), 3)
+    face_w = max(40, width // (2 * max(faces, 1)))
+    for i in range(faces):
+        cx = int((i + 0.5) * width / faces)
+        cy = int(height * rng.uniform(0.4, 0.6))
+        w, h = face_w, int(face_w * 1.3)
+        cv2.ellipse(frame, (cx, cy), (w // 2, h // 2), 0, 0, 360, (150, 180, 220), -1)
+        for side in (-1, 1):
+            ex, ey = cx + side * w // 5, cy - h // 8
+            cv2.ellipse(frame, (ex, ey), (w // 10, w // 20), 0, 0, 360, (255, 255, 255), -1)
+            cv2.circle(frame, (ex, ey), max(w // 30, 1), (30, 30, 30), -1)
+            cv2.line(frame, (ex - w // 9, ey - w // 8), (ex + w // 9, ey - w // 8), (40, 40, 60), 2)
+        cv2.ellipse(frame, (cx, cy + h // 4), (w // 6, w // 16), 0, 0, 180, (60, 60, 150), 2)
+    return frame
+
+
+def load_frames(frames_dir):
+    names = sorted(n for n in os.listdir(frames_dir)
+                   if n.lower().endswith((".png", ".jpg", ".jpeg", ".bmp")))
+    frames = [cv2.imread(os.path.join(frames_dir, n)) for n in names]
+    return [f for f in frames if f is not None]
+
+
+def build_corpus(resolutions, face_counts, frames_per_case, seed=0, frames_dir=None):
+    """{(width, height, faces): [(frame, gray), ...]}; faces is None for recorded frames."""
+    corpus = {}
+    recorded = load_frames(frames_dir) if frames_dir else None
+    for width, height in resolutions:
+        if recorded:
+            frames = [cv2.resize(f, (width, height), interpolation=cv2.INTER_AREA)
+                      for f in recorded[:frames_per_case]]
+            corpus[(width, height, None)] = [(f, cv2.cvtColor(f, cv2.COLOR_BGR2GRAY)) for f in frames]
+            continue
+        for faces in face_counts:
+            rng = np.random.default_rng([seed, width, height, faces])
+            frames = [synthetic_frame(width, height, faces, rng) for _ in range(frames_per_case)]
+            corpus[(width, height, faces)] = [(f, cv2.cvtColor(f, cv2.COLOR_BGR2GRAY)) for f in frames]
+    return corpus
+
+
+def latency_stats(latencies):
+    lat = np.asarray(latencies, dtype=np.float64) * 1000.0
+    total = lat.sum()
+    return {
+        "calls": int(lat.size),
+        "fps": float(lat.size * 1000.0 / total) if total > 0 else 0.0,
+        "mean_ms": float(lat.mean()),
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p90_ms": float(np.percentile(lat, 90)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "min_ms": float(lat.min()),
+        "max_ms": float(lat.max()),
+    }
+
+
+def time_calls(fn, inputs, repeat, warmup=2):
+    """Call fn(*args) for every input, `repeat` times; returns (latencies, peak_bytes, results).
+
+    Peak Python-heap memory is measured in a separate untimed pass, because
+    tracemalloc slows every allocation down.
+    """
+    for args in inputs[:warmup]:
+        fn(*args)
+    latencies, results = [], []
+    for _ in range(repeat):
+        for args in inputs:
+            t0 = time.perf_counter()
+            out = fn(*args)
+            latencies.append(time.perf_counter() - t0)
+            results.append(out)
+    tracemalloc.start()
+    for args in inputs:
+        fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latencies, peak, results
+
+
+def bench_detection(monitor, method, corpus, repeat, params):
+    """Benchmark one detection path over the whole corpus with the given Haar params."""
+    monitor.detection_method = method
+    for name, value in params.items():
+        setattr(monitor, name, value)
+    detect = monitor._detect_with_dlib if method == "dlib" else monitor._detect_with_haar
+    cases = []
+    for (width, height, faces), frames in corpus.items():
+        monitor.reset_session()
+        # the detectors draw on the frame they are given when overlays are on
+        inputs = [(frame.copy(), gray) for frame, gray in frames]
+        latencies, peak, results = time_calls(detect, inputs, repeat)
+        case = {"method": method, "width": width, "height": height, "faces": faces,
+                "params": params, "peak_python_bytes": peak,
+                "face_hit_rate": float(np.mean([found for _, found in results]))}
+        case.update(latency_stats(latencies))
+        cases.append(case)
+        print(f"{method:5s} {width}x{height} faces={faces}: {case['fps']:7.1f} fps  "
+              f"p50 {case['p50_ms']:.2f} ms  p99 {case['p99_ms']:.2f} ms", file=sys.stderr)
+    return cases
+
+
+def bench_ear(monitor, face_counts, repeat, seed=0):
+    """Per-eye calculate_ear (as the old dlib path did) against batch_ear on (N, 68, 2)."""
+    rng = np.random.default_rng(seed)
+    cases = []
+    for faces in face_counts:
+        if faces == 0:
+            continue
+        landmarks = rng.uniform(0, 480, size=(200, faces, 68, 2)).astype(np.float32)
+
+        def per_eye(lm):
+            return [(monitor.calculate_ear(f[ESTv4.LEFT_EYE_SLICE]) +
+                     monitor.calculate_ear(f[ESTv4.RIGHT_EYE_SLICE])) / 2.0 for f in lm]
+
+        for name, fn in (("calculate_ear", per_eye), ("batch_ear", batch_ear)):
+            latencies, peak, _ = time_calls(fn, [(lm,) for lm in landmarks], repeat)
+            case = {"method": name, "faces": faces, "peak_python_bytes": peak}
+            case.update(latency_stats(latencies))
+            cases.append(case)
+    return cases
+
+
+def environment():
+    return {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "dlib": ESTv4.dlib.__version__ if ESTv4.DLIB_AVAILABLE else None,
+        "cv2_threads": cv2.getNumThreads(),
+    }
+
+
+def _case_key(case):
+    return (case["method"], case.get("width"), case.get("height"), case.get("faces"),
+            json.dumps(case.get("params"), sort_keys=True))
+
+
+def compare(current, previous_path):
+    """Print the fps change of every case that also appears in a previous result file."""
+    with open(previous_path) as f:
+        previous = {_case_key(c): c for c in json.load(f)["cases"]}
+    print(f"Compared with {previous_path}:")
+    for case in current["cases"]:
+        old = previous.get(_case_key(case))
+        if old is None or not old["fps"]:
+            continue
+        change = (case["fps"] - old["fps"]) / old["fps"] * 100.0
+        label = f"faces={case.get('faces')}"
+        if case.get("width"):
+            label = f"res={case['width']}x{case['height']} {label}"
+        print(f"  {case['method']:13s} {label:24s} {old['fps']:8.1f} → {case['fps']:8.1f} fps ({change:+.1f}%)")
+
+
+def _parse_resolution(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EST face detection and EAR computation")
+    parser.add_argument("--resolutions", type=_parse_resolution, nargs="+",
+                        default=[(320, 240), (640, 480), (1280, 720)])
+    parser.add_argument("--faces", type=int, nargs="+", default=[0, 1, 3],
+                        help="Face counts for the synthetic corpus")
+    parser.add_argument("--frames", dest="frames_dir", help="Directory of recorded frames to use instead")
+    parser.add_argument("--frames-per-case", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--methods", nargs="+", choices=["dlib", "haar"], default=["dlib", "haar"])
+    parser.add_argument("--scale-factors", type=float, nargs="+", default=[1.3],
+                        help="Haar face scaleFactor values to sweep")
+    parser.add_argument("--min-neighbors", type=int, nargs="+", default=[5],
+                        help="Haar face minNeighbors values to sweep")
+    parser.add_argument("--threads", type=int, help="cv2.setNumThreads for the run")
+    parser.add_argument("--out", help="Result JSON path (default: benchmarks/bench_<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous result JSON to compare against")
+    args = parser.parse_args()
+
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+
+    with contextlib.redirect_stdout(sys.stderr):
+        monitor = EyeStrainMonitor(headless=True, stats_stream=open(os.devnull, "w"),
+                                   audio=False, log_alerts=False)
+        if monitor.detection_method == "dlib":
+            monitor._initialize_haar_cascades()  # make both paths available
+    methods = [m for m in args.methods if m != "dlib" or monitor.detection_method == "dlib"]
+    if len(methods) < len(args.methods):
+        print("Note: dlib path unavailable, skipping it.", file=sys.stderr)
+
+    corpus = build_corpus(args.resolutions, args.faces, args.frames_per_case,
+                          args.seed, args.frames_dir)
+
+    cases = []
+    for method in methods:
+        if method == "dlib":
+            cases += bench_detection(monitor, "dlib", corpus, args.repeat, {})
+            continue
+        for scale_factor in args.scale_factors:
+            for min_neighbors in args.min_neighbors:
+                params = {"HAAR_SCALE_FACTOR": scale_factor, "HAAR_MIN_NEIGHBORS": min_neighbors}
+                cases += bench_detection(monitor, "haar", corpus, args.repeat, params)
+    cases += bench_ear(monitor, args.faces, args.repeat, args.seed)
+
+    result = {"environment": environment(),
+              "config": {"resolutions": args.resolutions, "faces": args.faces,
+                         "frames_dir": args.frames_dir, "frames_per_case": args.frames_per_case,
+                         "repeat": args.repeat, "seed": args.seed},
+              "cases": cases}
+    if resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        result["peak_rss_bytes"] = maxrss if platform.system() == "Darwin" else maxrss * 1024
+
+    out = args.out or datetime.datetime.now().strftime("benchmarks/bench_%Y%m%d_%H%M%S.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved benchmark results → {out}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Per-user EAR calibration for the Eye Strain Monitor.
+
+The default EAR_THRESHOLD / DROWSY_THRESHOLD come from one person's
+measurements (open 0.350, closed 0.305). EARCalibrator estimates a user's
+own open-eye and closed-eye EAR levels from streaming quantiles of the EAR
+signal and derives the thresholds the same way:
+
+  EAR_THRESHOLD    = (open + closed) / 2
+  DROWSY_THRESHOLD = closed - DROWSY_MARGIN
+
+Quantiles are tracked with the P² algorithm (Jain & Chlamtac, 1985): five
+markers per quantile, O(1) memory and time per sample, no stored samples.
+
+On the first run the monitor keeps the defaults during a short calibration
+phase, then switches to the measured thresholds. After that the sketches
+restart every UPDATE_INTERVAL seconds and each window's estimate is blended
+into the thresholds, so they follow slow drift (lighting, fatigue, glasses).
+Thresholds are cached per user and detection method in calibration/, and
+load instantly on the next start. Updates are written by a short-lived
+writer thread, never on the frame path; flush() waits for it.
+
+Usage:
+  python ESTv4.py --user alice            # calibrate/adapt and cache
+  python ESTv4.py --user alice --recalibrate
+  python calibration.py alice             # show the cached thresholds
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import threading
+
+
+class P2Quantile:
+    """Streaming estimate of one quantile with the P² algorithm."""
+
+    def __init__(self, q):
+        self.q = q
+        self.count = 0
+        self._heights = []                       # marker heights
+        self._positions = [1, 2, 3, 4, 5]        # actual marker positions
+        self._desired = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self._increments = [0, q / 2, q, (1 + q) / 2, 1]
+
+    def add(self, x):
+        self.count += 1
+        h = self._heights
+        if self.count <= 5:
+            h.append(x)
+            h.sort()
+            return
+
+        # find the cell x falls in, extending the extremes if needed
+        if x < h[0]:
+            h[0] = x
+            k = 0
+        elif x >= h[4]:
+            h[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= h[k + 1]:
+                k += 1
+        pos, desired = self._positions, self._desired
+        for i in range(k + 1, 5):
+            pos[i] += 1
+        for i in range(5):
+            desired[i] += self._increments[i]
+
+        # nudge the middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = desired[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = self._parabolic(i, d)
+                if not h[i - 1] < candidate < h[i + 1]:
+                    candidate = h[i] + d * (h[i + d] - h[i]) / (pos[i + d] - pos[i])
+                h[i] = candidate
+                pos[i] += d
+
+    def _parabolic(self, i, d):
+        h, n = self._heights, self._positions
+        return h[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1]))
+
+    def value(self):
+        if self.count == 0:
+            return None
+        if self.count <= 5:
+            h = self._heights
+            return h[min(len(h) - 1, int(round(self.q * (len(h) - 1))))]
+        return self._heights[2]
+
+
+class EARCalibrator:
+    """Learns a user's EAR thresholds from the live EAR stream."""
+
+    OPEN_QUANTILE = 0.80       # eyes are open most of the time
+    CLOSED_QUANTILE = 0.02     # bottom of blink troughs
+    DROWSY_MARGIN = 0.01
+    MIN_GAP = 0.02             # open/closed must differ this much to trust an estimate
+    EAR_BOUNDS = (0.10, 0.50)
+    WARMUP_SECONDS = 30.0      # first calibration phase
+    MIN_SAMPLES = 300
+    UPDATE_INTERVAL = 60.0     # adaptation window
+    ADAPT_RATE = 0.2           # weight of each new window in the blend
+
+    def __init__(self, user, method, cache_dir="calibration", load=True):
+        self.user = user
+        self.method = method
+        self.path = os.path.join(cache_dir, f"{user}_{method}.json")
+        self.open_ear = self.closed_ear = None
+        self.ear_threshold = self.drowsy_threshold = None
+        self.calibrated = False
+        self.samples = 0
+        self._window_start = None
+        self._save_lock = threading.Lock()
+        self._pending_save = None
+        self._saver = None
+        self._reset_sketches()
+        if load:
+            self.load()
+
+    def _reset_sketches(self):
+        self._open = P2Quantile(self.OPEN_QUANTILE)
+        self._closed = P2Quantile(self.CLOSED_QUANTILE)
+
+    def load(self):
+        """Load cached thresholds; returns True when a usable cache was found."""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self._set_levels(data["open_ear"], data["closed_ear"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        self.samples = data.get("samples", 0)
+        self.calibrated = True
+        return True
+
+    def _snapshot(self):
+        return {"user": self.user, "method": self.method,
+                "open_ear": self.open_ear, "closed_ear": self.closed_ear,
+                "ear_threshold": self.ear_threshold, "drowsy_threshold": self.drowsy_threshold,
+                "samples": self.samples, "updated": datetime.datetime.now().isoformat()}
+
+    def _write(self, data):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def save(self):
+        """Write the current thresholds now (after any background save)."""
+        self.flush()
+        self._write(self._snapshot())
+
+    def save_later(self):
+        """Queue the current thresholds for the writer thread; only the newest is kept."""
+        with self._save_lock:
+            self._pending_save = self._snapshot()
+            if self._saver is None:
+                self._saver = threading.Thread(target=self._saver_loop,
+                                               name="calibration-writer", daemon=True)
+                self._saver.start()
+
+    def _saver_loop(self):
+        while True:
+            with self._save_lock:
+                data, self._pending_save = self._pending_save, None
+                if data is None:
+                    self._saver = None
+                    return
+            try:
+                self._write(data)
+            except OSError as e:
+                print(f"Warning: Could not save calibration: {e}")
+
+    def flush(self):
+        """Wait until queued saves are on disk."""
+        saver = self._saver
+        if saver is not None:
+            saver.join()
+
+    def _set_levels(self, open_ear, closed_ear):
+        lo, hi = self.EAR_BOUNDS
+        open_ear = min(max(float(open_ear), lo), hi)
+        closed_ear = min(max(float(closed_ear), lo), hi)
+        if open_ear - closed_ear < self.MIN_GAP:
+            raise ValueError("open and closed EAR levels too close")
+        self.open_ear, self.closed_ear = open_ear, closed_ear
+        self.ear_threshold = (open_ear + closed_ear) / 2
+        self.drowsy_threshold = closed_ear - self.DROWSY_MARGIN
+
+    @property
+    def thresholds(self):
+        return self.ear_threshold, self.drowsy_threshold
+
+    def add(self, now, ear):
+        """Feed one face-frame EAR; returns True when the thresholds changed."""
+        if self._window_start is None:
+            self._window_start = now
+        self._open.add(ear)
+        self._closed.add(ear)
+        self.samples += 1
+
+        window = now - self._window_start
+        if self.calibrated:
+            if window < self.UPDATE_INTERVAL or self._open.count < self.MIN_SAMPLES:
+                return False
+        elif window < self.WARMUP_SECONDS or self._open.count < self.MIN_SAMPLES:
+            return False
+
+        open_ear, closed_ear = self._open.value(), self._closed.value()
+        self._reset_sketches()
+        self._window_start = now
+        if open_ear - closed_ear < self.MIN_GAP:
+            return False  # e.g. no blinks in this window; keep what we have
+        if self.calibrated:
+            rate = self.ADAPT_RATE
+            open_ear = (1 - rate) * self.open_ear + rate * open_ear
+            closed_ear = (1 - rate) * self.closed_ear + rate * closed_ear
+        try:
+            self._set_levels(open_ear, closed_ear)
+        except ValueError:
+            return False
+        self.calibrated = True
+        self.save_later()
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show cached per-user EAR calibration")
+    parser.add_argument("user")
+    parser.add_argument("--cache-dir", default="calibration")
+    args = parser.parse_args()
+
+    prefix = f"{args.user}_"
+    names = sorted(n for n in os.listdir(args.cache_dir)
+                   if n.startswith(prefix) and n.endswith(".json")) \
+        if os.path.isdir(args.cache_dir) else []
+    if not names:
+        print(f"No calibration cached for {args.user} in {args.cache_dir}/")
+        sys.exit(1)
+    for name in names:
+        with open(os.path.join(args.cache_dir, name)) as f:
+            print(json.dumps(json.load(f), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Offline replay for the Eye Strain Monitor.
+
+Runs the same detection, EAR and blink/drowsiness logic as ESTv4 over
+recorded video files or directories of frames instead of the webcam.
+Timing comes from the frame timestamps (a FrameClock), so a recording is
+processed as fast as the CPU allows and still produces the same blinks and
+alerts it would have live. Files are spread across a process pool.
+
+Each file is decoded and run through face/eye detection once; the
+resulting per-frame EAR series is then re-scored for every
+(EAR_THRESHOLD, DROWSY_THRESHOLD) pair, which makes threshold sweeps cheap.
+
+Usage:
+  python replay.py recordings/*.mp4 --workers 8 --out results.jsonl
+  python replay.py frames_dir/ --fps 30 \\
+      --ear-thresholds 0.30 0.32 0.34 --drowsy-thresholds 0.27 0.29
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+from ESTv4 import EyeStrainMonitor
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+
+class FrameClock:
+    """Clock driven by frame timestamps; pass as EyeStrainMonitor(clock=...)."""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+def iter_frames(path, fps=30.0):
+    """Yield (seconds_from_start, frame) from a video file or frame directory.
+
+    Video timestamps come from the container when available; frame
+    directories are read in sorted filename order at the given fps.
+    """
+    if os.path.isdir(path):
+        names = sorted(n for n in os.listdir(path) if n.lower().endswith(IMAGE_EXTENSIONS))
+        for i, name in enumerate(names):
+            frame = cv2.imread(os.path.join(path, name))
+            if frame is not None:
+                yield i / fps, frame
+        return
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video {path}")
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or fps
+    try:
+        index = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                break
+            pos_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            yield (pos_ms / 1000.0 if pos_ms > 0 else index / video_fps), frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def extract_ear_series(monitor, path, fps=30.0):
+    """Run detection over a recording. Returns (times, ears, faces) arrays."""
+    monitor.reset_session()
+    times, ears, faces = [], [], []
+    for t, frame in iter_frames(path, fps):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        avg_ear, faces_detected = monitor.detect_eyes_and_calculate_ear(frame, gray)
+        times.append(t)
+        ears.append(avg_ear)
+        faces.append(faces_detected)
+    return (np.asarray(times, dtype=np.float64),
+            np.asarray(ears, dtype=np.float32),
+            np.asarray(faces, dtype=bool))
+
+
+def score_series(monitor, clock, series, start_time, ear_threshold=None,
+                 drowsy_threshold=None):
+    """Replay an EAR series through the monitor's blink/alert logic."""
+    times, ears, faces = series
+    clock.now = start_time
+    monitor.reset_session()
+    if ear_threshold is not None:
+        monitor.EAR_THRESHOLD = ear_threshold
+    if drowsy_threshold is not None:
+        monitor.DROWSY_THRESHOLD = drowsy_threshold
+
+    ear_sum = 0.0
+    for t, ear, face in zip(times.tolist(), ears.tolist(), faces.tolist()):
+        clock.now = start_time + t
+        monitor.update_state(ear, face)
+        if face:
+            ear_sum += ear
+
+    duration = float(times[-1]) if len(times) else 0.0
+    face_frames = int(faces.sum())
+    return {
+        "ear_threshold": monitor.EAR_THRESHOLD,
+        "drowsy_threshold": monitor.DROWSY_THRESHOLD,
+        "frames": int(len(times)),
+        "face_frames": face_frames,
+        "duration_s": duration,
+        "blinks": monitor.blink_counter,
+        "blink_rate": monitor.blink_counter * 60.0 / duration if duration > 0 else 0.0,
+        "drowsy_episodes": monitor.session_data['drowsy_episodes'],
+        "break_reminders": monitor.session_data['break_reminders'],
+        "alerts": dict(Counter(a["type"] for a in monitor.alert_logger.alerts)),
+        "avg_ear": ear_sum / face_frames if face_frames else 0.0,
+    }
+
+
+# One monitor per worker process, so detector models load once per worker
+_worker = None
+
+
+def _get_worker(track_faces):
+    global _worker
+    if _worker is None:
+        cv2.setNumThreads(1)  # parallelism comes from the process pool
+        clock = FrameClock()
+        with contextlib.redirect_stdout(sys.stderr):  # stdout carries results
+            monitor = EyeStrainMonitor(track_faces=track_faces, headless=True,
+                                       stats_stream=open(os.devnull, "w"),
+                                       clock=clock, audio=False, log_alerts=False)
+        _worker = (monitor, clock)
+    return _worker
+
+
+def replay_file(path, thresholds=((None, None),), fps=30.0, track_faces=True,
+                start_time=None):
+    """Replay one recording and score it for each (ear, drowsy) threshold pair."""
+    monitor, clock = _get_worker(track_faces)
+    defaults = (monitor.EAR_THRESHOLD, monitor.DROWSY_THRESHOLD)
+
+    t0 = time.perf_counter()
+    series = extract_ear_series(monitor, path, fps)
+    elapsed = time.perf_counter() - t0
+    duration = float(series[0][-1]) if len(series[0]) else 0.0
+    if start_time is None:
+        # best guess at when the recording started
+        start_time = os.path.getmtime(path) - duration
+
+    results = []
+    for ear_threshold, drowsy_threshold in thresholds:
+        result = score_series(monitor, clock, series, start_time,
+                              ear_threshold if ear_threshold is not None else defaults[0],
+                              drowsy_threshold if drowsy_threshold is not None else defaults[1])
+        result["file"] = path
+        result["processing_fps"] = len(series[0]) / elapsed if elapsed > 0 else 0.0
+        result["realtime_factor"] = duration / elapsed if elapsed > 0 else 0.0
+        results.append(result)
+    return results
+
+
+def _expand_inputs(inputs):
+    """Directories that contain videos are expanded; frame directories stay as one input."""
+    paths = []
+    for p in inputs:
+        if os.path.isdir(p):
+            entries = sorted(os.listdir(p))
+            if any(e.lower().endswith(IMAGE_EXTENSIONS) for e in entries):
+                paths.append(p)
+            else:
+                paths.extend(os.path.join(p, e) for e in entries
+                             if os.path.isfile(os.path.join(p, e)))
+        else:
+            paths.append(p)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded sessions through the EST blink logic")
+    parser.add_argument("inputs", nargs="+", help="Video files, frame directories, or directories of videos")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--fps", type=float, default=30.0, help="Frame rate for frame directories")
+    parser.add_argument("--ear-thresholds", type=float, nargs="*", default=[None],
+                        help="EAR_THRESHOLD values to sweep (default: monitor default)")
+    parser.add_argument("--drowsy-thresholds", type=float, nargs="*", default=[None],
+                        help="DROWSY_THRESHOLD values to sweep (default: monitor default)")
+    parser.add_argument("--no-track", action="store_true", help="Run full-frame detection on every frame")
+    parser.add_argument("--start-time", help="ISO timestamp of the recording start (default: from file mtime)")
+    parser.add_argument("--out", help="Write JSON-lines results here instead of stdout")
+    args = parser.parse_args()
+
+    thresholds = [(e, d) for e in (args.ear_thresholds or [None])
+                  for d in (args.drowsy_thresholds or [None])]
+    start_time = (datetime.datetime.fromisoformat(args.start_time).timestamp()
+                  if args.start_time else None)
+    paths = _expand_inputs(args.inputs)
+
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {pool.submit(replay_file, p, thresholds, args.fps,
+                                   not args.no_track, start_time): p for p in paths}
+            for fut in as_completed(futures):
+                try:
+                    for result in fut.result():
+                        out.write(json.dumps(result) + "\n")
+                    out.flush()
+                except Exception as e:
+                    print(f"Warning: replay of {futures[fut]} failed: {e}", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Compact binary per-frame recording of Eye Strain Monitor sessions.
+
+Every processed frame becomes one fixed-width record (timestamp, EAR,
+face-present flag, event bits; 14 bytes), so a full workday at 30 fps
+(about a million frames) is ~14 MB on disk. Records are buffered in a
+preallocated NumPy array and written as numbered .npy chunks in
+session_recordings/<session>/ whenever the buffer fills, plus once on close.
+The chunk being filled is an open .npy file with a fixed-size header: every
+flush_interval seconds of frame time (10 s by default) only the new records
+are appended and the header's record count is patched in place, so a crash
+loses at most that much and a flush never rewrites earlier records.
+
+SessionRecording memory-maps the chunks (or a consolidated single .npy),
+so analysis never has to read a whole day into memory.
+
+Usage:
+  python session_recorder.py summary session_recordings/20250101_090000
+  python session_recorder.py consolidate session_recordings/20250101_090000 day.npy
+"""
+
+import argparse
+import glob
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+RECORD_DTYPE = np.dtype([
+    ("t", "<f8"),       # unix timestamp of the frame
+    ("ear", "<f4"),     # average EAR (0.3 placeholder when no face)
+    ("face", "u1"),     # 1 if a face was detected
+    ("events", "u1"),   # EVENT_* bit flags
+])
+
+EVENT_BLINK = 1
+EVENT_DROWSY = 2
+EVENT_BLINK_ALERT = 4
+EVENT_BREAK_ALERT = 8
+EVENT_LONG_SESSION = 16
+EVENT_NAMES = {EVENT_BLINK: "blink", EVENT_DROWSY: "drowsy", EVENT_BLINK_ALERT: "blink_alert",
+               EVENT_BREAK_ALERT: "break_alert", EVENT_LONG_SESSION: "long_session"}
+
+NPY_HEADER_SIZE = 192   # fixed, so the record count can be rewritten in place
+
+
+def _npy_header(count):
+    """A version 1.0 .npy header for `count` records, padded to NPY_HEADER_SIZE bytes."""
+    header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (
+        np.lib.format.dtype_to_descr(RECORD_DTYPE), count)
+    header = header.ljust(NPY_HEADER_SIZE - 11) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+class SessionRecorder:
+    """Buffers per-frame records and streams them to chunked .npy files."""
+
+    def __init__(self, session_id, root="session_recordings", chunk_size=65536,
+                 flush_interval=10.0):
+        self.path = os.path.join(root, session_id)
+        os.makedirs(self.path, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self._last_write = None
+        self._buffer = np.zeros(chunk_size, dtype=RECORD_DTYPE)
+        self._count = 0
+        self._written = 0      # records of the current chunk already in its file
+        self._file = None
+        self._chunk_index = 0
+        self.total_records = 0
+        self._closed = False
+        meta = {"session_id": session_id, "dtype": RECORD_DTYPE.descr,
+                "events": {str(k): v for k, v in EVENT_NAMES.items()},
+                "chunk_size": chunk_size}
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    def append(self, t, ear, face, events=0):
+        if self._closed:
+            return
+        self._buffer[self._count] = (t, ear, face, events)
+        self._count += 1
+        self.total_records += 1
+        if self._last_write is None:
+            self._last_write = t
+        if self._count == self.chunk_size:
+            self.flush()
+        elif self.flush_interval and t - self._last_write >= self.flush_interval:
+            self._write_chunk(t)
+
+    def _write_chunk(self, t=None):
+        """Append the records buffered since the last write, then update the header."""
+        f = self._file
+        if f is None:
+            name = os.path.join(self.path, f"chunk_{self._chunk_index:05d}.npy")
+            f = self._file = open(name, "wb")
+            f.write(_npy_header(0))
+        # records before the count, so a reader never sees a count past the data
+        f.write(self._buffer[self._written:self._count].tobytes())
+        f.flush()
+        f.seek(0)
+        f.write(_npy_header(self._count))
+        f.seek(0, os.SEEK_END)
+        f.flush()
+        self._written = self._count
+        if t is not None:
+            self._last_write = t
+
+    def flush(self):
+        """Write the buffered records as a finished chunk and start the next one."""
+        if self._count == 0:
+            return
+        self._write_chunk(float(self._buffer[self._count - 1]["t"]))
+        self._file.close()
+        self._file = None
+        self._chunk_index += 1
+        self._count = self._written = 0
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+
+
+class SessionRecording:
+    """Read-only, memory-mapped view of a recording directory or consolidated .npy."""
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.isdir(path):
+            files = sorted(glob.glob(os.path.join(path, "chunk_*.npy")))
+        else:
+            files = [path]
+        self.chunks = [np.load(f, mmap_mode="r") for f in files]
+        self.chunks = [c for c in self.chunks if len(c)]
+
+    def __len__(self):
+        return sum(len(c) for c in self.chunks)
+
+    def field(self, name):
+        """One column over the whole session (copied into a single array)."""
+        if not self.chunks:
+            return np.empty(0, dtype=RECORD_DTYPE[name])
+        return np.concatenate([c[name] for c in self.chunks])
+
+    def time_range(self, start, end):
+        """Records with start <= t < end, touching only the chunks that overlap."""
+        parts = []
+        for c in self.chunks:
+            if c["t"][-1] < start or c["t"][0] >= end:
+                continue
+            lo, hi = np.searchsorted(c["t"], [start, end])
+            parts.append(np.asarray(c[lo:hi]))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=RECORD_DTYPE)
+
+    def event_times(self, flag):
+        """Timestamps of all frames carrying the given EVENT_* flag."""
+        return np.concatenate([c["t"][(c["events"] & flag) != 0] for c in self.chunks]) \
+            if self.chunks else np.empty(0)
+
+    def summary(self):
+        n = len(self)
+        if n == 0:
+            return {"frames": 0}
+        face_frames = sum(int(c["face"].sum()) for c in self.chunks)
+        ear_sum = sum(float(c["ear"][c["face"] == 1].sum(dtype=np.float64)) for c in self.chunks)
+        start, end = float(self.chunks[0]["t"][0]), float(self.chunks[-1]["t"][-1])
+        result = {"frames": n, "face_frames": face_frames, "start": start, "end": end,
+                  "duration_s": end - start,
+                  "avg_ear": ear_sum / face_frames if face_frames else 0.0}
+        for flag, name in EVENT_NAMES.items():
+            result[f"{name}_events"] = sum(int(((c["events"] & flag) != 0).sum()) for c in self.chunks)
+        return result
+
+    def consolidate(self, out_path):
+        """Write all chunks into one .npy that can itself be memory-mapped."""
+        out = np.lib.format.open_memmap(out_path, mode="w+", dtype=RECORD_DTYPE, shape=(len(self),))
+        pos = 0
+        for c in self.chunks:
+            out[pos:pos + len(c)] = c
+            pos += len(c)
+        out.flush()
+        return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect EST per-frame session recordings")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_summary = sub.add_parser("summary", help="Print frame/event counts for a recording")
+    p_summary.add_argument("path")
+    p_cons = sub.add_parser("consolidate", help="Merge chunk files into one .npy")
+    p_cons.add_argument("path")
+    p_cons.add_argument("out")
+    args = parser.parse_args()
+
+    recording = SessionRecording(args.path)
+    if args.command == "summary":
+        json.dump(recording.summary(), sys.stdout, indent=2)
+        print()
+    else:
+        print(f"Consolidated {len(recording)} records → {recording.consolidate(args.out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Indexed SQLite store for Eye Strain Monitor sessions and alerts.
+
+The JSON logs (alert_logs/alerts_<session>.jsonl, eye_strain_logs/
+session_<time>.json) stay as they are; with a store, AlertLogger and
+save_session_data also write every alert and session snapshot into one
+SQLite database, so questions like "High or Critical alerts for alice in
+the last week" are an index range scan instead of parsing every file.
+
+  alerts    one row per alert: session, user, source (monitor name), unix
+            time, type, severity, details. Indexed on (ts),
+            (severity, ts), (user, ts) and (user, severity, ts), so range
+            and severity queries only visit matching rows.
+  sessions  one row per session, updated in place by each snapshot.
+  imports   JSON files already migrated (path, size, mtime).
+
+The database runs in WAL mode; one SessionStore can be shared by every
+monitor and writer thread in a process.
+
+Usage:
+  python ESTv4.py --store eye_strain.db
+  python session_store.py migrate --root .            # import existing JSON logs
+  python session_store.py alerts --since 7d --severity High Critical --user alice --count
+  python session_store.py sessions --since 2025-01-01 --until 2025-02-01
+"""
+
+import argparse
+import datetime
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+ALERT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"   # AlertLogger timestamps (local time)
+SEVERITIES = ("Low", "Medium", "High", "Critical")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    user TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    ts REAL NOT NULL,
+    type TEXT,
+    severity TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS alerts_ts ON alerts (ts);
+CREATE INDEX IF NOT EXISTS alerts_severity_ts ON alerts (severity, ts);
+CREATE INDEX IF NOT EXISTS alerts_user_ts ON alerts (user, ts);
+CREATE INDEX IF NOT EXISTS alerts_user_severity_ts ON alerts (user, severity, ts);
+CREATE INDEX IF NOT EXISTS alerts_session ON alerts (session);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    session TEXT PRIMARY KEY,
+    user TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    start_ts REAL NOT NULL,
+    end_ts REAL,
+    duration REAL NOT NULL DEFAULT 0,
+    total_blinks INTEGER NOT NULL DEFAULT 0,
+    drowsy_episodes INTEGER NOT NULL DEFAULT 0,
+    break_reminders INTEGER NOT NULL DEFAULT 0,
+    avg_ear REAL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_start ON sessions (start_ts);
+CREATE INDEX IF NOT EXISTS sessions_user_start ON sessions (user, start_ts);
+
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER
+);
+"""
+
+ALERT_FILE = re.compile(r"^alerts_(\d{8}_\d{6}(?:_(.+))?)\.(jsonl|json)$")
+SESSION_FILE = re.compile(r"^session_\d{8}_\d{6}(?:_(.+))?\.json$")
+
+
+def parse_time(text):
+    """Unix time from '7d' / '12h' / '30m' (ago), YYYY-MM-DD or an ISO timestamp."""
+    if text is None:
+        return None
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([dhm])", text)
+    if match:
+        unit = {"d": 86400, "h": 3600, "m": 60}[match.group(2)]
+        return time.time() - float(match.group(1)) * unit
+    return datetime.datetime.fromisoformat(text).timestamp()
+
+
+def alert_time(text):
+    return datetime.datetime.strptime(text, ALERT_TIME_FORMAT).timestamp()
+
+
+class SessionStore:
+    """SQLite-backed alert and session store, safe to share between threads."""
+
+    def __init__(self, path="eye_strain.db"):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._tags = {}     # session -> (user, source) for alerts logged before a snapshot
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # -- writing ---------------------------------------------------------
+
+    def begin_session(self, session, start_ts, user=None, source=None):
+        """Register a session so its alerts carry the user and monitor name."""
+        user, source = user or "", source or ""
+        with self._lock, self._db:
+            self._tags[session] = (user, source)
+            self._db.execute(
+                "INSERT INTO sessions (session, user, source, start_ts) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (session) DO NOTHING", (session, user, source, start_ts))
+
+    def _session_tags(self, session):
+        tags = self._tags.get(session)
+        if tags is None:
+            row = self._db.execute("SELECT user, source FROM sessions WHERE session = ?",
+                                   (session,)).fetchone()
+            tags = (row["user"], row["source"]) if row else ("", "")
+        return tags
+
+    def add_alerts(self, session, alerts):
+        """Insert AlertLogger records (timestamp/type/severity/details dicts) in one transaction."""
+        rows = []
+        with self._lock:
+            user, source = self._session_tags(session)
+            for alert in alerts:
+                try:
+                    ts = alert_time(alert["timestamp"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                rows.append((session, user, source, ts, alert.get("type"),
+                             alert.get("severity"), alert.get("details")))
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO alerts (session, user, source, ts, type, severity, details) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def save_session(self, session, data, user=None, source=None):
+        """Upsert a session_data snapshot; an older snapshot (by end_time) never overwrites a newer one.
+
+        session_duration restarts when the long_session alert fires, so the
+        stored duration is end_time - start_time.
+        """
+        start_ts = datetime.datetime.fromisoformat(data["start_time"]).timestamp()
+        end_ts = data.get("end_time")
+        if end_ts:
+            end_ts = datetime.datetime.fromisoformat(end_ts).timestamp()
+        else:
+            end_ts = start_ts + float(data.get("session_duration", 0.0))
+        duration = max(end_ts - start_ts, 0.0)
+        with self._lock, self._db:
+            tags = self._tags.get(session, (user or "", source or ""))
+            self._db.execute(
+                "INSERT INTO sessions (session, user, source, start_ts, end_ts, duration, "
+                "total_blinks, drowsy_episodes, break_reminders, avg_ear, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (session) DO UPDATE SET end_ts = excluded.end_ts, "
+                "duration = excluded.duration, total_blinks = excluded.total_blinks, "
+                "drowsy_episodes = excluded.drowsy_episodes, "
+                "break_reminders = excluded.break_reminders, avg_ear = excluded.avg_ear, "
+                "data = excluded.data "
+                "WHERE sessions.end_ts IS NULL OR excluded.end_ts >= sessions.end_ts",
+                (session, tags[0], tags[1], start_ts, end_ts, duration,
+                 data.get("total_blinks", 0), data.get("drowsy_episodes", 0),
+                 data.get("break_reminders", 0), data.get("avg_ear"), json.dumps(data)))
+
+    # -- queries ---------------------------------------------------------
+
+    @staticmethod
+    def _where(since, until, user, severities, ts_column="ts"):
+        clauses, params = [], []
+        if user is not None:
+            clauses.append("user = ?")
+            params.append(user)
+        if severities:
+            clauses.append(f"severity IN ({', '.join('?' * len(severities))})")
+            params += list(severities)
+        if since is not None:
+            clauses.append(f"{ts_column} >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append(f"{ts_column} < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def alerts(self, since=None, until=None, severities=None, user=None, limit=None):
+        """Alerts in [since, until) (unix times), oldest first, as AlertLogger-style dicts."""
+        where, params = self._where(since, until, user, severities)
+        sql = f"SELECT * FROM alerts{where} ORDER BY ts"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [{"timestamp": datetime.datetime.fromtimestamp(r["ts"]).strftime(ALERT_TIME_FORMAT),
+                 "type": r["type"], "severity": r["severity"], "details": r["details"],
+                 "session": r["session"], "user": r["user"], "source": r["source"]}
+                for r in rows]
+
+    def count_alerts(self, since=None, until=None, severities=None, user=None, by="severity"):
+        """{value of `by`: count} for alerts in range (by: severity, type, source, user, session)."""
+        if by not in ("severity", "type", "source", "user", "session"):
+            raise ValueError(f"cannot group alerts by {by!r}")
+        where, params = self._where(since, until, user, severities)
+        with self._lock:
+            rows = self._db.execute(f"SELECT {by}, COUNT(*) FROM alerts{where} GROUP BY {by}",
+                                    params).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def sessions(self, since=None, until=None, user=None):
+        """Sessions that started in [since, until), oldest first."""
+        where, params = self._where(since, until, user, None, ts_column="start_ts")
+        with self._lock:
+            rows = self._db.execute(f"SELECT * FROM sessions{where} ORDER BY start_ts",
+                                    params).fetchall()
+        return [{key: row[key] for key in row.keys() if key != "data"} for row in rows]
+
+    # -- migration -------------------------------------------------------
+
+    def _imported(self, path):
+        st = os.stat(path)
+        row = self._db.execute("SELECT size, mtime_ns FROM imports WHERE path = ?",
+                               (path,)).fetchone()
+        return row is not None and (row["size"], row["mtime_ns"]) == (st.st_size, st.st_mtime_ns)
+
+    def _mark_imported(self, path):
+        st = os.stat(path)
+        self._db.execute("INSERT OR REPLACE INTO imports (path, size, mtime_ns) VALUES (?, ?, ?)",
+                         (path, st.st_size, st.st_mtime_ns))
+
+    def migrate(self, root=".", user=None):
+        """Import existing JSON logs under root; unchanged files are skipped on re-runs.
+
+        A changed alert log replaces that session's alerts, so re-running
+        after a log grew (or after the live logger wrote the same session)
+        never duplicates alerts. Returns (files imported, alerts, sessions).
+        """
+        from ESTv4 import read_alert_log
+
+        files = alerts = sessions = 0
+        session_dir = os.path.join(root, "eye_strain_logs")
+        for fname in sorted(os.listdir(session_dir)) if os.path.isdir(session_dir) else []:
+            match = SESSION_FILE.match(fname)
+            path = os.path.join(session_dir, fname)
+            if match is None or self._imported(path):
+                continue
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                start = datetime.datetime.fromisoformat(data["start_time"])
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Warning: skipping {path}: {e}")
+                continue
+            source = match.group(1) or ""
+            # same id as the session's alert log
+            session = start.strftime("%Y%m%d_%H%M%S") + (f"_{source}" if source else "")
+            self.begin_session(session, start.timestamp(), user, source)
+            self.save_session(session, data, user, source)
+            with self._lock, self._db:
+                self._mark_imported(path)
+            files += 1
+            sessions += 1
+
+        alert_dir = os.path.join(root, "alert_logs")
+        for fname in sorted(os.listdir(alert_dir)) if os.path.isdir(alert_dir) else []:
+            match = ALERT_FILE.match(fname)
+            path = os.path.join(alert_dir, fname)
+            if match is None or self._imported(path):
+                continue
+            if match.group(3) == "json" and os.path.exists(path + "l"):
+                continue  # compacted copy of a .jsonl log
+            try:
+                if match.group(3) == "jsonl":
+                    records = read_alert_log(path)
+                else:
+                    with open(path) as f:
+                        records = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: skipping {path}: {e}")
+                continue
+            session = match.group(1)
+            if session not in self._tags:
+                start = datetime.datetime.strptime(session[:15], "%Y%m%d_%H%M%S")
+                self.begin_session(session, start.timestamp(), user, match.group(2))
+            with self._lock, self._db:
+                self._db.execute("DELETE FROM alerts WHERE session = ?", (session,))
+            alerts += self.add_alerts(session, [r for r in records if isinstance(r, dict)])
+            with self._lock, self._db:
+                self._mark_imported(path)
+            files += 1
+        return files, alerts, sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or fill the Eye Strain Monitor session store")
+    parser.add_argument("--db", default="eye_strain.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    migrate = sub.add_parser("migrate", help="Import alert_logs/ and eye_strain_logs/ JSON files")
+    migrate.add_argument("--root", default=".", help="Directory holding alert_logs/ and eye_strain_logs/")
+    migrate.add_argument("--user", help="User to attribute the imported sessions to")
+
+    for name in ("alerts", "sessions"):
+        query = sub.add_parser(name, help=f"List {name} in a time range")
+        query.add_argument("--since", help="Start: 7d / 12h / 30m ago, YYYY-MM-DD or ISO time")
+        query.add_argument("--until", help="End (exclusive), same formats")
+        query.add_argument("--user")
+        if name == "alerts":
+            query.add_argument("--severity", nargs="+", help=f"Any of {', '.join(SEVERITIES)}")
+            query.add_argument("--count", action="store_true", help="Print counts per --by value instead")
+            query.add_argument("--by", default="severity",
+                               choices=("severity", "type", "source", "user", "session"))
+            query.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    store = SessionStore(args.db)
+    t0 = time.perf_counter()
+    if args.command == "migrate":
+        files, alerts, sessions = store.migrate(args.root, args.user)
+        print(f"Imported {files} file(s): {alerts} alert(s), {sessions} session snapshot(s) "
+              f"in {time.perf_counter() - t0:.2f}s")
+        return
+
+    since, until = parse_time(args.since), parse_time(args.until)
+    if args.command == "sessions":
+        result = store.sessions(since, until, args.user)
+    elif args.count:
+        result = store.count_alerts(since, until, args.severity, args.user, args.by)
+    else:
+        result = store.alerts(since, until, args.severity, args.user, args.limit)
+    if isinstance(result, dict):
+        print(json.dumps(result, indent=2))
+    else:
+        sys.stdout.write("".join(json.dumps(r) + "\n" for r in result))
+    print(f"{len(result)} result(s) in {(time.perf_counter() - t0) * 1000:.1f} ms", file=sys.stderr)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Multi-camera supervisor for the Eye Strain Monitor.
+
+Runs one headless EyeStrainMonitor per camera index or video stream inside a
+single process. Each monitor keeps its own blink/drowsiness state, alert log
+and session file; the dlib landmark predictor is loaded once and shared.
+
+Every source has a capture thread that only keeps its newest frame. A fixed
+pool of worker threads (one per core by default) takes sources with a fresh
+frame and runs detection + state updates on them, never more than one worker
+per monitor at a time, so N cameras do not need N busy threads. OpenCV and
+dlib do the heavy lifting in native code.
+
+All monitors report into one JSON-lines feed: per-monitor alert events as
+they happen, plus an aggregated stats record every --stats-interval seconds.
+
+Usage:
+  python supervisor.py --sources 0 1 2 --track
+  python supervisor.py --sources 0 rtsp://lab-cam-2/stream --stats-file lab.jsonl
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+import cv2
+
+from ESTv4 import AlertLogger, EyeStrainMonitor, _put_latest
+from session_store import SessionStore
+
+
+class FeedWriter:
+    """Thread-safe line writer shared by all monitors and the supervisor."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        with self._lock:
+            self.stream.write(text)
+
+    def flush(self):
+        with self._lock:
+            self.stream.flush()
+
+
+class MonitoredSource:
+    """One camera/stream: its capture thread, newest frame and monitor."""
+
+    def __init__(self, source, monitor):
+        self.source = source
+        self.monitor = monitor
+        self.frames = queue.Queue(maxsize=1)
+        self.scheduled = False      # queued for, or being processed by, a worker
+        self.processed = 0
+        self.lock = threading.Lock()
+        # monitor state (RollingStats, counters) is read by the stats loop while
+        # a worker updates it; hold this around process_frame and current_stats
+        self.state_lock = threading.Lock()
+        self.cap = None
+        self.thread = None
+        self.alive = True
+
+    def open(self, width=640, height=480):
+        src = int(self.source) if str(self.source).isdigit() else self.source
+        self.cap = cv2.VideoCapture(src)
+        if not self.cap.isOpened():
+            return False
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        return True
+
+
+class MonitorSupervisor:
+    def __init__(self, sources, feed, workers=None, stats_interval=1.0, **monitor_kwargs):
+        self.feed = feed
+        self.stats_interval = stats_interval
+        self.workers = workers or os.cpu_count() or 1
+        self.stop_event = threading.Event()
+        self.ready = queue.Queue()
+        self.sources = []
+        for i, source in enumerate(sources):
+            name = f"cam{source}" if str(source).isdigit() else f"stream{i}"
+            monitor = EyeStrainMonitor(headless=True, stats_stream=feed,
+                                       stats_interval=stats_interval, name=name,
+                                       **monitor_kwargs)
+            self.sources.append(MonitoredSource(source, monitor))
+
+    def _capture_loop(self, src):
+        while not self.stop_event.is_set():
+            ret, frame = src.cap.read()
+            if not ret or frame is None:
+                print(f"Warning: {src.monitor.name} stopped delivering frames.")
+                src.alive = False
+                break
+            if _put_latest(src.frames, frame):
+                src.monitor.profiler.record_drop()
+            with src.lock:
+                if src.scheduled:
+                    continue
+                src.scheduled = True
+            self.ready.put(src)
+
+    def _worker_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                src = self.ready.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                frame = src.frames.get_nowait()
+            except queue.Empty:
+                frame = None
+            if frame is not None:
+                try:
+                    with src.state_lock:
+                        src.monitor.process_frame(frame)
+                    src.processed += 1
+                except Exception as e:
+                    print(f"Warning: {src.monitor.name} frame failed: {e}")
+            with src.lock:
+                if src.frames.empty():
+                    src.scheduled = False
+                    continue
+            self.ready.put(src)  # a newer frame arrived while we were busy
+
+    def aggregate_stats(self, elapsed):
+        monitors = {}
+        for src in self.sources:
+            with src.state_lock:
+                stats = src.monitor.current_stats()
+            stats["source"] = str(src.source)
+            stats["alive"] = src.alive
+            stats["fps"] = src.processed / elapsed if elapsed > 0 else 0.0
+            monitors[src.monitor.name] = stats
+        return {"event": "stats", "time": time.time(), "monitors": monitors,
+                "active": sum(1 for s in self.sources if s.alive)}
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda signum, _frame: self.stop())
+
+        threads = []
+        for src in self.sources:
+            if not src.open():
+                print(f"Error: could not open source {src.source}; skipping it.")
+                src.alive = False
+                continue
+            src.thread = threading.Thread(target=self._capture_loop, args=(src,),
+                                          name=f"capture-{src.monitor.name}", daemon=True)
+            threads.append(src.thread)
+        threads += [threading.Thread(target=self._worker_loop, name=f"est-worker-{i}", daemon=True)
+                    for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        print(f"Supervising {len(self.sources)} source(s) with {self.workers} worker(s).")
+
+        start = last = time.time()
+        try:
+            while not self.stop_event.wait(0.1):
+                now = time.time()
+                if now - last >= self.stats_interval:
+                    self.feed.write(json.dumps(self.aggregate_stats(now - start)) + "\n")
+                    self.feed.flush()
+                    last = now
+                if not any(s.alive for s in self.sources):
+                    break
+        finally:
+            self.stop_event.set()
+            for t in threads:
+                t.join(timeout=1.0)
+            for src in self.sources:
+                if src.cap is not None:
+                    src.cap.release()
+                with src.state_lock:     # a worker may outlive the join timeout
+                    src.monitor._shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run one Eye Strain Monitor per camera in one process")
+    parser.add_argument("--sources", nargs="+", required=True,
+                        help="Camera indices and/or video stream URLs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Detection worker threads (default: number of cores)")
+    parser.add_argument("--track", action="store_true",
+                        help="Track each face in a ROI between periodic full-frame detections")
+    parser.add_argument("--detect-scale", type=float, default=1.0)
+    parser.add_argument("--detect-budget-ms", type=float)
+    parser.add_argument("--audio", action="store_true", help="Play alert sounds (off by default)")
+    parser.add_argument("--record", action="store_true", help="Record per-frame EAR/events for every monitor")
+    parser.add_argument("--alert-rules", help="JSON file overriding or adding alert rules (see alert_rules.py)")
+    parser.add_argument("--store", metavar="DB",
+                        help="Write every monitor's alerts/sessions to this SQLite store")
+    parser.add_argument("--alert-fsync", choices=AlertLogger.FSYNC_POLICIES, default="none",
+                        help="fsync alert logs after every batch, once on close, or never")
+    parser.add_argument("--alert-flush-interval", type=float, default=1.0,
+                        help="Seconds of alerts batched into one alert log write")
+    parser.add_argument("--stats-file", default="-", help="Where the JSON-lines feed goes ('-' for stdout)")
+    parser.add_argument("--stats-interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    stream = sys.stdout if args.stats_file == "-" else open(args.stats_file, "a")
+    feed = FeedWriter(stream)
+    # stdout may carry the feed; diagnostics go to stderr
+    store = SessionStore(args.store) if args.store else None   # one store shared by all monitors
+    with contextlib.redirect_stdout(sys.stderr):
+        supervisor = MonitorSupervisor(args.sources, feed, workers=args.workers,
+                                       stats_interval=args.stats_interval,
+                                       track_faces=args.track, audio=args.audio,
+                                       detect_scale=args.detect_scale,
+                                       detect_budget_ms=args.detect_budget_ms,
+                                       record=args.record, alert_rules=args.alert_rules,
+                                       store=store, alert_fsync=args.alert_fsync,
+                                       alert_flush_interval=args.alert_flush_interval)
+        try:
+            supervisor.run()
+        finally:
+            if store is not None:
+                store.close()
+
+
+if __name__ == "__main__":
+    main()
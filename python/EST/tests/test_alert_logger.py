@@ -0,0 +1,25 @@
+import pytest
+
+import ESTv4
+from ESTv4 import EyeStrainMonitor
+
+
+def test_monitor_passes_its_fsync_policy_and_flush_interval_to_every_session(tmp_path,
+                                                                           monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    synced = []
+    monkeypatch.setattr(ESTv4.os, "fsync", synced.append)
+    monitor = EyeStrainMonitor(headless=True, audio=False, alert_fsync="batch",
+                               alert_flush_interval=0.05)
+    for _ in range(2):
+        logger = monitor.alert_logger
+        assert (logger.fsync_policy, logger.flush_interval) == ("batch", 0.05)
+        logger.log_alert("Blink Frequency", "High", "test")
+        monitor.reset_session()               # closes (drains) the previous log
+    assert len(synced) >= 2
+    monitor.close_session()
+
+
+def test_unknown_fsync_policy_is_rejected():
+    with pytest.raises(ValueError, match="fsync_policy"):
+        EyeStrainMonitor(headless=True, audio=False, log_alerts=False, alert_fsync="always")
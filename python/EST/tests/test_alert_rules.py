@@ -0,0 +1,143 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from alert_rules import AlertEngine, TimerWheel, load_rules
+from ESTv4 import EyeStrainMonitor
+from session_recorder import (EVENT_BLINK, EVENT_BLINK_ALERT, EVENT_BREAK_ALERT,
+                              EVENT_DROWSY, EVENT_LONG_SESSION)
+
+
+def test_timer_wheel_returns_items_once_their_deadline_has_passed():
+    wheel = TimerWheel(start=0.0, resolution=0.25, slots=8)
+    wheel.schedule(1.0, "a")
+    wheel.schedule(1.1, "b")
+    wheel.schedule(100.0, "far")        # more than one revolution away
+    assert wheel.advance(1.0) == []
+    assert wheel.advance(1.05) == [(1.0, "a")]
+    assert wheel.advance(50.0) == [(1.1, "b")]
+    assert len(wheel) == 1
+    assert wheel.advance(100.5) == [(100.0, "far")]
+    assert len(wheel) == 0
+
+
+def test_engine_rearms_timers_and_restarts_them_on_signals():
+    engine = AlertEngine([{"name": "tick", "interval": 10, "restart_on": ["blink"]}], now=0.0)
+    assert engine.advance(10.0) == ()
+    assert [r.name for r in engine.advance(10.5)] == ["tick"]
+    assert not engine.advance(20.0)     # re-armed from 10.5
+    engine.notify("blink", 15.0)
+    assert not engine.advance(20.6)
+    assert [r.name for r in engine.advance(25.1)] == ["tick"]
+
+
+def test_cooldown_and_trigger_signals():
+    engine = AlertEngine([
+        {"name": "drowsy", "kind": "trigger", "cooldown": 30},
+        {"name": "blink_log", "kind": "trigger", "on": "blink", "log_type": "Blink"},
+    ], now=0.0)
+    assert [r.name for r in engine.notify("drowsy", 5.0)] == ["drowsy"]
+    assert engine.notify("drowsy", 20.0) == []
+    assert [r.name for r in engine.notify("drowsy", 35.0)] == ["drowsy"]
+    assert [r.name for r in engine.notify("blink", 36.0)] == ["blink_log"]
+
+
+@pytest.mark.parametrize("spec, message", [
+    ({"name": "yawn", "kind": "trigger"}, "trigger rules fire on one of"),
+    ({"name": "x", "kind": "trigger", "on": "sneeze"}, "'sneeze'"),
+    ({"name": "posture"}, "need an interval"),
+    ({"name": "x", "interval": 5, "colour": "red"}, "Unknown alert rule field"),
+])
+def test_load_rules_rejects_rules_that_can_never_fire(spec, message):
+    with pytest.raises(ValueError, match=message):
+        load_rules([spec])
+
+
+def legacy_advance(m, now, avg_ear):
+    """The hard-coded alert checks alert_rules.py replaced (ESTv4 before the rule engine)."""
+    events = 0
+    session_duration = now - m.session_start_time
+    m.rolling.add_ear(now, avg_ear)
+    if avg_ear < m.EAR_THRESHOLD:
+        m.eye_closed_counter += 1
+    else:
+        if m.eye_closed_counter >= m.EAR_CONSEC_FRAMES:
+            if now - m.last_blink_time > 0.25:
+                m.blink_counter += 1
+                m.last_blink_time = now
+                m.rolling.add_blink(now)
+                events |= EVENT_BLINK
+        m.eye_closed_counter = 0
+    if avg_ear < m.DROWSY_THRESHOLD:
+        m.drowsy_counter += 1
+        if m.drowsy_counter >= m.DROWSY_CONSEC_FRAMES:
+            m.session_data['drowsy_episodes'] += 1
+            events |= EVENT_DROWSY
+            m.alert_logger.log_alert("Fatigue Detected", "High",
+                                     f"Eye openness = {avg_ear:.3f} (very tired)")
+            m.drowsy_counter = 0
+    else:
+        m.drowsy_counter = 0
+    if now - m.last_blink_time > m.BLINK_ALERT_TIME:
+        events |= EVENT_BLINK_ALERT
+        rate = m.rolling.blink_rate(m.BLINK_RATE_WINDOW, now)
+        m.alert_logger.log_alert("Blink Frequency", m.alert_logger.calculate_blink_severity(rate),
+                                 f"Blink rate = {rate:.1f} blinks/min")
+        m.last_blink_time = now
+    if now - m.last_break_reminder > m.BREAK_REMINDER_TIME:
+        events |= EVENT_BREAK_ALERT
+        m.alert_logger.log_alert(
+            "Screen Exposure", m.alert_logger.calculate_exposure_severity(session_duration / 60),
+            f"Continuous screen time = {session_duration/60:.1f} minutes")
+        m.last_break_reminder = now
+        m.session_data['break_reminders'] += 1
+    if now - m.session_start_time > m.LONG_SESSION_TIME:
+        events |= EVENT_LONG_SESSION
+        m.alert_logger.log_alert("Screen Exposure", "Critical",
+                                 f"Extended session = {session_duration/3600:.1f} hours continuous")
+        m.session_start_time = now
+    return events
+
+
+def ear_series(seconds, fps, seed=7):
+    """Open eyes with irregular blinks, long stares and a few drowsy spells."""
+    rng = np.random.default_rng(seed)
+    ear = np.full(int(seconds * fps), 0.36)
+    i = 0
+    while i < len(ear):
+        gap = rng.choice([2, 5, 12, 30])            # seconds to the next blink (30 > BLINK_ALERT_TIME)
+        i += int(gap * fps)
+        ear[i:i + 3] = 0.2
+        if rng.random() < 0.03:
+            ear[i + 3:i + 3 + 80] = 0.25            # below DROWSY_THRESHOLD for 80 frames
+    return ear
+
+
+def test_rule_engine_matches_the_hard_coded_alerts(capsys):
+    start = datetime.datetime(2025, 3, 3, 8, 0).timestamp()   # daytime: no late-night bump
+    fps = 5
+    series = ear_series(2.5 * 3600, fps)
+
+    runs = []
+    for advance in ("engine", "legacy"):
+        clock = [start]
+        monitor = EyeStrainMonitor(headless=True, audio=False, log_alerts=False,
+                                   clock=lambda: clock[0])
+        monitor.show_alert_popup = monitor.play_alert_sound = lambda *args: None
+        events = []
+        for i, ear in enumerate(series):
+            clock[0] = start + i / fps
+            if advance == "engine":
+                events.append(monitor._advance_state(clock[0], float(ear), 1))
+            else:
+                events.append(legacy_advance(monitor, clock[0], float(ear)))
+        runs.append((monitor.alert_logger.alerts, events, monitor.session_data,
+                     monitor.blink_counter))
+
+    (alerts, events, data, blinks), legacy = runs
+    assert {a["type"] for a in alerts} == {"Fatigue Detected", "Blink Frequency", "Screen Exposure"}
+    assert any(a["severity"] == "Critical" for a in alerts)   # long session fired
+    assert alerts == legacy[0]
+    assert events == legacy[1]
+    assert data == legacy[2] and blinks == legacy[3]
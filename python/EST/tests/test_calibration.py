@@ -0,0 +1,90 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from calibration import EARCalibrator, P2Quantile
+from ESTv4 import EyeStrainMonitor
+
+
+@pytest.mark.parametrize("q", [0.02, 0.5, 0.8])
+def test_p2_quantile_tracks_numpy(q):
+    x = np.random.default_rng(1).normal(0.33, 0.03, 20000)
+    sketch = P2Quantile(q)
+    for v in x:
+        sketch.add(v)
+    assert sketch.value() == pytest.approx(np.quantile(x, q), abs=0.003)
+
+
+def test_p2_quantile_before_five_samples():
+    sketch = P2Quantile(0.5)
+    assert sketch.value() is None
+    for v in (3, 1, 2):
+        sketch.add(v)
+    assert sketch.value() == 2
+
+
+def blink_stream(calibrator, seconds, fps=10, open_ear=0.30, closed_ear=0.18, start=0.0):
+    """Open eyes with a two-frame blink every 3 s; returns how often the thresholds changed."""
+    changes = 0
+    for i in range(int(seconds * fps)):
+        ear = closed_ear if i % (3 * fps) < 2 else open_ear
+        changes += calibrator.add(start + i / fps, ear)
+    return changes
+
+
+def test_warmup_sets_thresholds_and_saves_off_the_caller_thread(tmp_path, monkeypatch):
+    calibrator = EARCalibrator("alice", "haar", cache_dir=str(tmp_path))
+    writers = []
+    write = calibrator._write
+    monkeypatch.setattr(calibrator, "_write",
+                        lambda data: (writers.append(threading.current_thread()), write(data)))
+
+    assert blink_stream(calibrator, 40) == 1
+    assert calibrator.calibrated
+    assert calibrator.open_ear == pytest.approx(0.30)
+    assert calibrator.closed_ear == pytest.approx(0.18, abs=1e-3)
+    assert calibrator.thresholds == pytest.approx((0.24, 0.17), abs=1e-3)
+
+    calibrator.flush()
+    assert writers and threading.current_thread() not in writers
+    saved = json.loads((tmp_path / "alice_haar.json").read_text())
+    assert saved["ear_threshold"] == pytest.approx(0.24, abs=1e-3)
+
+    cached = EARCalibrator("alice", "haar", cache_dir=str(tmp_path))
+    assert cached.calibrated and cached.thresholds == calibrator.thresholds
+    assert not EARCalibrator("alice", "dlib", cache_dir=str(tmp_path)).calibrated
+
+
+def test_adaptation_blends_each_window(tmp_path):
+    calibrator = EARCalibrator("bob", "haar", cache_dir=str(tmp_path))
+    blink_stream(calibrator, 40)
+    blink_stream(calibrator, 70, open_ear=0.35, start=40.0)
+    assert calibrator.open_ear == pytest.approx(0.8 * 0.30 + 0.2 * 0.35, abs=1e-3)
+    calibrator.flush()
+
+
+def test_background_calibrator_is_swapped_in_by_the_frame_loop(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monitor = EyeStrainMonitor(headless=True, audio=False, log_alerts=False, user="carol")
+    first = monitor.calibrator
+    monitor._background_results.put(("calibration", "dlib"))
+    assert monitor.calibrator is first           # nothing changes off the frame loop
+    monitor.update_state(0.3, 1)
+    assert monitor.calibrator is not first and monitor.calibrator.method == "dlib"
+
+
+def test_switching_methods_without_a_cached_calibration_restores_the_defaults(tmp_path,
+                                                                             monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    haar = EARCalibrator("dave", "haar", cache_dir="calibration")
+    blink_stream(haar, 40)
+    haar.flush()
+    monitor = EyeStrainMonitor(headless=True, audio=False, log_alerts=False, user="dave")
+    assert monitor.EAR_THRESHOLD == pytest.approx(0.24, abs=1e-3)   # Haar cache loaded
+
+    monitor._background_results.put(("calibration", "dlib"))
+    monitor.update_state(0.3, 1)
+    assert (monitor.EAR_THRESHOLD, monitor.DROWSY_THRESHOLD) == monitor.default_thresholds
+    assert monitor.default_thresholds == pytest.approx((0.3275, 0.295))
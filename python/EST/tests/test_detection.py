@@ -0,0 +1,75 @@
+import types
+
+import numpy as np
+
+import ESTv4
+from ESTv4 import EyeStrainMonitor
+
+
+class Rect:
+    def __init__(self, x, y, w, h):
+        self.box = (x, y, w, h)
+
+    def left(self):
+        return self.box[0]
+
+    def top(self):
+        return self.box[1]
+
+    def width(self):
+        return self.box[2]
+
+    def height(self):
+        return self.box[3]
+
+
+class FakeDetector:
+    """dlib's detector rejects non-contiguous images; record what it was given."""
+
+    def __init__(self):
+        self.contiguous = []
+
+    def run(self, img, upsample, threshold):
+        self.contiguous.append(img.flags.c_contiguous)
+        return [Rect(20, 20, 60, 60)], [1.0], [0]
+
+
+def test_tracking_roi_reaches_dlib_as_a_contiguous_image():
+    monitor = EyeStrainMonitor(headless=True, audio=False, log_alerts=False, track_faces=True)
+    monitor.detection_method = "dlib"
+    monitor.detector = FakeDetector()
+    gray = np.zeros((480, 640), np.uint8)
+
+    assert monitor.find_faces(gray) == [(20, 20, 60, 60)]      # full frame
+    assert monitor.find_faces(gray) == [(20, 20, 60, 60)]      # ROI around the track
+    assert monitor.frames_since_detect == 1
+    assert monitor.detector.contiguous == [True, True]
+    monitor.close_session()
+
+
+class Shape:
+    def __init__(self, x, y):
+        pts = [(x + 2 * i, y + (i % 3)) for i in range(68)]
+        self._parts = [types.SimpleNamespace(x=px, y=py) for px, py in pts]
+
+    def parts(self):
+        return self._parts
+
+
+def test_landmark_drawing_has_its_own_stage(monkeypatch):
+    monkeypatch.setattr(ESTv4, "dlib", types.SimpleNamespace(rectangle=lambda *box: box))
+    monkeypatch.setattr(ESTv4.cv2, "imshow", lambda *args: None)
+    monkeypatch.setattr(ESTv4.cv2, "waitKey", lambda delay: -1)
+    monitor = EyeStrainMonitor(audio=False, log_alerts=False)
+    monitor.detection_method = "dlib"
+    monitor.detector = FakeDetector()
+    monitor.predictor = lambda gray, rect: Shape(rect[0], rect[1])
+
+    frame = np.zeros((480, 640, 3), np.uint8)
+    for _ in range(3):
+        monitor.detect_eyes_and_calculate_ear(frame, frame[:, :, 0].copy())
+        monitor._show_frame(frame)
+    stages = monitor.profiler.summary()["stages"]
+    assert stages["draw_landmarks"]["count"] == 3
+    assert stages["draw"]["count"] == stages["display"]["count"] == 3
+    monitor.close_session()
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import ESTv4
+from ESTv4 import EyeStrainMonitor
+
+
+class FakePlayer:
+    def __init__(self, method):
+        self.method = method
+        self.closed = False
+        self.playing = False
+
+    def play(self, alert_type):
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    monkeypatch.setattr(ESTv4, "AlertSoundPlayer", FakePlayer)
+    monkeypatch.setattr(ESTv4, "_load_dlib", lambda: False)
+    monkeypatch.setattr(EyeStrainMonitor, "_initialize_audio", lambda self: "print")
+    m = EyeStrainMonitor(headless=True, audio=False, log_alerts=False)
+    yield m
+    m.close_session()
+
+
+def test_background_player_replaces_and_closes_the_placeholder(monitor):
+    placeholder = monitor.sound_player
+    monitor._background_init(audio=True)
+    assert monitor.sound_player is placeholder      # handed over, not assigned
+    monitor.update_state(0.3, 1)
+    assert monitor.sound_player is not placeholder and placeholder.closed
+    assert monitor.audio_method == "print"
+    monitor.close_audio()
+    assert monitor.sound_player.closed
+
+
+def test_pending_and_late_players_are_closed_at_shutdown(monitor, monkeypatch):
+    monitor._background_init(audio=True)
+    pending = monitor._background_results.queue[0][1]
+    monitor.close_audio()
+    assert pending.closed and monitor.sound_player.closed
+
+    late = []
+    monkeypatch.setattr(ESTv4, "AlertSoundPlayer",
+                        lambda method: late.append(FakePlayer(method)) or late[-1])
+    monitor._background_init(audio=True)              # finishes after shutdown
+    assert late[0].closed and monitor._background_results.empty()
+
+
+def test_detection_switch_is_applied_by_the_detection_thread(monitor):
+    monitor.tracked_box = (10, 10, 50, 50)
+    monitor._detection_switch.put("haar")
+    monitor.update_state(0.3, 1)
+    assert monitor.tracked_box == (10, 10, 50, 50)
+    gray = np.zeros((120, 160), np.uint8)
+    monitor.detect_eyes_and_calculate_ear(np.dstack([gray] * 3), gray)
+    assert monitor._detection_switch.empty() and monitor.tracked_box is None
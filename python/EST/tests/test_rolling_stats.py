@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from ESTv4 import EyeStrainMonitor, RollingStats
+
+
+def test_window_means_and_variance_match_a_rescan():
+    rng = np.random.default_rng(5)
+    times = np.cumsum(rng.uniform(0.02, 0.2, 5000))
+    ears = rng.normal(0.33, 0.04, len(times))
+    stats = RollingStats(windows=(60, 300), start_time=0.0)
+    for t, e in zip(times, ears):
+        stats.add_ear(t, e)
+
+    now = times[-1]
+    for window in (60, 300):
+        # whole buckets (resolution 1 s) newer than now - window are kept
+        kept = np.floor(times) > np.floor(now - window)
+        assert stats.ear_mean(window, now) == pytest.approx(ears[kept].mean())
+        assert stats.ear_variance(window, now) == pytest.approx(ears[kept].var())
+    assert stats.session_ear_mean() == pytest.approx(ears.mean())
+
+
+def test_blink_rate_covers_the_elapsed_time_until_the_window_fills():
+    stats = RollingStats(windows=(60,), start_time=0.0)
+    for t in range(0, 30, 3):
+        stats.add_blink(t)
+    assert stats.blink_rate(60, 30.0) == pytest.approx(10 * 60 / 30)
+    assert stats.blink_rate(60, 100.0) == pytest.approx(0.0)   # all blinks expired
+    assert stats.total_blinks == 10
+
+
+def test_current_stats_reports_the_live_ear_next_to_the_window_mean():
+    clock = [1000.0]
+    monitor = EyeStrainMonitor(headless=True, audio=False, log_alerts=False,
+                               clock=lambda: clock[0])
+    for i, ear in enumerate([0.40] * 50 + [0.20]):
+        clock[0] = 1000.0 + i * 0.1
+        monitor.update_state(ear, 1)
+    monitor.update_state(0.5, 0)            # no face: ignored
+    st = monitor.current_stats()
+    assert st["ear"] == 0.20
+    assert st["ear_mean_60s"] == pytest.approx((50 * 0.40 + 0.20) / 51)
+    assert "avg_ear" not in st
+    monitor.close_session()
@@ -0,0 +1,84 @@
+import time
+
+import numpy as np
+import pytest
+
+from ESTv4 import EyeStrainMonitor
+
+
+class FakeCapture:
+    """A camera that delivers a few blank frames and then fails."""
+
+    def __init__(self, frames=5):
+        self.frames = frames
+        self.released = False
+
+    def read(self):
+        if self.frames == 0:
+            return False, None
+        self.frames -= 1
+        return True, np.zeros((120, 160, 3), np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+def run_monitor(monkeypatch, pipelined, **kwargs):
+    monitor = EyeStrainMonitor(headless=True, audio=False, **kwargs)
+    cap = FakeCapture()
+    monkeypatch.setattr(monitor, "_open_camera", lambda: cap)
+    closed = []
+    for name in ("close_session", "close_audio"):
+        original = getattr(monitor, name)
+        monkeypatch.setattr(monitor, name,
+                            lambda original=original, name=name: (closed.append(name), original()))
+    return monitor, cap, closed
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_run_without_logs_writes_nothing_and_shuts_down(tmp_path, monkeypatch, pipelined):
+    monkeypatch.chdir(tmp_path)
+    monitor, cap, closed = run_monitor(monkeypatch, pipelined, log_alerts=False)
+    monitor.run(pipelined=pipelined)
+    assert cap.released and closed == ["close_session", "close_audio"]
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_run_closes_the_session_when_saving_fails(tmp_path, monkeypatch, pipelined):
+    monkeypatch.chdir(tmp_path)
+    monitor, cap, closed = run_monitor(monkeypatch, pipelined, log_alerts=True)
+
+    def fail(final=False):
+        raise OSError("disk full")
+    monkeypatch.setattr(monitor, "save_session_data", fail)
+    with pytest.raises(OSError):
+        monitor.run(pipelined=pipelined)
+    assert closed == ["close_session", "close_audio"]
+
+
+def test_pipelined_mode_feeds_every_detected_sample_to_update_state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    clock = [1000.0]                  # 0.1 s per detected frame, like a 10 fps camera
+    monitor, cap, _ = run_monitor(monkeypatch, True, log_alerts=False, clock=lambda: clock[0])
+    cap.frames = 60
+    read = cap.read
+    monkeypatch.setattr(cap, "read", lambda: (time.sleep(0.005), read())[1])
+    detected, updated, presented = [], [], []
+
+    def detect(frame, gray):
+        detected.append(len(detected))
+        clock[0] += 0.1
+        return 0.2 if len(detected) % 10 < 3 else 0.35, True
+    monkeypatch.setattr(monitor, "detect_eyes_and_calculate_ear", detect)
+    update_state = monitor.update_state
+    monkeypatch.setattr(monitor, "update_state",
+                        lambda ear, faces, now: (updated.append(ear), update_state(ear, faces, now))[1])
+    # rendering is far slower than detection, so most display frames are dropped
+    monkeypatch.setattr(monitor, "_present",
+                        lambda frame: (presented.append(1), time.sleep(0.03))[0] is None)
+
+    monitor.run(pipelined=True)
+    assert len(updated) == len(detected) > 2 * len(presented)
+    # eyes closed for frames 10-12, 20-22, ...; each reopening is a blink
+    assert monitor.blink_counter == len(range(13, len(detected) + 1, 10))
@@ -0,0 +1,68 @@
+import numpy as np
+
+from ESTv4 import EyeStrainMonitor
+from session_recorder import EVENT_BLINK, SessionRecorder, SessionRecording
+
+
+def test_records_reach_disk_every_flush_interval_before_the_chunk_fills(tmp_path):
+    rec = SessionRecorder("s", root=tmp_path, chunk_size=1000, flush_interval=10.0)
+    for i in range(301):                       # 30 fps for 10 s
+        rec.append(i / 30, 0.3, 1)
+    assert len(SessionRecording(rec.path)) == 301
+
+    for i in range(301, 1500):
+        rec.append(i / 30, 0.3, 1)
+    recording = SessionRecording(rec.path)
+    assert len(recording.chunks) == 2 and len(recording.chunks[0]) == 1000
+    assert len(recording) >= 1500 - 300       # at most flush_interval behind
+
+    rec.close()
+    recording = SessionRecording(rec.path)
+    assert len(recording) == 1500
+    np.testing.assert_allclose(recording.field("t"), np.arange(1500) / 30)
+
+
+def test_update_state_returns_and_records_the_frame_events(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    clock = [1_700_000_000.0]
+    monitor = EyeStrainMonitor(headless=True, audio=False, log_alerts=False, record=True,
+                               clock=lambda: clock[0])
+    events = []
+    for ear in [0.36] * 5 + [0.2] * 3 + [0.36] * 2:
+        clock[0] += 0.1
+        events.append(monitor.update_state(ear, 1))
+    monitor.close_session()
+
+    assert events == [0] * 8 + [EVENT_BLINK, 0]
+    recorded = SessionRecording(monitor.recorder.path).field("events")
+    assert recorded.tolist() == events
+
+
+class CountingFile:
+    def __init__(self, f, written):
+        self._f, self._written = f, written
+
+    def write(self, data):
+        self._written.append(len(data))
+        return self._f.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+def test_interval_flushes_append_only_the_new_records(tmp_path, monkeypatch):
+    import session_recorder
+    rec = SessionRecorder("s", root=tmp_path, chunk_size=65536, flush_interval=10.0)
+    written = []
+    monkeypatch.setattr(session_recorder, "open",
+                        lambda *args: CountingFile(open(*args), written), raising=False)
+    for i in range(30 * 60):                          # one minute at 30 fps
+        rec.append(i / 30, 0.3, 1)
+    record_bytes = sum(n for n in written if n != session_recorder.NPY_HEADER_SIZE)
+    assert record_bytes == len(SessionRecording(rec.path)) * 14   # nothing written twice
+    assert max(written) <= 301 * 14
+
+    rec.close()
+    recording = SessionRecording(rec.path)
+    assert len(recording) == 1800
+    np.testing.assert_allclose(recording.field("t"), np.arange(1800) / 30)
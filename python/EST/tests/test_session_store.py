@@ -0,0 +1,82 @@
+import datetime
+import json
+
+import pytest
+
+from session_store import SessionStore
+
+
+def ts(text):
+    return datetime.datetime.fromisoformat(text).timestamp()
+
+
+def alert(timestamp, severity, kind="Blink Frequency"):
+    return {"timestamp": timestamp, "type": kind, "severity": severity, "details": ""}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(str(tmp_path / "est.db"))
+    yield store
+    store.close()
+
+
+def test_alerts_carry_session_tags_and_filter_by_range_and_severity(store):
+    store.begin_session("20250301_090000_cam0", ts("2025-03-01T09:00:00"), "alice", "cam0")
+    store.begin_session("20250310_090000", ts("2025-03-10T09:00:00"), "bob")
+    store.add_alerts("20250301_090000_cam0", [
+        alert("2025-03-01 09:10:00", "Low"),
+        alert("2025-03-01 09:20:00", "High"),
+        alert("2025-03-02 10:00:00", "Critical"),
+    ])
+    store.add_alerts("20250310_090000", [alert("2025-03-10 09:30:00", "High"),
+                                         {"timestamp": "not a time"}])
+
+    week = ts("2025-03-01T00:00:00"), ts("2025-03-08T00:00:00")
+    assert store.count_alerts(*week, ["High", "Critical"], user="alice") == {"High": 1, "Critical": 1}
+    assert store.count_alerts(*week, ["High", "Critical"], user="bob") == {}
+    assert store.count_alerts(by="user") == {"alice": 3, "bob": 1}
+
+    found = store.alerts(since=ts("2025-03-01T09:15:00"), until=ts("2025-03-02T00:00:00"))
+    assert [(a["timestamp"], a["severity"], a["source"]) for a in found] == \
+        [("2025-03-01 09:20:00", "High", "cam0")]
+
+
+def snapshot(end, duration, blinks):
+    return {"start_time": "2025-03-01T09:00:00", "end_time": end,
+            "session_duration": duration, "total_blinks": blinks}
+
+
+def test_newer_snapshot_wins_after_long_session_reset(store):
+    store.begin_session("20250301_090000", ts("2025-03-01T09:00:00"), "alice")
+    store.save_session("20250301_090000", snapshot("2025-03-01T09:59:00", 3540, 100))
+    # long_session fired at 10:00 and restarted session_duration
+    store.save_session("20250301_090000", snapshot("2025-03-01T10:30:00", 1800, 150))
+    # an older snapshot arriving late must not win
+    store.save_session("20250301_090000", snapshot("2025-03-01T09:30:00", 1800, 50))
+
+    [session] = store.sessions(user="alice")
+    assert session["total_blinks"] == 150
+    assert session["duration"] == 5400
+    assert session["end_ts"] == ts("2025-03-01T10:30:00")
+
+
+def test_migrate_is_idempotent_and_replaces_grown_logs(store, tmp_path):
+    root = tmp_path / "logs"
+    (root / "alert_logs").mkdir(parents=True)
+    (root / "eye_strain_logs").mkdir()
+    log = root / "alert_logs" / "alerts_20250301_090000_cam1.jsonl"
+    log.write_text(json.dumps(alert("2025-03-01 09:10:00", "High")) + "\n")
+    (root / "alert_logs" / "alerts_20250301_090000_cam1.json").write_text("[]")  # compacted copy
+    (root / "eye_strain_logs" / "session_20250301_093000_cam1.json").write_text(
+        json.dumps(snapshot("2025-03-01T09:30:00", 1800, 10)))
+
+    assert store.migrate(str(root), user="alice") == (2, 1, 1)
+    assert store.migrate(str(root), user="alice") == (0, 0, 0)
+
+    with open(log, "a") as f:
+        f.write(json.dumps(alert("2025-03-01 09:40:00", "Critical")) + "\n")
+    assert store.migrate(str(root), user="alice") == (1, 2, 0)
+    assert store.count_alerts(user="alice", by="source") == {"cam1": 2}
+    [session] = store.sessions()
+    assert session["session"] == "20250301_090000_cam1" and session["user"] == "alice"
@@ -0,0 +1,305 @@
+# ml/aggregate_features.py
+"""Incremental feature rows for predict.py from Eye Strain Monitor logs.
+
+Reads what ESTv4.py writes (in the directory it ran from):
+
+  alert_logs/alerts_<YYYYmmdd_HHMMSS>[_<name>].jsonl   appended live
+  alert_logs/alerts_<...>.json                         compacted copy / older format
+  eye_strain_logs/session_<YYYYmmdd_HHMMSS>[_<name>].json   session snapshots
+
+and keeps per-day aggregates for each monitor name in a state file,
+together with a watermark per log file: the byte offset reached in each
+.jsonl log, and which snapshot / legacy .json files are already counted.
+A run only reads what was appended or created since the last one. A
+.jsonl log whose compacted .json exists is finished and is not even
+stat'ed again.
+
+Per day and monitor the rows carry the features the logs can tell:
+
+  total_coding_hours     monitored time of the day's sessions (end - start of the latest snapshot)
+  late_night_work        1 if a session or alert falls between 22:00 and 06:00
+  eye_strain_alerts      alerts logged that day
+  typing_session_length  mean session length in minutes
+
+idle_ratio and break_compliance are not in the logs and are left out, so
+predict.py applies its defaults. Sessions count towards the day they
+started on.
+
+Usage:
+  python aggregate_features.py --root ../EST > features.jsonl        # days changed since last run
+  python aggregate_features.py --root ../EST --all | python predict.py --batch - --key row_id
+  python aggregate_features.py --root ../EST --follow 60             # keep tailing
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+STATE_VERSION = 2   # 2: session length from end_time - start_time
+
+ALERT_FILE = re.compile(r"^alerts_(\d{8}_\d{6})(?:_(.+))?\.(jsonl|json)$")
+SESSION_FILE = re.compile(r"^session_\d{8}_\d{6}(?:_(.+))?\.json$")
+
+LATE_NIGHT_START, LATE_NIGHT_END = 22, 6   # same window as AlertLogger.is_late_night_work
+
+def is_late_hour(hour):
+    return hour >= LATE_NIGHT_START or hour < LATE_NIGHT_END
+
+def overlaps_late_night(start, seconds):
+    """True if [start, start + seconds] touches the 22:00-06:00 window."""
+    if is_late_hour(start.hour):
+        return True
+    return start.replace(hour=LATE_NIGHT_START, minute=0, second=0, microsecond=0) \
+        < start + datetime.timedelta(seconds=seconds)
+
+def parse_alert_time(text):
+    return datetime.datetime.strptime(text, "%Y-%m-%d %H:%M:%S")
+
+def snapshot_end(data, start):
+    """End of a session_data snapshot; start + session_duration for snapshots without end_time."""
+    if data.get("end_time"):
+        return datetime.datetime.fromisoformat(data["end_time"])
+    return start + datetime.timedelta(seconds=float(data.get("session_duration", 0.0)))
+
+def new_day():
+    return {"alerts": 0, "late_night_alerts": 0, "by_severity": {}, "by_type": {}, "sessions": {}}
+
+
+class FeatureAggregator:
+    """Per-day feature aggregates plus the watermark of which log bytes are counted."""
+
+    def __init__(self, state_path="feature_state.json", load=True):
+        self.state_path = Path(state_path)
+        self.files = {}     # log path -> {"offset": n} for .jsonl, {"done": true} otherwise
+        self.days = {}      # "YYYY-MM-DD|name" -> new_day() dict
+        self.stats = {"files_read": 0, "bytes_read": 0, "alerts": 0, "snapshots": 0}
+        if load:
+            self.load()
+
+    def load(self):
+        try:
+            state = json.loads(self.state_path.read_text())
+        except (OSError, ValueError):
+            return False
+        if state.get("version") != STATE_VERSION:
+            print(f"Warning: ignoring {self.state_path} (state version {state.get('version')})",
+                  file=sys.stderr)
+            return False
+        self.files, self.days = state["files"], state["days"]
+        return True
+
+    def save(self):
+        state = {"version": STATE_VERSION, "updated": datetime.datetime.now().isoformat(),
+                 "files": self.files, "days": self.days}
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp.write_text(json.dumps(state, separators=(",", ":")))
+        os.replace(tmp, self.state_path)
+
+    def _day(self, day, name):
+        key = f"{day}|{name}"
+        return key, self.days.setdefault(key, new_day())
+
+    def _add_alert(self, alert, name, touched):
+        try:
+            when = parse_alert_time(alert["timestamp"])
+        except (KeyError, TypeError, ValueError):
+            return
+        key, agg = self._day(when.date().isoformat(), name)
+        agg["alerts"] += 1
+        agg["late_night_alerts"] += is_late_hour(when.hour)
+        for field, counts in (("severity", agg["by_severity"]), ("type", agg["by_type"])):
+            value = str(alert.get(field))
+            counts[value] = counts.get(value, 0) + 1
+        self.stats["alerts"] += 1
+        touched.add(key)
+
+    def _tail_alert_log(self, path, name, touched):
+        """Count the complete lines appended to a .jsonl log since its offset."""
+        entry = self.files.setdefault(path, {"offset": 0})
+        compacted = os.path.splitext(path)[0] + ".json"
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        if size < entry["offset"]:
+            # alert logs only grow; a shorter file was replaced, not appended to
+            print(f"Warning: {path} shrank; counting only what is appended from now on",
+                  file=sys.stderr)
+            entry["offset"] = size
+        if size > entry["offset"]:
+            with open(path, "rb") as f:
+                f.seek(entry["offset"])
+                data = f.read(size - entry["offset"])
+            end = data.rfind(b"\n") + 1     # leave a line still being written for next time
+            for line in data[:end].splitlines():
+                try:
+                    self._add_alert(json.loads(line), name, touched)
+                except ValueError:
+                    pass    # torn line from a crash, skipped like read_alert_log does
+            entry["offset"] += end
+            self.stats["files_read"] += 1
+            self.stats["bytes_read"] += end
+        if os.path.exists(compacted) and entry["offset"] >= size:
+            entry["done"] = True    # AlertLogger.close() compacts after the last write
+
+    def _read_json_file(self, path):
+        with open(path, encoding="utf-8") as f:
+            data = f.read()
+        self.stats["files_read"] += 1
+        self.stats["bytes_read"] += len(data)
+        return json.loads(data)
+
+    def _read_legacy_alerts(self, path, name, touched):
+        """Count a JSON-array alert log that has no .jsonl (older sessions)."""
+        try:
+            alerts = self._read_json_file(path)
+        except (OSError, ValueError) as e:
+            print(f"Warning: skipping {path}: {e}", file=sys.stderr)
+            return
+        for alert in alerts if isinstance(alerts, list) else []:
+            if isinstance(alert, dict):
+                self._add_alert(alert, name, touched)
+        self.files[path] = {"done": True}
+
+    def _read_snapshot(self, path, name, touched):
+        """Fold one session snapshot in; the latest snapshot (by end_time) of a session wins.
+
+        session_duration restarts when the long_session alert fires, so the
+        session length is taken as end_time - start_time instead.
+        """
+        try:
+            data = self._read_json_file(path)
+            start = datetime.datetime.fromisoformat(data["start_time"])
+            end = snapshot_end(data, start)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Warning: skipping {path}: {e}", file=sys.stderr)
+            self.files[path] = {"done": True}
+            return
+        # same id as the session's alert log
+        session_id = start.strftime("%Y%m%d_%H%M%S") + (f"_{name}" if name else "")
+        key, agg = self._day(start.date().isoformat(), name)
+        previous = agg["sessions"].get(session_id)
+        if previous is None or end.isoformat() >= previous["end"]:
+            duration = max((end - start).total_seconds(), 0.0)
+            agg["sessions"][session_id] = {
+                "end": end.isoformat(),
+                "duration": duration,
+                "late_night": overlaps_late_night(start, duration),
+                "blinks": data.get("total_blinks", 0),
+                "drowsy_episodes": data.get("drowsy_episodes", 0),
+                "break_reminders": data.get("break_reminders", 0),
+            }
+            touched.add(key)
+        self.files[path] = {"done": True}
+        self.stats["snapshots"] += 1
+
+    def scan(self, alert_dir="alert_logs", session_dir="eye_strain_logs"):
+        """Fold in everything new under the two log directories; returns the day keys touched."""
+        touched = set()
+        for path, match in self._new_files(alert_dir, ALERT_FILE):
+            name = match.group(2) or ""
+            if match.group(3) == "jsonl":
+                self._tail_alert_log(path, name, touched)
+            elif not os.path.exists(path + "l") and not self.files.get(path + "l"):
+                self._read_legacy_alerts(path, name, touched)
+        for path, match in self._new_files(session_dir, SESSION_FILE):
+            self._read_snapshot(path, match.group(1) or "", touched)
+        return touched
+
+    def _new_files(self, directory, pattern):
+        """(path, match) for log files not yet marked done, in name (= time) order."""
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            return
+        for fname in names:
+            match = pattern.match(fname)
+            if match is None:
+                continue
+            path = os.path.join(directory, fname)
+            if not self.files.get(path, {}).get("done"):
+                yield path, match
+
+    def row(self, key):
+        """Ready-to-score feature row (predict.py payload) for one day key."""
+        agg = self.days[key]
+        day, name = key.split("|", 1)
+        sessions = agg["sessions"].values()
+        seconds = sum(s["duration"] for s in sessions)
+        late = agg["late_night_alerts"] > 0 or any(s["late_night"] for s in sessions)
+        row = {
+            "row_id": f"{day}/{name}" if name else day,
+            "day": day,
+            "source": name,
+            "total_coding_hours": round(seconds / 3600, 3),
+            "late_night_work": int(late),
+            "eye_strain_alerts": agg["alerts"],
+            "sessions": len(agg["sessions"]),
+            "alerts_by_severity": agg["by_severity"],
+        }
+        if sessions:
+            row["typing_session_length"] = round(seconds / 60 / len(agg["sessions"]), 1)
+        return row
+
+    def rows(self, keys=None):
+        return [self.row(key) for key in sorted(self.days if keys is None else keys)]
+
+
+def write_rows(rows, out):
+    out.write("".join(json.dumps(r) + "\n" for r in rows))
+    out.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate EST logs into predict.py feature rows")
+    parser.add_argument("--root", default=".",
+                        help="Directory ESTv4.py ran in (holds alert_logs/ and eye_strain_logs/)")
+    parser.add_argument("--alert-logs", help="Alert log directory (default: ROOT/alert_logs)")
+    parser.add_argument("--session-logs", help="Session snapshot directory (default: ROOT/eye_strain_logs)")
+    parser.add_argument("--state", default="feature_state.json",
+                        help="Aggregates + watermark file, updated in place")
+    parser.add_argument("--all", action="store_true",
+                        help="Emit every day, not only the days changed by this run")
+    parser.add_argument("--since", help="Only emit days on or after YYYY-MM-DD")
+    parser.add_argument("--out", default="-", help="Where feature rows go ('-' for stdout)")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the saved state and reparse everything")
+    parser.add_argument("--follow", type=float, metavar="SECONDS",
+                        help="Keep scanning every SECONDS and emit changed days as they change")
+    args = parser.parse_args()
+
+    alert_dir = args.alert_logs or os.path.join(args.root, "alert_logs")
+    session_dir = args.session_logs or os.path.join(args.root, "eye_strain_logs")
+    agg = FeatureAggregator(args.state, load=not args.rebuild)
+    out = sys.stdout if args.out == "-" else open(args.out, "w")
+
+    def emit(keys):
+        keys = [k for k in keys if not args.since or k.split("|", 1)[0] >= args.since]
+        write_rows(agg.rows(keys), out)
+
+    try:
+        t0 = time.perf_counter()
+        touched = agg.scan(alert_dir, session_dir)
+        agg.save()
+        emit(agg.days if args.all else touched)
+        s = agg.stats
+        print(f"Read {s['files_read']} file(s), {s['bytes_read']} bytes: {s['alerts']} alert(s), "
+              f"{s['snapshots']} snapshot(s), {len(touched)} day(s) changed "
+              f"in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+        while args.follow:
+            time.sleep(args.follow)
+            touched = agg.scan(alert_dir, session_dir)
+            if touched:
+                agg.save()
+                emit(touched)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,37 @@
 # ml/predict.py
+"""Burnout risk prediction.
+
+One-shot:   python predict.py '{"total_coding_hours": 9, ...}'   (or JSON on stdin)
+Batch:      python predict.py --batch users.jsonl --key user_id   (JSON lines or CSV; '-' = stdin)
+Service:    python predict.py --serve [--port 8765]               POST JSON to /predict
+            python predict.py --unix-socket /tmp/burnout.sock     JSON lines in, JSON lines out
+
+The service loads the model once and reloads it when the model file
+changes; responses have the same shape as the one-shot output.
+--serve and --batch keep an LRU cache of recent predictions
+(--cache-size, --cache-ttl, --cache-quantize) that is dropped whenever
+the model or the version in metadata.json changes; /health reports its
+hit rate.
+
+Models are read from the NumPy kernel burnout_model.npz written by
+train.py (no scikit-learn import) when it is current, else from the
+pickled bundle burnout_model.pkl.
+"""
 import sys, json
+import argparse
+import csv
+import itertools
+import os
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 import numpy as np
-import joblib
 
 MODEL_PATH = Path(__file__).parent / "models" / "burnout_model.pkl"
+KERNEL_PATH = Path(__file__).parent / "models" / "burnout_model.npz"
 META_PATH  = Path(__file__).parent / "models" / "metadata.json"
 
 FEATURES = [
@@ -22,49 +49,124 @@ def probs_to_score(probs):
     weights = np.array([0.1, 0.4, 0.7, 1.0])
     return float(np.clip(np.dot(probs, weights) * 100, 0, 100))
 
-def main():
-    # read JSON from argv or stdin
-    if len(sys.argv) > 1:
-        payload = json.loads(sys.argv[1])
-    else:
-        payload = json.loads(sys.stdin.read() or "{}")
+SCORE_WEIGHTS = np.array([0.1, 0.4, 0.7, 1.0])
+LEVELS = np.array(["Very Low", "Low", "Medium", "High"])
+LEVEL_CUTS = np.array([20, 40, 70])   # score < 20 Very Low, < 40 Low, < 70 Medium
+
+def probs_to_scores(probs):
+    """probs_to_score() for an (n, k) probability matrix."""
+    if probs.shape[1] < 4:
+        probs = np.pad(probs, ((0, 0), (0, 4 - probs.shape[1])), 'constant')
+    return np.clip(probs @ SCORE_WEIGHTS * 100, 0, 100)
+
+def scores_to_levels(scores):
+    return LEVELS[np.searchsorted(LEVEL_CUTS, scores, side="right")]
+
+class KernelModel:
+    """NumPy-only evaluation of a model exported by train.py (burnout_model.npz).
+
+    Has the predict_proba() of the sklearn model it was exported from, on
+    raw (unscaled) features, without importing scikit-learn or joblib.
+    """
+
+    def __init__(self, arrays):
+        self.kind = str(arrays["kind"])
+        self.classes_ = arrays["classes"]
+        self.arrays = arrays
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls({k: data[k] for k in data.files})
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=float)
+        a = self.arrays
+        if self.kind == "logreg":
+            logits = X @ a["coef"].T + a["intercept"]
+            if logits.shape[1] == 1:  # binary: sigmoid of the single logit
+                p = 1.0 / (1.0 + np.exp(-logits))
+                return np.hstack([1 - p, p])
+            logits -= logits.max(axis=1, keepdims=True)
+            e = np.exp(logits)
+            return e / e.sum(axis=1, keepdims=True)
+
+        # forest: walk every (row, tree) pair down one level per round, and
+        # drop pairs from the active set once they reach a leaf (a node
+        # whose left child is itself); sklearn compares float32 features
+        # against float64 thresholds
+        n_rows, n_features = X.shape
+        feature, threshold, left, right = a["feature"], a["threshold"], a["left"], a["right"]
+        n_trees = len(a["roots"])
+        X32 = X.astype(np.float32).ravel()
+        node = np.tile(a["roots"], n_rows)                      # (row, tree) pairs, row-major
+        row_offset = np.repeat(np.arange(n_rows) * n_features, n_trees)
+        active = np.arange(node.size)
+        while active.size:
+            nd = node[active]
+            go_left = X32[row_offset[active] + feature[nd]] <= threshold[nd]
+            nd = np.where(go_left, left[nd], right[nd])
+            node[active] = nd
+            internal = left[nd] != nd
+            active = active[internal]
+        node = node.reshape(n_rows, n_trees)
+        # summed tree by tree like sklearn, so results match it to within an ulp or so
+        value = a["value"]
+        proba = value[node[:, 0]].copy()
+        for t in range(1, node.shape[1]):
+            proba += value[node[:, t]]
+        return proba / node.shape[1]
+
+
+def default_model_path():
+    """The NumPy kernel when it is at least as new as the pickle, else the pickle."""
+    if KERNEL_PATH.exists() and (not MODEL_PATH.exists() or
+                                 KERNEL_PATH.stat().st_mtime >= MODEL_PATH.stat().st_mtime):
+        return KERNEL_PATH
+    return MODEL_PATH
+
+def load_bundle(path=None):
+    path = Path(path) if path else default_model_path()
+    if path.suffix == ".npz":
+        return {"model": KernelModel.load(path), "scaler": None, "uses_scaler": False}
+    import joblib  # only the pickle path needs scikit-learn
+    bundle = joblib.load(path)
+    # a thread pool per call costs far more than scoring a few rows
+    if getattr(bundle["model"], "n_jobs", None) not in (None, 1):
+        bundle["model"].n_jobs = 1
+    return {
+        "model": bundle["model"],
+        "scaler": bundle.get("scaler"),
+        "uses_scaler": bundle.get("uses_scaler", False),
+    }
 
+def payload_to_row(payload):
     # default sensible values if missing
-    x = [
+    return [
         float(payload.get("total_coding_hours", 6)),
         float(payload.get("idle_ratio", 0.3)),
-        int(payload.get("late_night_work", 0)),
+        int(float(payload.get("late_night_work", 0))),
         float(payload.get("eye_strain_alerts", 2)),
         float(payload.get("typing_session_length", 45)),
         float(payload.get("break_compliance", 0.3)),
     ]
 
-    bundle = joblib.load(MODEL_PATH)
-    model = bundle["model"]
-    scaler = bundle.get("scaler")
-    uses_scaler = bundle.get("uses_scaler", False)
+def score_matrix(bundle, X):
+    """(score, risk_level, confidence) for every row of an (n, 6) feature matrix."""
+    X = np.asarray(X, dtype=float)
+    model, scaler = bundle["model"], bundle["scaler"]
+    Xs = scaler.transform(X) if bundle["uses_scaler"] and scaler is not None else X
 
-    X = np.array(x, dtype=float).reshape(1, -1)
-    if uses_scaler and scaler is not None:
-        Xs = scaler.transform(X)
-    else:
-        Xs = X
-
-    probs = model.predict_proba(Xs)[0]
-    pred_idx = int(np.argmax(probs))
-    score = round(probs_to_score(probs), 1)
-    # Map score into categories manually
-    if score < 20:
-        level = "Very Low"
-    elif score < 40:
-        level = "Low"
-    elif score < 70:
-        level = "Medium"
-    else:
-        level = "High"
-    conf  = round(float(np.max(probs)) * 100, 1)
+    probs = model.predict_proba(Xs)
+    # Python's round() (not np.round) so results match the one-row path exactly
+    scores = np.array([round(v, 1) for v in probs_to_scores(probs).tolist()])
+    levels = scores_to_levels(scores).tolist()
+    confs = [round(v * 100, 1) for v in probs.max(axis=1).tolist()]
+    return list(zip(scores.tolist(), levels, confs))
 
-    result = {
+def make_result(x, scored):
+    score, level, conf = scored
+    return {
         "score": score,
         "risk_level": level,
         "confidence": conf,
@@ -77,7 +179,410 @@ def main():
             "breakCompliance": round(x[5], 3),
         }
     }
-    print(json.dumps(result))
+
+def predict_rows(bundle, X, cache=None, generation=None):
+    """Score an (n, 6) feature matrix; returns one result dict per row.
+
+    With a PredictionCache, rows are scored by their cache key and only
+    keys not already cached reach the model. generation is the cache
+    generation read before the bundle was taken (see ModelHolder.predict);
+    results from an older generation are returned but not cached.
+    """
+    X = np.asarray(X, dtype=float).tolist()
+    if cache is None:
+        return [make_result(x, scored) for x, scored in zip(X, score_matrix(bundle, X))]
+
+    keys = [cache.key(x) for x in X]
+    found, missing = cache.lookup_many(keys)
+    if missing:
+        for k, scored in zip(missing, score_matrix(bundle, missing)):
+            cache.store(k, scored, generation)
+            found[k] = scored
+    return [make_result(x, found[k]) for x, k in zip(X, keys)]
+
+def predict_one(bundle, payload, cache=None, generation=None):
+    """Score one JSON payload; returns the result dict printed by the CLI."""
+    return predict_rows(bundle, [payload_to_row(payload)], cache, generation)[0]
+
+
+# Decimals each feature is rounded to for quantized cache keys (--cache-quantize):
+# hours to 0.01, ratios to 0.001 (the precision results are reported with),
+# late-night flag to whole, alert count and session length to tenths.
+CACHE_DECIMALS = (2, 3, 0, 1, 1, 3)
+
+class PredictionCache:
+    """Bounded LRU of (score, risk_level, confidence) keyed on the feature row.
+
+    Keys are the canonical float features, so cached results are identical
+    to uncached ones. With decimals the cache is approximate: rows that
+    round to the same key share one evaluation of the rounded row, so a
+    row near a bucket edge can get a different score than it would
+    uncached (for a forest, often a noticeable share of rows). That is
+    why it is opt-in (--cache-quantize).
+
+    Entries expire after ttl seconds when set. clear() starts a new
+    generation; store() drops results computed for an older one, so a
+    request that raced a model reload cannot repopulate the cache with
+    the old model's answers. Safe to share between server threads.
+    """
+
+    def __init__(self, maxsize=4096, ttl=None, decimals=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.decimals = decimals
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = self.misses = self.evictions = self.expired = self.invalidations = 0
+        self.stale_stores = 0
+
+    def key(self, row):
+        if self.decimals is None:
+            return tuple(float(v) for v in row)
+        return tuple(round(float(v), d) for v, d in zip(row, self.decimals))
+
+    def lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored = entry
+                if self.ttl is None or self.clock() - stored < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expired += 1
+            self.misses += 1
+            return None
+
+    def lookup_many(self, keys):
+        """({key: value} for cached keys, unique missing keys in order).
+
+        Counted per key, so a repeated missing key counts as one miss and
+        then hits: it is only evaluated once.
+        """
+        found, missing = {}, []
+        for key in keys:
+            if key in found:
+                with self._lock:
+                    self.hits += 1
+                continue
+            value = self.lookup(key)
+            found[key] = value
+            if value is None:
+                missing.append(key)
+        return found, missing
+
+    def store(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                self.stale_stores += 1
+                return
+            self._entries[key] = (value, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"size": len(self._entries), "maxsize": self.maxsize, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions, "expired": self.expired,
+                "invalidations": self.invalidations, "stale_stores": self.stale_stores}
+
+
+def read_records(stream, fmt="auto"):
+    """Yield (line_no, payload dict or parse error) from JSON lines or CSV."""
+    if fmt == "auto":
+        first = stream.readline()
+        fmt = "jsonl" if first.lstrip().startswith("{") else "csv"
+        stream = itertools.chain([first], stream)
+    if fmt == "csv":
+        for n, row in enumerate(csv.DictReader(stream), start=2):
+            # empty cells fall back to the defaults, like missing JSON keys
+            yield n, {k: v for k, v in row.items() if v not in ("", None)}
+        return
+    for n, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield n, json.loads(line)
+        except ValueError as e:
+            yield n, e
+
+def score_stream(bundle, records, out, chunk_size=10000, key=None, cache=None):
+    """Score records chunk by chunk and write one JSON line per input row."""
+    written = 0
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return written
+        rows, results = [], [None] * len(chunk)
+        valid = []
+        for i, (line_no, payload) in enumerate(chunk):
+            try:
+                if isinstance(payload, Exception):
+                    raise payload
+                rows.append(payload_to_row(payload))
+                valid.append(i)
+            except (ValueError, TypeError, AttributeError) as e:
+                results[i] = {"error": str(e), "line": line_no}
+        if rows:
+            for i, result in zip(valid, predict_rows(bundle, rows, cache)):
+                payload = chunk[i][1]
+                if key is not None and key in payload:
+                    result = {key: payload[key], **result}
+                results[i] = result
+        out.write("".join(json.dumps(r) + "\n" for r in results))
+        written += len(results)
+
+def read_model_version(meta_path):
+    try:
+        return json.loads(Path(meta_path).read_text()).get("version")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class ModelHolder:
+    """Keeps the model bundle loaded and reloads it when the file changes.
+
+    The file is stat'ed at most every check_interval seconds. A new bundle
+    is loaded fully before it replaces the old one, so a half-written
+    file (or a failed load) keeps the previous model serving. The
+    prediction cache, if any, is cleared whenever the model is reloaded or
+    the version in the neighbouring metadata.json changes.
+    """
+
+    def __init__(self, path=None, check_interval=1.0, cache=None):
+        self.path = Path(path) if path else default_model_path()
+        self.meta_path = self.path.parent / "metadata.json"
+        self.check_interval = check_interval
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._bundle = None
+        self._mtime = None
+        self._meta_mtime = None
+        self.version = None
+        self._checked = 0.0
+        self.loaded_at = None
+        self.reloads = 0
+        self._load()
+
+    def _load(self):
+        st = self.path.stat()
+        bundle = load_bundle(self.path)
+        self._bundle, self._mtime = bundle, (st.st_mtime_ns, st.st_size)
+        self.loaded_at = time.time()
+        self._check_version()
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _check_version(self):
+        """Re-read metadata.json if it changed; clears the cache on a new version."""
+        try:
+            st = self.meta_path.stat()
+            meta_mtime = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            meta_mtime = None
+        if meta_mtime == self._meta_mtime:
+            return
+        self._meta_mtime = meta_mtime
+        version = read_model_version(self.meta_path)
+        if version != self.version:
+            self.version = version
+            if self.cache is not None:
+                self.cache.clear()
+
+    def predict(self, payload):
+        if self.cache is None:
+            return predict_one(self.get(), payload)
+        self.get()      # reloads if due
+        # _load() swaps the bundle before clearing the cache, so reading the
+        # generation first can only tag a new-model result as stale, never
+        # an old-model result as current
+        generation = self.cache.generation
+        return predict_one(self._bundle, payload, self.cache, generation)
+
+    def get(self):
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            with self._lock:
+                if now - self._checked >= self.check_interval:
+                    self._checked = now
+                    try:
+                        st = self.path.stat()
+                        if (st.st_mtime_ns, st.st_size) != self._mtime:
+                            self._load()
+                            self.reloads += 1
+                            print(f"Reloaded {self.path}", file=sys.stderr)
+                        else:
+                            self._check_version()
+                    except Exception as e:
+                        print(f"Model reload failed, keeping the previous one: {e}", file=sys.stderr)
+        return self._bundle
+
+    def health(self):
+        health = {"status": "ok", "model": str(self.path), "version": self.version,
+                  "loaded_at": self.loaded_at, "reloads": self.reloads}
+        if self.cache is not None:
+            health["cache"] = self.cache.stats()
+        return health
+
+
+def make_http_handler(holder):
+    class PredictHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive: no reconnect per request
+        disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+        def _reply(self, code, obj):
+            body = json.dumps(obj).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, holder.health())
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path not in ("/", "/predict"):
+                self._reply(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                self._reply(200, holder.predict(payload))
+            except (ValueError, TypeError, AttributeError) as e:
+                self._reply(400, {"error": str(e)})
+
+        def log_message(self, fmt, *args):
+            pass  # one line per request is too chatty for a local service
+
+    return PredictHandler
+
+
+def make_unix_handler(holder):
+    class PredictStreamHandler(socketserver.StreamRequestHandler):
+        """Newline-delimited JSON: one request object per line, one result per line."""
+
+        def handle(self):
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    result = holder.predict(json.loads(line))
+                except (ValueError, TypeError, AttributeError) as e:
+                    result = {"error": str(e)}
+                self.wfile.write((json.dumps(result) + "\n").encode())
+                self.wfile.flush()
+
+    return PredictStreamHandler
+
+
+def batch(args):
+    bundle = load_bundle(args.model)
+    src = sys.stdin if args.batch == "-" else open(args.batch, newline="")
+    out = sys.stdout if args.out in (None, "-") else open(args.out, "w")
+    fmt = args.format
+    if fmt == "auto" and args.batch.lower().endswith(".csv"):
+        fmt = "csv"
+    try:
+        t0 = time.perf_counter()
+        cache = make_cache(args)
+        n = score_stream(bundle, read_records(src, fmt), out, args.chunk_size, args.key, cache)
+        elapsed = time.perf_counter() - t0
+        print(f"Scored {n} rows in {elapsed:.2f}s", file=sys.stderr)
+        if cache is not None:
+            print(f"Cache: {json.dumps(cache.stats())}", file=sys.stderr)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if out is not sys.stdout:
+            out.close()
+
+def make_cache(args):
+    if args.cache_size <= 0:
+        return None
+    return PredictionCache(args.cache_size, args.cache_ttl,
+                           CACHE_DECIMALS if args.cache_quantize else None)
+
+def cli(argv):
+    parser = argparse.ArgumentParser(description="Burnout predictions: batch scoring or a warm service")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Score JSON lines or CSV rows from FILE ('-' for stdin) to JSON lines")
+    parser.add_argument("--format", choices=["auto", "jsonl", "csv"], default="auto")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows scored per model call")
+    parser.add_argument("--key", help="Input field copied into each result (e.g. user_id)")
+    parser.add_argument("--out", help="Batch output file (default: stdout)")
+    parser.add_argument("--cache-size", type=int, default=4096,
+                        help="LRU prediction cache entries for --batch/--serve (0 disables)")
+    parser.add_argument("--cache-ttl", type=float, help="Seconds a cached prediction stays valid")
+    parser.add_argument("--cache-quantize", action="store_true",
+                        help="Key the cache on features rounded to CACHE_DECIMALS: more hits, but "
+                             "approximate (near-identical rows share one score)")
+    parser.add_argument("--serve", action="store_true", help="Serve predictions over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", help="Listen on this Unix socket (JSON lines) instead of HTTP")
+    parser.add_argument("--model", help="burnout_model.npz or .pkl (default: the newer of the two)")
+    parser.add_argument("--check-interval", type=float, default=1.0,
+                        help="Seconds between model file change checks")
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        batch(args)
+    elif args.serve or args.unix_socket:
+        serve(args)
+    else:
+        parser.error("expected --batch, --serve or --unix-socket")
+
+def serve(args):
+    holder = ModelHolder(args.model, args.check_interval, make_cache(args))
+    if args.unix_socket:
+        if os.path.exists(args.unix_socket):
+            os.unlink(args.unix_socket)
+        server = socketserver.ThreadingUnixStreamServer(args.unix_socket, make_unix_handler(holder))
+        where = args.unix_socket
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), make_http_handler(holder))
+        where = f"http://{args.host}:{args.port}/predict"
+    server.daemon_threads = True
+    print(f"Serving predictions on {where}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.unlink(args.unix_socket)
+
+def main():
+    # python predict.py --batch FILE / --serve / --unix-socket PATH
+    if len(sys.argv) > 1 and sys.argv[1].startswith("--"):
+        cli(sys.argv[1:])
+        return
+
+    # read JSON from argv or stdin
+    if len(sys.argv) > 1:
+        payload = json.loads(sys.argv[1])
+    else:
+        payload = json.loads(sys.stdin.read() or "{}")
+
+    print(json.dumps(predict_one(load_bundle(), payload)))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from aggregate_features import FeatureAggregator
+
+
+def alert(timestamp, severity="High", kind="Blink Frequency"):
+    return {"timestamp": timestamp, "type": kind, "severity": severity, "details": ""}
+
+
+def write_lines(path, records, mode="a"):
+    with open(path, mode) as f:
+        f.write("".join(json.dumps(r) + "\n" for r in records))
+
+
+@pytest.fixture
+def logs(tmp_path):
+    (tmp_path / "alert_logs").mkdir()
+    (tmp_path / "eye_strain_logs").mkdir()
+    return tmp_path
+
+
+def scan(logs, state="state.json"):
+    agg = FeatureAggregator(logs / state)
+    touched = agg.scan(logs / "alert_logs", logs / "eye_strain_logs")
+    agg.save()
+    return agg, touched
+
+
+def test_appended_lines_are_read_once(logs):
+    log = logs / "alert_logs" / "alerts_20250301_090000.jsonl"
+    write_lines(log, [alert("2025-03-01 09:10:00"), alert("2025-03-01 09:20:00", "Low")])
+
+    agg, touched = scan(logs)
+    assert touched == {"2025-03-01|"}
+    assert agg.row("2025-03-01|")["eye_strain_alerts"] == 2
+
+    agg, touched = scan(logs)
+    assert touched == set() and agg.stats["bytes_read"] == 0
+
+    write_lines(log, [alert("2025-03-01 09:30:00")])
+    agg, touched = scan(logs)
+    assert agg.stats["alerts"] == 1
+    assert agg.row("2025-03-01|")["alerts_by_severity"] == {"High": 2, "Low": 1}
+
+
+def test_torn_line_waits_for_its_newline(logs):
+    log = logs / "alert_logs" / "alerts_20250301_090000_cam1.jsonl"
+    text = json.dumps(alert("2025-03-01 23:10:00"))
+    log.write_text(text[:20])
+    agg, touched = scan(logs)
+    assert touched == set()
+
+    with open(log, "a") as f:
+        f.write(text[20:] + "\n")
+    agg, touched = scan(logs)
+    row = agg.row("2025-03-01|cam1")
+    assert row["eye_strain_alerts"] == 1 and row["late_night_work"] == 1
+    assert row["row_id"] == "2025-03-01/cam1"
+
+
+def test_compacted_log_is_finished_and_not_double_counted(logs):
+    log = logs / "alert_logs" / "alerts_20250301_090000.jsonl"
+    records = [alert("2025-03-01 09:10:00")]
+    write_lines(log, records)
+    (logs / "alert_logs" / "alerts_20250301_090000.json").write_text(json.dumps(records))
+    (logs / "alert_logs" / "alerts_20250201_090000.json").write_text(
+        json.dumps([alert("2025-02-01 09:10:00")]))      # legacy, no .jsonl
+
+    agg, _ = scan(logs)
+    assert agg.files[str(log)]["done"]
+    assert [r["eye_strain_alerts"] for r in agg.rows()] == [1, 1]
+
+
+def snapshot(logs, saved, start, end, duration, blinks):
+    data = {"start_time": start, "end_time": end, "session_duration": duration,
+            "total_blinks": blinks}
+    (logs / "eye_strain_logs" / f"session_{saved}.json").write_text(json.dumps(data))
+
+
+def test_latest_snapshot_wins_after_long_session_reset(logs):
+    # the long_session alert at 10:00 restarts session_duration
+    snapshot(logs, "20250301_095900", "2025-03-01T09:00:00", "2025-03-01T09:59:00", 3540, 100)
+    scan(logs)
+    snapshot(logs, "20250301_103000", "2025-03-01T09:00:00", "2025-03-01T10:30:00", 1800, 150)
+    agg, touched = scan(logs)
+
+    row = agg.row("2025-03-01|")
+    assert touched == {"2025-03-01|"}
+    assert row["sessions"] == 1
+    assert row["total_coding_hours"] == 1.5
+    assert row["typing_session_length"] == 90.0
+    assert agg.days["2025-03-01|"]["sessions"]["20250301_090000"]["blinks"] == 150
+
+
+def test_incremental_state_matches_rebuild(logs):
+    log = logs / "alert_logs" / "alerts_20250301_090000.jsonl"
+    write_lines(log, [alert("2025-03-01 09:10:00")])
+    snapshot(logs, "20250301_093000", "2025-03-01T09:00:00", "2025-03-01T09:30:00", 1800, 10)
+    scan(logs)
+    write_lines(log, [alert("2025-03-02 00:10:00", "Critical")])
+    snapshot(logs, "20250301_100000", "2025-03-01T09:00:00", "2025-03-01T10:00:00", 3600, 20)
+    incremental, _ = scan(logs)
+
+    rebuilt, _ = scan(logs, state="fresh.json")
+    assert incremental.rows() == rebuilt.rows()
@@ -0,0 +1,114 @@
+import json
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from predict import (CACHE_DECIMALS, ModelHolder, PredictionCache, load_bundle, predict_rows,
+                     score_matrix)
+from train import label_rows, synth_features
+
+
+@pytest.fixture(scope="module")
+def data():
+    X = synth_features(2000, np.random.default_rng(0))
+    return X, label_rows(X)
+
+
+def write_model(path, data, C=1.0, version="1.0.0"):
+    X, y = data
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression(C=C, max_iter=500).fit(scaler.transform(X), y)
+    joblib.dump({"model": model, "scaler": scaler, "uses_scaler": True}, path)
+    (path.parent / "metadata.json").write_text(json.dumps({"version": version}))
+    return path
+
+
+@pytest.fixture
+def model_path(tmp_path, data):
+    return write_model(tmp_path / "burnout_model.pkl", data)
+
+
+def test_exact_cache_matches_uncached_and_scores_repeats_once(model_path, data):
+    bundle = load_bundle(model_path)
+    X = np.vstack([data[0][:300], data[0][:300]])
+    cache = PredictionCache(1000)
+    assert predict_rows(bundle, X, cache) == predict_rows(bundle, X)
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"], stats["size"]) == (300, 300, 300)
+
+
+def test_quantized_keys_share_the_rounded_rows_score(model_path, data):
+    bundle = load_bundle(model_path)
+    row = data[0][0]
+    near = row + np.array([1e-4, 1e-5, 0, 1e-3, 1e-3, 1e-5])
+    cache = PredictionCache(decimals=CACHE_DECIMALS)
+    first, second = predict_rows(bundle, [row, near], cache)
+    rounded = score_matrix(bundle, [cache.key(row)])[0]
+    assert (first["score"], first["risk_level"], first["confidence"]) == rounded
+    assert second["score"] == first["score"] and cache.stats()["misses"] == 1
+    assert second["factors"]["totalCodingHours"] == near[0]     # factors stay per row
+
+
+def test_lru_eviction_and_ttl():
+    now = [0.0]
+    cache = PredictionCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.store("a", 1)
+    cache.store("b", 2)
+    assert cache.lookup("a") == 1          # "b" is now least recently used
+    cache.store("c", 3)
+    assert cache.lookup("b") is None and cache.stats()["evictions"] == 1
+    now[0] = 10.5
+    assert cache.lookup("a") is None and cache.stats()["expired"] == 1
+
+
+def test_stores_from_an_older_generation_are_dropped(model_path, data):
+    bundle = load_bundle(model_path)
+    cache = PredictionCache()
+    generation = cache.generation
+    cache.clear()                          # model reloaded while the request was scoring
+    predict_rows(bundle, data[0][:5], cache, generation)
+    assert cache.stats()["size"] == 0 and cache.stats()["stale_stores"] == 5
+
+
+class ReloadingModel:
+    """Model whose scoring races a reload of the holder."""
+
+    def __init__(self, model, reload):
+        self.model, self.reload = model, reload
+
+    def predict_proba(self, X):
+        self.reload()
+        return self.model.predict_proba(X)
+
+
+def test_holder_does_not_cache_a_result_that_raced_a_reload(model_path):
+    holder = ModelHolder(model_path, check_interval=3600, cache=PredictionCache())
+    bundle = dict(holder.get())
+    bundle["model"] = ReloadingModel(bundle["model"], holder._load)
+    holder._bundle = bundle
+    holder.predict({"total_coding_hours": 9})
+    assert holder.cache.stats()["size"] == 0
+
+
+def test_holder_clears_the_cache_on_model_or_version_change(model_path, data):
+    holder = ModelHolder(model_path, check_interval=0, cache=PredictionCache())
+    payload = {"total_coding_hours": 9, "late_night_work": 1}
+    holder.predict(payload)
+    holder.predict(payload)
+    assert holder.cache.stats()["hits"] == 1
+
+    (model_path.parent / "metadata.json").write_text(json.dumps({"version": "1.1.0"}))
+    holder.get()
+    assert holder.version == "1.1.0" and holder.cache.stats()["size"] == 0
+
+    holder.predict(payload)
+    write_model(model_path, data, C=0.01, version="1.1.0")
+    st = model_path.stat()
+    os.utime(model_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    result = holder.predict(payload)
+    assert holder.reloads == 1 and holder.cache.stats()["invalidations"] == 2
+    assert result == predict_rows(load_bundle(model_path), [[9, 0.3, 1, 2, 45, 0.3]])[0]
@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pytest
+
+import train
+from predict import KernelModel, load_bundle, score_matrix
+from train import (fit_model, generate_dataset, kernel_arrays, label_rows, load_dataset,
+                   prepare_data, sample_rows, save_bundle, synth_features)
+
+
+@pytest.fixture(scope="module")
+def data():
+    X = synth_features(3000, np.random.default_rng(3))
+    return X[:2000], label_rows(X[:2000]), X[2000:]
+
+
+def fitted(name, data):
+    scaler, model = fit_model(name, {}, data[0], data[1])
+    return model, scaler
+
+
+def test_prepare_data_samples_n_rows_from_a_dataset(tmp_path):
+    generate_dataset(tmp_path, 20_000, chunk_size=7_000, seed=1)
+    X_all, y_all = load_dataset(tmp_path)
+
+    X, y = prepare_data(n=1_000, data=tmp_path)
+    assert X.shape == (1_000, X_all.shape[1]) and y.shape == (1_000,)
+    assert not isinstance(X, np.memmap)
+
+    # rows are real dataset rows, read in file order
+    idx = np.sort(np.random.default_rng(42).choice(len(y_all), size=1_000, replace=False))
+    np.testing.assert_array_equal(X, X_all[idx])
+    np.testing.assert_array_equal(y, y_all[idx])
+
+
+def test_sample_rows_keeps_everything_when_n_covers_the_data(tmp_path):
+    generate_dataset(tmp_path, 500, seed=1)
+    X, y = sample_rows(*load_dataset(tmp_path), 10_000)
+    assert len(y) == 500
+
+
+@pytest.mark.parametrize("name", ["logreg", "rf"])
+def test_kernel_matches_sklearn(name, data):
+    model, scaler = fitted(name, data)
+    X_new = data[2]
+    arrays = kernel_arrays(model, scaler)
+    if name == "rf":      # only what KernelModel.predict_proba reads
+        assert set(arrays) == {"kind", "classes", "feature", "threshold", "left", "right",
+                               "value", "roots"}
+    kernel = KernelModel(arrays)
+    expected = model.predict_proba(scaler.transform(X_new) if scaler else X_new)
+    got = kernel.predict_proba(X_new)
+    np.testing.assert_allclose(got, expected, rtol=0, atol=1e-12)
+
+    pickled = {"model": model, "scaler": scaler, "uses_scaler": scaler is not None}
+    numpy_only = {"model": kernel, "scaler": None, "uses_scaler": False}
+    assert score_matrix(numpy_only, X_new) == score_matrix(pickled, X_new)
+
+
+def test_save_bundle_writes_all_artifacts_or_none(tmp_path, data, monkeypatch):
+    model, scaler = fitted("logreg", data)
+    save_bundle(model, scaler, {"version": "1.0.0"}, data[0], outdir=tmp_path)
+    before = {p.name: p.read_bytes() for p in tmp_path.iterdir()}
+    assert sorted(before) == ["burnout_model.npz", "burnout_model.pkl", "metadata.json"]
+    assert load_bundle(tmp_path / "burnout_model.npz")["model"].kind == "logreg"
+
+    def broken(*args):
+        raise RuntimeError("kernel export does not match the model")
+    monkeypatch.setattr(train, "export_kernel", broken)
+    with pytest.raises(RuntimeError):
+        save_bundle(model, scaler, {"version": "1.1.0"}, data[0], outdir=tmp_path)
+    assert {p.name: p.read_bytes() for p in tmp_path.iterdir()} == before
+    assert json.loads(before["metadata.json"])["version"] == "1.0.0"
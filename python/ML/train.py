@@ -3,9 +3,14 @@ import numpy as np
 import pandas as pd
 import json
 import argparse
+import itertools
 import joblib
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold, train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
@@ -18,39 +23,91 @@ FEATURES = [
 
 RNG = np.random.default_rng(42)
 
-def make_synthetic(n=10000):
-    total_coding_hours = np.clip(RNG.normal(6, 2, n), 0, 16)
-    idle_ratio = RNG.beta(2, 5, n)             # mostly small
-    late_night_work = RNG.binomial(1, 0.3, n)  # 30%
-    eye_strain_alerts = RNG.poisson(2, n)      # mean 2
-    typing_session_length = np.clip(RNG.exponential(45, n), 5, 180)
-    break_compliance = np.clip(RNG.beta(3, 2, n), 0, 1)
-
-    X = pd.DataFrame({
-        "total_coding_hours": total_coding_hours,
-        "idle_ratio": idle_ratio,
-        "late_night_work": late_night_work,
-        "eye_strain_alerts": eye_strain_alerts,
-        "typing_session_length": typing_session_length,
-        "break_compliance": break_compliance
-    })
-
-    # rule-of-thumb risk function to create labels
+LABELS = ["Very Low", "Low", "Medium", "High"]
+
+def synth_features(n, rng=RNG):
+    """(n, len(FEATURES)) float array of synthetic feature rows."""
+    X = np.empty((n, len(FEATURES)))
+    X[:, 0] = np.clip(rng.normal(6, 2, n), 0, 16)       # total_coding_hours
+    X[:, 1] = rng.beta(2, 5, n)                         # idle_ratio, mostly small
+    X[:, 2] = rng.binomial(1, 0.3, n)                   # late_night_work, 30%
+    X[:, 3] = rng.poisson(2, n)                         # eye_strain_alerts, mean 2
+    X[:, 4] = np.clip(rng.exponential(45, n), 5, 180)   # typing_session_length
+    X[:, 5] = np.clip(rng.beta(3, 2, n), 0, 1)          # break_compliance
+    return X
+
+def label_rows(X):
+    """Rule-of-thumb risk labels 0..3 (Very Low, Low, Medium, High) for feature rows."""
     score_raw = (
-        (X.total_coding_hours > 8) * 0.30 +
-        (X.idle_ratio < 0.2)       * 0.20 +
-        (X.late_night_work == 1)   * 0.15 +
-        (X.eye_strain_alerts > 5)  * 0.15 +
-        (X.typing_session_length > 90) * 0.10 +
-        (X.break_compliance < 0.5) * 0.10
-    ).astype(float)
-
-    y = np.zeros(n, dtype=int)  # 0,1,2,3 -> Very Low, Low, Medium, High
-    y[score_raw > 0.2] = 1   # Low
-    y[score_raw > 0.35] = 2  # Medium
-    y[score_raw > 0.5] = 3   # High
+        (X[:, 0] > 8)   * 0.30 +
+        (X[:, 1] < 0.2) * 0.20 +
+        (X[:, 2] == 1)  * 0.15 +
+        (X[:, 3] > 5)   * 0.15 +
+        (X[:, 4] > 90)  * 0.10 +
+        (X[:, 5] < 0.5) * 0.10
+    )
+    # count how many cut points each score passes: >0.2 Low, >0.35 Medium, >0.5 High
+    return (score_raw[:, None] > np.array([0.2, 0.35, 0.5])).sum(axis=1).astype(np.uint8)
 
-    return X, y
+def make_synthetic(n=10000):
+    X = synth_features(n)
+    y = label_rows(X).astype(int)
+    return pd.DataFrame(X, columns=FEATURES), y
+
+def _open_npy(path, dtype, shape):
+    """Open a .npy file for sequential writes: header now, raw rows appended later."""
+    f = open(path, "wb")
+    np.lib.format.write_array_header_1_0(
+        f, {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+            "fortran_order": False, "shape": shape})
+    return f
+
+def generate_dataset(path, n, chunk_size=1_000_000, seed=42):
+    """Write n synthetic rows to path/X.npy (float32) and path/y.npy chunk by chunk.
+
+    Chunks are appended to the files as they are made, so memory stays at
+    about one chunk regardless of n. Every chunk has its own seeded RNG, so
+    a dataset is reproducible for a given (n, chunk_size, seed).
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    counts = np.zeros(len(LABELS), dtype=np.int64)
+    with _open_npy(path / "X.npy", np.float32, (n, len(FEATURES))) as X_out, \
+            _open_npy(path / "y.npy", np.uint8, (n,)) as y_out:
+        for i, start in enumerate(range(0, n, chunk_size)):
+            X = synth_features(min(chunk_size, n - start), np.random.default_rng([seed, i]))
+            y = label_rows(X)
+            X_out.write(X.astype(np.float32).tobytes())
+            y_out.write(y.tobytes())
+            counts += np.bincount(y, minlength=len(LABELS))
+    meta = {"rows": n, "chunk_size": chunk_size, "seed": seed, "features": FEATURES,
+            "class_counts": counts.tolist()}
+    (path / "dataset.json").write_text(json.dumps(meta, indent=2))
+    return meta
+
+def load_dataset(path):
+    """Memory-mapped (X, y) written by generate_dataset()."""
+    path = Path(path)
+    return np.load(path / "X.npy", mmap_mode="r"), np.load(path / "y.npy", mmap_mode="r")
+
+def balanced_indices(y, rng=None):
+    """Row indices that oversample every class (with replacement) to the largest class size."""
+    rng = rng or np.random.default_rng(42)
+    counts = np.bincount(y)
+    classes = np.flatnonzero(counts)
+    max_count = counts.max()
+    order = np.argsort(y, kind="stable")          # rows grouped by class
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    cls = np.repeat(classes, max_count)
+    offsets = (rng.random(cls.size) * counts[cls]).astype(np.int64)
+    return order[starts[cls] + offsets]
+
+def print_distribution(y, when):
+    counts = np.bincount(y, minlength=len(LABELS))
+    print(f"Class distribution ({when}):")
+    for u, c in enumerate(counts):
+        if c:
+            print(f"  {u} ({LABELS[u]}): {c}")
 
 """def train_and_eval(model_name="logreg"):
     X, y = make_synthetic()
@@ -108,104 +165,458 @@ def make_synthetic(n=10000):
     (outdir / "metadata.json").write_text(json.dumps(meta, indent=2))
     print(f"Saved model to {outdir/'burnout_model.pkl'} and metadata.json")"""
 
-from sklearn.utils import resample
+# Hyperparameter grids for --search
+SEARCH_SPACE = {
+    "logreg": [{"C": c} for c in (0.01, 0.1, 1.0, 10.0, 100.0)],
+    "rf": [{"n_estimators": t, "max_depth": d, "min_samples_leaf": leaf}
+           for t in (100, 300) for d in (None, 8, 16) for leaf in (1, 2, 5)],
+}
 
-def train_and_eval(model_name="logreg", balance=False):
-    X, y = make_synthetic(n=5000)
+DEFAULT_PARAMS = {
+    "logreg": {"C": 1.0},
+    "rf": {"n_estimators": 300, "max_depth": None, "min_samples_leaf": 2},
+}
 
-    # 🔎 Show class distribution before balancing
-    unique, counts = np.unique(y, return_counts=True)
-    print("Class distribution (before balancing):")
-    for u, c in zip(unique, counts):
-        labels = ["Very Low","Low","Medium","High"]
-        print(f"  {u} ({labels[u]}): {c}")
+def build_model(model_name, params=None, n_jobs=1):
+    """(unfitted model, uses_scaler) for a model family and hyperparameters."""
+    params = dict(DEFAULT_PARAMS[model_name], **(params or {}))
+    if model_name == "logreg":
+        return LogisticRegression(max_iter=2000, random_state=42, **params), True
+    if model_name == "rf":
+        return RandomForestClassifier(random_state=42, n_jobs=n_jobs, **params), False
+    raise ValueError("model_name must be logreg or rf")
 
-    # 🟢 Optional: Balance classes by oversampling minority ones
-    if balance:
-        df = pd.DataFrame(X)
-        df["label"] = y
-        max_count = df["label"].value_counts().max()
-
-        balanced = []
-        for label in df["label"].unique():
-            subset = df[df["label"] == label]
-            # resample with replacement to match max_count
-            upsampled = resample(
-                subset, 
-                replace=True, 
-                n_samples=max_count, 
-                random_state=42
-            )
-            balanced.append(upsampled)
-
-        df_bal = pd.concat(balanced)
-        X = df_bal.drop("label", axis=1).values
-        y = df_bal["label"].values
+def fit_model(model_name, params, X_train, y_train, n_jobs=1):
+    """Fit (scaler, model); scaler is None for models that use raw features."""
+    model, uses_scaler = build_model(model_name, params, n_jobs)
+    scaler = None
+    if uses_scaler:
+        scaler = StandardScaler()
+        X_train = scaler.fit_transform(X_train)
+    model.fit(X_train, y_train)
+    return scaler, model
 
-        # 🔎 Show class distribution after balancing
-        unique, counts = np.unique(y, return_counts=True)
-        print("Class distribution (after balancing):")
-        for u, c in zip(unique, counts):
-            labels = ["Very Low","Low","Medium","High"]
-            print(f"  {u} ({labels[u]}): {c}")
+def sample_rows(X, y, n, rng=None):
+    """n random rows of a (memory-mapped) dataset, read in file order; all rows if n is None."""
+    if n is None or n >= len(y):
+        return np.asarray(X), np.asarray(y)
+    rng = rng or np.random.default_rng(42)
+    idx = np.sort(rng.choice(len(y), size=n, replace=False))
+    return X[idx], y[idx]
+
+def prepare_data(balance=False, n=5000, data=None):
+    """(X, y) in memory: n synthetic rows, or n rows sampled from a --data dataset."""
+    if data:
+        X, y = sample_rows(*load_dataset(data), n)
     else:
+        X, y = make_synthetic(n=n)
         X = X.values
 
-    # Split dataset
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    # 🔎 Show class distribution before balancing
+    print_distribution(y, "before balancing")
 
-    scaler = StandardScaler()
-    X_train_s = scaler.fit_transform(X_train)
-    X_test_s  = scaler.transform(X_test)
+    # 🟢 Optional: Balance classes by oversampling minority ones
+    if balance:
+        idx = balanced_indices(y)
+        X, y = X[idx], y[idx]
 
-    if model_name == "logreg":
-        model = LogisticRegression(max_iter=2000, multi_class="auto", random_state=42)
-        model.fit(X_train_s, y_train)
-        y_pred = model.predict(X_test_s)
-        y_proba = model.predict_proba(X_test_s)
-        uses_scaler = True
-    elif model_name == "rf":
-        model = RandomForestClassifier(
-            n_estimators=300, max_depth=None, min_samples_leaf=2, random_state=42
-        )
-        model.fit(X_train, y_train)
-        y_pred = model.predict(X_test)
-        y_proba = model.predict_proba(X_test)
-        uses_scaler = False
+        # 🔎 Show class distribution after balancing
+        print_distribution(y, "after balancing")
     else:
-        raise ValueError("model_name must be logreg or rf")
+        X, y = np.asarray(X), np.asarray(y)
+    return X, y
 
+def evaluate(model, scaler, X_test, y_test):
+    y_pred = model.predict(scaler.transform(X_test) if scaler is not None else X_test)
     acc = accuracy_score(y_test, y_pred)
     print(f"Accuracy: {acc:.3f}")
     print("Confusion matrix:\n", confusion_matrix(y_test, y_pred))
     print("\nReport:\n", classification_report(y_test, y_pred, digits=3))
+    return acc
 
-    # Save model + metadata
-    outdir = Path(__file__).parent / "models"
+def kernel_arrays(model, scaler=None):
+    """Compile a fitted model into plain arrays that predict.py evaluates with NumPy only.
+
+    logreg: the scaler is folded into the coefficients, so
+            logits = X @ coef.T + intercept on raw features.
+    rf:     all trees flattened into one set of node arrays. Leaves point
+            at themselves with an infinite threshold. Evaluation walks every
+            (row, tree) pair at once, one level per round, with node = left
+            if x[feature] <= threshold else right, and drops a pair from the
+            active set once it reaches a leaf.
+    """
+    if isinstance(model, LogisticRegression):
+        coef, intercept = model.coef_, model.intercept_
+        if scaler is not None:
+            coef = coef / scaler.scale_
+            intercept = intercept - coef @ scaler.mean_
+        return {"kind": "logreg", "classes": model.classes_,
+                "coef": coef, "intercept": intercept}
+
+    if isinstance(model, RandomForestClassifier):
+        if scaler is not None:
+            raise ValueError("forest kernels expect unscaled features")
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for est in model.estimators_:
+            tree = est.tree_
+            n = tree.node_count
+            leaf = tree.children_left == -1
+            idx = np.arange(offset, offset + n)
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            lefts.append(np.where(leaf, idx, tree.children_left + offset))
+            rights.append(np.where(leaf, idx, tree.children_right + offset))
+            value = tree.value[:, 0, :]
+            values.append(value / value.sum(axis=1, keepdims=True))
+            roots.append(offset)
+            offset += n
+        return {"kind": "rf", "classes": model.classes_,
+                "feature": np.concatenate(features).astype(np.int16),
+                "threshold": np.concatenate(thresholds),
+                "left": np.concatenate(lefts).astype(np.int32),
+                "right": np.concatenate(rights).astype(np.int32),
+                "value": np.concatenate(values),
+                "roots": np.array(roots, dtype=np.int32)}
+
+    raise ValueError(f"no kernel export for {type(model).__name__}")
+
+def export_kernel(model, scaler, path, X_check=None):
+    """Write the model as a NumPy kernel (.npz); checks it against predict_proba on X_check."""
+    from predict import KernelModel
+    arrays = kernel_arrays(model, scaler)
+    np.savez_compressed(path, **arrays)
+    if X_check is not None and len(X_check):
+        X_check = np.asarray(X_check[:2000], dtype=float)
+        expected = model.predict_proba(scaler.transform(X_check) if scaler is not None else X_check)
+        got = KernelModel.load(path).predict_proba(X_check)
+        err = float(np.abs(expected - got).max())
+        if err > 1e-5:
+            Path(path).unlink()
+            raise RuntimeError(f"kernel export does not match the model (max error {err:.2g})")
+    return path
+
+def save_bundle(model, scaler, meta, X_check=None, outdir=None):
+    """Write the pickle, NumPy kernel and metadata.json together, or none of them.
+
+    Everything is written to a temp dir next to the models first, so a
+    failed kernel export leaves the previous bundle untouched. metadata.json
+    is moved into place last, as predict.py watches it for new versions.
+    """
+    outdir = Path(outdir) if outdir else Path(__file__).parent / "models"
     outdir.mkdir(parents=True, exist_ok=True)
-    joblib.dump(
-        {"model": model, "scaler": scaler if uses_scaler else None, "uses_scaler": uses_scaler},
-        outdir / "burnout_model.pkl"
+    names = ("burnout_model.pkl", "burnout_model.npz", "metadata.json")
+    with tempfile.TemporaryDirectory(dir=outdir, prefix=".staging-") as tmp:
+        tmp = Path(tmp)
+        joblib.dump(
+            {"model": model, "scaler": scaler, "uses_scaler": scaler is not None},
+            tmp / "burnout_model.pkl"
+        )
+        export_kernel(model, scaler, tmp / "burnout_model.npz", X_check)
+        (tmp / "metadata.json").write_text(json.dumps(meta, indent=2))
+        for name in names:
+            os.replace(tmp / name, outdir / name)
+    print(f"Saved model to {outdir/'burnout_model.pkl'} (+ NumPy kernel burnout_model.npz) and metadata.json")
+
+def _median_ms(fn, calls):
+    times = []
+    for args in calls:
+        t0 = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times) * 1000)
+
+def measure_footprint(model, scaler, X_sample, single_calls=200, batch_size=1000, batch_repeats=5):
+    """Size, load time and predict_proba latency of a model as predict.py serves it.
+
+    Both the pickled bundle and the NumPy kernel are written to a temp dir
+    and loaded back through predict.load_bundle, so the numbers include its
+    single-threaded forest setting. Latencies are medians.
+    """
+    from predict import load_bundle
+    X_sample = np.asarray(X_sample, dtype=float)
+    rows = [(X_sample[i:i + 1],) for i in range(min(single_calls, len(X_sample)))]
+    batch = X_sample[:batch_size]
+    result = {}
+    if isinstance(model, RandomForestClassifier):
+        result["nodes"] = int(sum(est.tree_.node_count for est in model.estimators_))
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"pickle": Path(tmp) / "model.pkl", "kernel": Path(tmp) / "model.npz"}
+        joblib.dump({"model": model, "scaler": scaler, "uses_scaler": scaler is not None},
+                    paths["pickle"])
+        np.savez_compressed(paths["kernel"], **kernel_arrays(model, scaler))
+        for name, path in paths.items():
+            load_ms = []
+            for _ in range(3):
+                t0 = time.perf_counter()
+                bundle = load_bundle(path)
+                load_ms.append((time.perf_counter() - t0) * 1000)
+            m, sc = bundle["model"], bundle["scaler"]
+
+            def proba(Xb):
+                return m.predict_proba(sc.transform(Xb) if sc is not None else Xb)
+
+            proba(rows[0][0])  # warm-up
+            result[name] = {
+                "size_bytes": path.stat().st_size,
+                "load_ms": min(load_ms),
+                "single_row_ms": _median_ms(proba, rows),
+                "batch_rows": len(batch),
+                "batch_ms": _median_ms(proba, [(batch,)] * batch_repeats),
+            }
+    return result
+
+def print_footprint(fp):
+    for name in ("pickle", "kernel"):
+        f = fp[name]
+        print(f"  {name:6s} {f['size_bytes'] / 1024:9.1f} KiB  load {f['load_ms']:7.1f} ms  "
+              f"1 row {f['single_row_ms']:6.2f} ms  {f['batch_rows']} rows {f['batch_ms']:7.1f} ms")
+
+def train_and_eval(model_name="logreg", balance=False, n=5000, data=None, n_jobs=-1):
+    X, y = prepare_data(balance, n, data)
+
+    # Split dataset
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
     )
 
+    scaler, model = fit_model(model_name, None, X_train, y_train, n_jobs)
+    acc = evaluate(model, scaler, X_test, y_test)
+    footprint = measure_footprint(model, scaler, X_test)
+    print("Footprint:")
+    print_footprint(footprint)
+
+    # Save model + metadata
     meta = {
         "version": "1.0.0",
         "features": FEATURES,
         "model_type": model_name,
+        "params": DEFAULT_PARAMS[model_name],
         "train_size": int(len(X)*0.8),
         "test_size": int(len(X)*0.2),
         "accuracy": acc,
-        "balanced": balance
+        "balanced": balance,
+        "dataset": str(data) if data else None,
+        "footprint": footprint
     }
-    (outdir / "metadata.json").write_text(json.dumps(meta, indent=2))
-    print(f"Saved model to {outdir/'burnout_model.pkl'} and metadata.json")
+    save_bundle(model, scaler, meta, X_test)
+
+
+# --search: cross-validated grid search, one candidate per worker process.
+# Each worker gets the training data once (pool initializer) and fits
+# single-threaded, so the pool size is the whole parallelism budget.
+_search_data = None
+
+def _init_search_worker(X, y):
+    global _search_data
+    _search_data = (X, y)
+
+def _evaluate_candidate(model_name, params, folds):
+    X, y = _search_data
+    t0 = time.perf_counter()
+    fold_scores, fit_seconds = [], []
+    for train_idx, val_idx in StratifiedKFold(folds, shuffle=True, random_state=42).split(X, y):
+        f0 = time.perf_counter()
+        scaler, model = fit_model(model_name, params, X[train_idx], y[train_idx])
+        fit_seconds.append(time.perf_counter() - f0)
+        X_val = X[val_idx] if scaler is None else scaler.transform(X[val_idx])
+        fold_scores.append(float(accuracy_score(y[val_idx], model.predict(X_val))))
+    return {
+        "model_type": model_name,
+        "params": params,
+        "cv_accuracy": float(np.mean(fold_scores)),
+        "cv_std": float(np.std(fold_scores)),
+        "fold_accuracy": fold_scores,
+        "fit_seconds": float(np.mean(fit_seconds)),
+        "total_seconds": time.perf_counter() - t0,
+    }
+
+def search_and_train(families=("logreg", "rf"), balance=False, n=5000, data=None,
+                     n_jobs=None, folds=5):
+    """Grid-search both model families with k-fold CV in a process pool, save the best."""
+    n_jobs = n_jobs or os.cpu_count() or 1
+    X, y = prepare_data(balance, n, data)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+
+    candidates = [(name, params) for name in families for params in SEARCH_SPACE[name]]
+    print(f"Searching {len(candidates)} candidates with {folds}-fold CV on {n_jobs} processes...")
+    t0 = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_search_worker,
+                             initargs=(X_train, y_train)) as pool:
+        futures = [pool.submit(_evaluate_candidate, name, params, folds)
+                   for name, params in candidates]
+        for fut in as_completed(futures):
+            r = fut.result()
+            results.append(r)
+            print(f"  {r['model_type']:6s} {json.dumps(r['params']):60s} "
+                  f"cv {r['cv_accuracy']:.3f} ± {r['cv_std']:.3f}  ({r['total_seconds']:.1f}s)")
+    search_seconds = time.perf_counter() - t0
+
+    results.sort(key=lambda r: (-r["cv_accuracy"], r["fit_seconds"]))
+    best = results[0]
+    print(f"Best: {best['model_type']} {best['params']} (cv {best['cv_accuracy']:.3f})")
+
+    # refit the winner on the full training split, using every core for the forest
+    t1 = time.perf_counter()
+    scaler, model = fit_model(best["model_type"], best["params"], X_train, y_train, n_jobs)
+    refit_seconds = time.perf_counter() - t1
+    acc = evaluate(model, scaler, X_test, y_test)
+    footprint = measure_footprint(model, scaler, X_test)
+    print("Footprint:")
+    print_footprint(footprint)
+
+    meta = {
+        "version": "1.0.0",
+        "features": FEATURES,
+        "model_type": best["model_type"],
+        "params": best["params"],
+        "train_size": int(len(X_train)),
+        "test_size": int(len(X_test)),
+        "accuracy": acc,
+        "cv_accuracy": best["cv_accuracy"],
+        "balanced": balance,
+        "dataset": str(data) if data else None,
+        "footprint": footprint,
+        "search": {
+            "folds": folds,
+            "n_jobs": n_jobs,
+            "candidates": len(results),
+            "search_seconds": search_seconds,
+            "refit_seconds": refit_seconds,
+            "results": results,
+        },
+    }
+    save_bundle(model, scaler, meta, X_test)
+
+
+# --sweep: forest size/latency trade-off
+SWEEP_SPACE = {
+    "n_estimators": (10, 30, 100, 300),
+    "max_depth": (None, 6, 10, 16),
+    "min_samples_leaf": (1, 2, 5, 10),
+}
+
+def pareto_front(results):
+    """Mark results not dominated on (higher accuracy, smaller pickle, faster single row)."""
+    def key(r):
+        return (-r["accuracy"], r["footprint"]["pickle"]["size_bytes"],
+                r["footprint"]["pickle"]["single_row_ms"])
+    keys = [key(r) for r in results]
+    for r, k in zip(results, keys):
+        r["pareto"] = not any(o != k and all(a <= b for a, b in zip(o, k)) for o in keys)
+    return [r for r in results if r["pareto"]]
+
+def sweep_and_train(balance=False, n=5000, data=None, n_jobs=None, tolerance=0.005):
+    """Sweep forest sizes, report accuracy vs size/latency, save the smallest good-enough one."""
+    n_jobs = n_jobs or os.cpu_count() or 1
+    X, y = prepare_data(balance, n, data)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+
+    grid = [dict(zip(SWEEP_SPACE, values)) for values in itertools.product(*SWEEP_SPACE.values())]
+    print(f"Sweeping {len(grid)} forest configurations...")
+    results = []
+    for params in grid:
+        t0 = time.perf_counter()
+        scaler, model = fit_model("rf", params, X_train, y_train, n_jobs)
+        fit_seconds = time.perf_counter() - t0
+        acc = float(accuracy_score(y_test, model.predict(X_test)))
+        results.append({"params": params, "accuracy": acc, "fit_seconds": fit_seconds,
+                        "footprint": measure_footprint(model, scaler, X_test)})
+    pareto = pareto_front(results)
+
+    best_acc = max(r["accuracy"] for r in results)
+    eligible = [r for r in results if r["accuracy"] >= best_acc - tolerance]
+    chosen = min(eligible, key=lambda r: (r["footprint"]["pickle"]["size_bytes"],
+                                          r["footprint"]["pickle"]["single_row_ms"]))
+
+    print(f"\n{'n_est':>5s} {'depth':>5s} {'leaf':>4s} {'acc':>6s} {'pkl KiB':>9s} "
+          f"{'npz KiB':>8s} {'1row ms':>8s} {'load ms':>8s}")
+    for r in sorted(results, key=lambda r: r["footprint"]["pickle"]["size_bytes"]):
+        p, fp = r["params"], r["footprint"]
+        mark = " <- saved" if r is chosen else (" *" if r["pareto"] else "")
+        print(f"{p['n_estimators']:5d} {str(p['max_depth']):>5s} {p['min_samples_leaf']:4d} "
+              f"{r['accuracy']:6.3f} {fp['pickle']['size_bytes'] / 1024:9.1f} "
+              f"{fp['kernel']['size_bytes'] / 1024:8.1f} {fp['pickle']['single_row_ms']:8.2f} "
+              f"{fp['pickle']['load_ms']:8.1f}{mark}")
+    print(f"* Pareto-optimal on accuracy / size / latency ({len(pareto)} of {len(results)}); "
+          f"best accuracy {best_acc:.3f}, tolerance {tolerance}")
+
+    outdir = Path(__file__).parent / "models"
+    outdir.mkdir(parents=True, exist_ok=True)
+    report = {"tolerance": tolerance, "best_accuracy": best_acc, "chosen": chosen["params"],
+              "test_size": int(len(X_test)), "results": results}
+    (outdir / "size_latency_report.json").write_text(json.dumps(report, indent=2))
+    print(f"Saved report to {outdir/'size_latency_report.json'}")
+
+    # refit the chosen configuration (same seed, so the same forest) and save it
+    scaler, model = fit_model("rf", chosen["params"], X_train, y_train, n_jobs)
+    acc = evaluate(model, scaler, X_test, y_test)
+    meta = {
+        "version": "1.0.0",
+        "features": FEATURES,
+        "model_type": "rf",
+        "params": chosen["params"],
+        "train_size": int(len(X_train)),
+        "test_size": int(len(X_test)),
+        "accuracy": acc,
+        "balanced": balance,
+        "dataset": str(data) if data else None,
+        "footprint": chosen["footprint"],
+        "sweep": {
+            "tolerance": tolerance,
+            "best_accuracy": best_acc,
+            "candidates": len(results),
+            "pareto": [r["params"] for r in pareto],
+            "report": "size_latency_report.json",
+        },
+    }
+    save_bundle(model, scaler, meta, X_test)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--model", choices=["logreg","rf"], default="logreg")
     parser.add_argument("--balance", action="store_true", help="Balance classes using oversampling")
+    parser.add_argument("--n", type=int, default=5000,
+                        help="Rows to train on in memory: synthetic rows, or a random sample of --data")
+    parser.add_argument("--data", help="Train on a dataset directory written by --generate")
+    parser.add_argument("--n-jobs", type=int, default=os.cpu_count(),
+                        help="Cores to use (forest fitting, --search worker processes)")
+    parser.add_argument("--search", action="store_true",
+                        help="Cross-validated hyperparameter search over both model families")
+    parser.add_argument("--families", nargs="+", choices=["logreg", "rf"], default=["logreg", "rf"],
+                        help="Model families for --search")
+    parser.add_argument("--folds", type=int, default=5, help="CV folds for --search")
+    parser.add_argument("--sweep", action="store_true",
+                        help="Sweep forest size, report accuracy vs size/latency, save the smallest "
+                             "model within --tolerance of the best accuracy")
+    parser.add_argument("--tolerance", type=float, default=0.005,
+                        help="Accuracy a --sweep model may give up for size (absolute)")
+    parser.add_argument("--export", action="store_true",
+                        help="Re-export models/burnout_model.pkl as the NumPy kernel and exit")
+    parser.add_argument("--generate", metavar="DIR",
+                        help="Write --rows synthetic rows to DIR as memory-mappable .npy files and exit")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
     args = parser.parse_args()
-    train_and_eval(args.model, args.balance)
+    if args.export:
+        outdir = Path(__file__).parent / "models"
+        bundle = joblib.load(outdir / "burnout_model.pkl")
+        X_check = synth_features(2000, np.random.default_rng(args.seed))
+        path = export_kernel(bundle["model"], bundle.get("scaler"), outdir / "burnout_model.npz", X_check)
+        print(f"Exported {path} ({path.stat().st_size} bytes)")
+    elif args.generate:
+        meta = generate_dataset(args.generate, args.rows, args.chunk_size, args.seed)
+        print(f"Wrote {meta['rows']} rows to {args.generate} (class counts {meta['class_counts']})")
+    elif args.sweep:
+        sweep_and_train(args.balance, args.n, args.data, args.n_jobs, args.tolerance)
+    elif args.search:
+        search_and_train(args.families, args.balance, args.n, args.data, args.n_jobs, args.folds)
+    else:
+        train_and_eval(args.model, args.balance, args.n, args.data, args.n_jobs)